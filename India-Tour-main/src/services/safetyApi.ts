@@ -28,6 +28,7 @@ export interface RiskZone {
   city?: string | null;
   geom: any;
   is_active: boolean;
+  updated_at?: string;
 }
 
 function getAuthHeaders(session: Session | null): Record<string, string> {
@@ -86,17 +87,50 @@ export async function saveItineraryBackend(payload: ItinerarySavePayload) {
   return res.json();
 }
 
+// Zones already downloaded, kept in step with ?since= deltas and revalidated with If-None-Match,
+// so a poll where nothing changed is an empty 304.
+const zoneSync: { etag: string | null; cursor: string | null; zones: Map<number, RiskZone> } = {
+  etag: null,
+  cursor: null,
+  zones: new Map(),
+};
+
+function sortedZones(): RiskZone[] {
+  return [...zoneSync.zones.values()].sort(
+    (a, b) => b.risk_level.localeCompare(a.risk_level) || a.name.localeCompare(b.name),
+  );
+}
+
 export async function fetchRiskZones(): Promise<RiskZone[]> {
-  const res = await fetch(`${SAFETY_API_BASE_URL}/api/locations/zones`, {
-    method: 'GET',
-  });
+  const url = zoneSync.cursor
+    ? `${SAFETY_API_BASE_URL}/api/locations/zones?since=${encodeURIComponent(zoneSync.cursor)}`
+    : `${SAFETY_API_BASE_URL}/api/locations/zones`;
+  const headers: Record<string, string> = {};
+  if (zoneSync.etag) headers['If-None-Match'] = zoneSync.etag;
 
+  const res = await fetch(url, { method: 'GET', headers });
+
+  if (res.status === 304) {
+    return sortedZones();
+  }
   if (!res.ok) {
     throw new Error(`Failed to load risk zones: ${res.status}`);
   }
 
   const data = await res.json();
-  return Array.isArray(data) ? data : [];
+  if (Array.isArray(data)) {
+    zoneSync.zones = new Map(data.map((zone: RiskZone) => [zone.id, zone]));
+    zoneSync.cursor = data.reduce<string | null>(
+      (latest, zone: RiskZone) => (zone.updated_at && (!latest || zone.updated_at > latest) ? zone.updated_at : latest),
+      null,
+    );
+  } else if (data && Array.isArray(data.zones)) {
+    data.zones.forEach((zone: RiskZone) => zoneSync.zones.set(zone.id, zone));
+    (data.removed ?? []).forEach((id: number) => zoneSync.zones.delete(id));
+    zoneSync.cursor = data.cursor ?? zoneSync.cursor;
+  }
+  zoneSync.etag = res.headers.get('ETag');
+  return sortedZones();
 }
 
 export async function fetchSafetyHealth(): Promise<SafetyHealth> {
@@ -152,6 +186,110 @@ export async function sendLocationPing(session: Session | null, payload: Locatio
   return res.json();
 }
 
+export interface QueuedLocationFix extends LocationPingPayload {
+  recorded_at: string;
+}
+
+// Replays fixes buffered while offline in one request (oldest first).
+export async function sendLocationBatch(session: Session | null, fixes: QueuedLocationFix[]) {
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/locations/batch`, {
+    method: 'POST',
+    headers: getAuthHeaders(session),
+    body: JSON.stringify(fixes),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to send location batch: ${res.status}`);
+  }
+
+  return res.json();
+}
+
+export type LocationStreamMessage =
+  | { type: 'alert'; alert: SafetyAlert }
+  | { type: 'ack'; received: number }
+  | { type: 'error'; status: number; detail: unknown };
+
+// Opens the streaming location channel; send fixes with `socket.send(JSON.stringify(fix))`.
+export function openLocationStream(
+  session: Session | null,
+  touristIdCode: string,
+  onMessage: (message: LocationStreamMessage) => void,
+): WebSocket {
+  const params = new URLSearchParams({ tourist_id_code: touristIdCode });
+  if (session?.access_token) {
+    params.set('token', session.access_token);
+  }
+  const wsBase = SAFETY_API_BASE_URL.replace(/^http/, 'ws');
+  const socket = new WebSocket(`${wsBase}/api/locations/stream?${params.toString()}`);
+  socket.onmessage = (event) => onMessage(JSON.parse(event.data) as LocationStreamMessage);
+  return socket;
+}
+
+export interface NearbyTourist {
+  tourist_profile_id: number;
+  tourist_id_code: string;
+  lat: number;
+  lng: number;
+  recorded_at: string;
+  distance_m: number;
+}
+
+export interface NearbyQuery {
+  radiusM?: number;
+  activeWithinMinutes?: number;
+  excludeTouristIdCode?: string;
+  limit?: number;
+}
+
+// Admin: tourists last seen within a radius of a point (e.g. around a panic alert), nearest first.
+export async function fetchNearbyTourists(
+  session: Session | null,
+  lat: number,
+  lng: number,
+  query: NearbyQuery = {},
+): Promise<NearbyTourist[]> {
+  const params = new URLSearchParams({ lat: String(lat), lng: String(lng) });
+  if (query.radiusM !== undefined) params.set('radius_m', String(query.radiusM));
+  if (query.activeWithinMinutes !== undefined) params.set('active_within_minutes', String(query.activeWithinMinutes));
+  if (query.excludeTouristIdCode) params.set('exclude_tourist_id_code', query.excludeTouristIdCode);
+  if (query.limit !== undefined) params.set('limit', String(query.limit));
+
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/locations/nearby?${params.toString()}`, {
+    method: 'GET',
+    headers: getAuthHeaders(session),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to load nearby tourists: ${res.status}`);
+  }
+
+  return res.json();
+}
+
+export interface SafetyScoreRecomputeResult {
+  profiles: number;
+  alerts: number;
+  updated: number;
+  workers: number;
+  score_seconds: number;
+  total_seconds: number;
+}
+
+// Admin: refresh safety_score for every active tourist (e.g. before sorting the fleet for triage).
+export async function recomputeSafetyScores(session: Session | null): Promise<SafetyScoreRecomputeResult> {
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/tourists/safety-scores/recompute`, {
+    method: 'POST',
+    headers: getAuthHeaders(session),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to recompute safety scores: ${res.status}`);
+  }
+
+  return res.json();
+}
+
 // ---- Admin alerts helpers ----
 
 export interface SafetyAlert {
@@ -199,6 +337,190 @@ export async function fetchAlertsAdmin(session: Session | null, filters: AlertFi
   return Array.isArray(data) ? data : [];
 }
 
+export interface AlertPage {
+  alerts: SafetyAlert[];
+  nextCursor: string | null;
+}
+
+// Keyset-paginated listing: pass the previous page's nextCursor to continue.
+export async function fetchAlertsAdminPage(
+  session: Session | null,
+  filters: AlertFilters = {},
+  cursor?: string | null,
+  limit = 50,
+): Promise<AlertPage> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (filters.status) params.set('status', filters.status);
+  if (filters.type) params.set('type', filters.type);
+  if (filters.severity) params.set('severity', filters.severity);
+  if (filters.tourist_id_code) params.set('tourist_id_code', filters.tourist_id_code);
+  if (cursor) params.set('cursor', cursor);
+
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/alerts?${params.toString()}`, {
+    method: 'GET',
+    headers: getAuthHeaders(session),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to load admin alerts: ${res.status}`);
+  }
+
+  const data = await res.json();
+  return {
+    alerts: Array.isArray(data) ? data : [],
+    nextCursor: res.headers.get('X-Next-Cursor'),
+  };
+}
+
+export interface AlertStatsBucket {
+  bucket_start: string;
+  total: number;
+  by_severity: Record<string, number>;
+  by_type: Record<string, number>;
+  by_status: Record<string, number>;
+}
+
+export interface AlertStats {
+  since: string;
+  until: string;
+  bucket: 'hour' | 'day';
+  total: number;
+  by_severity: Record<string, number>;
+  by_type: Record<string, number>;
+  by_status: Record<string, number>;
+  by_city: Record<string, number>;
+  buckets: AlertStatsBucket[];
+}
+
+export interface AlertStatsQuery {
+  since?: string;
+  until?: string;
+  bucket?: 'hour' | 'day';
+  status?: string;
+  type?: string;
+  severity?: string;
+  city?: string;
+}
+
+export async function fetchAlertStats(session: Session | null, query: AlertStatsQuery = {}): Promise<AlertStats> {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value !== undefined) params.set(key, value);
+  });
+
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/alerts/stats?${params.toString()}`, {
+    method: 'GET',
+    headers: getAuthHeaders(session),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to load alert stats: ${res.status}`);
+  }
+
+  return res.json();
+}
+
+export interface HeatmapTile {
+  z: number;
+  x: number;
+  y: number;
+  source: 'alerts' | 'locations';
+  since: string;
+  until: string;
+  grid: number;
+  bbox: [number, number, number, number];
+  total: number;
+  max: number;
+  cells: [number, number, number][]; // [col, row, count], row 0 at the top
+}
+
+export interface HeatmapQuery {
+  since?: string;
+  until?: string;
+  source?: 'alerts' | 'locations';
+  type?: string[];
+  grid?: number;
+}
+
+export async function fetchHeatmapTile(
+  session: Session | null,
+  z: number,
+  x: number,
+  y: number,
+  query: HeatmapQuery = {},
+): Promise<HeatmapTile> {
+  const params = new URLSearchParams({ z: String(z), x: String(x), y: String(y) });
+  if (query.since) params.set('since', query.since);
+  if (query.until) params.set('until', query.until);
+  if (query.source) params.set('source', query.source);
+  if (query.grid) params.set('grid', String(query.grid));
+  (query.type ?? []).forEach((type) => params.append('type', type));
+
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/analytics/heatmap?${params.toString()}`, {
+    method: 'GET',
+    headers: getAuthHeaders(session),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to load heatmap tile: ${res.status}`);
+  }
+
+  return res.json();
+}
+
+export type AlertFeedEvent =
+  | { event: 'alert_created' | 'alert_updated'; id: string; alert: SafetyAlert }
+  | { event: 'reset'; id: string };
+
+// Live admin alert feed over SSE. Uses fetch (not EventSource) so the Bearer token stays
+// in a header; reconnects with Last-Event-ID. Call the returned function to stop.
+export function subscribeAlertFeed(session: Session | null, onEvent: (event: AlertFeedEvent) => void): () => void {
+  const controller = new AbortController();
+  let lastEventId: string | null = null;
+
+  const run = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const headers: Record<string, string> = { ...getAuthHeaders(session), Accept: 'text/event-stream' };
+        if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+        const res = await fetch(`${SAFETY_API_BASE_URL}/api/alerts/stream`, { headers, signal: controller.signal });
+        if (!res.ok || !res.body) throw new Error(`Alert feed failed: ${res.status}`);
+
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          let sep: number;
+          while ((sep = buffer.indexOf('\n\n')) >= 0) {
+            const block = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            const fields: Record<string, string> = {};
+            for (const line of block.split('\n')) {
+              const idx = line.indexOf(': ');
+              if (idx > 0) fields[line.slice(0, idx)] = line.slice(idx + 2);
+            }
+            if (!fields.event || !fields.id) continue;
+            lastEventId = fields.id;
+            if (fields.event === 'reset') {
+              onEvent({ event: 'reset', id: fields.id });
+            } else {
+              onEvent({ event: fields.event as 'alert_created' | 'alert_updated', id: fields.id, alert: JSON.parse(fields.data) });
+            }
+          }
+        }
+      } catch {
+        if (controller.signal.aborted) return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 3000));
+    }
+  };
+
+  void run();
+  return () => controller.abort();
+}
+
 export async function acknowledgeAlert(session: Session | null, alertId: number): Promise<SafetyAlert> {
   const res = await fetch(`${SAFETY_API_BASE_URL}/api/alerts/${alertId}/acknowledge`, {
     method: 'POST',
@@ -225,6 +547,38 @@ export async function resolveAlert(session: Session | null, alertId: number): Pr
   return res.json();
 }
 
+export interface BulkAlertRequest {
+  action: 'acknowledge' | 'resolve';
+  ids?: number[];
+  filter?: AlertFilters;
+}
+
+export interface BulkAlertResult {
+  action: BulkAlertRequest['action'];
+  updated: number;
+  skipped: number | null;
+  alerts: SafetyAlert[];
+}
+
+// Response is NDJSON: a summary line followed by one line per updated alert.
+export async function bulkUpdateAlerts(session: Session | null, request: BulkAlertRequest): Promise<BulkAlertResult> {
+  const res = await fetch(`${SAFETY_API_BASE_URL}/api/alerts/bulk`, {
+    method: 'POST',
+    headers: getAuthHeaders(session),
+    body: JSON.stringify(request),
+  });
+
+  if (!res.ok) {
+    throw new Error(`Failed to update alerts: ${res.status}`);
+  }
+
+  const [summary, ...alerts] = (await res.text())
+    .split('\n')
+    .filter((line) => line.trim())
+    .map((line) => JSON.parse(line));
+  return { ...summary, alerts };
+}
+
 export async function fetchTouristProfileByCodeAdmin(
   session: Session | null,
   touristIdCode: string,
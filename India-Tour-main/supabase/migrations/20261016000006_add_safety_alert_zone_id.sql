@@ -0,0 +1,14 @@
+-- Promote the geofence zone id out of safety_alerts.extra_data into an indexed column
+ALTER TABLE public.safety_alerts
+ADD COLUMN IF NOT EXISTS zone_id BIGINT REFERENCES public.risk_zones(id) ON DELETE SET NULL;
+
+-- Backfill existing geofence alerts
+UPDATE public.safety_alerts
+SET zone_id = (extra_data ->> 'zone_id')::BIGINT
+WHERE type = 'geofence_breach'
+  AND zone_id IS NULL
+  AND extra_data ->> 'zone_id' IS NOT NULL;
+
+-- De-duplication lookup: alerts for a tourist and zone since the window start
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_profile_zone_triggered
+  ON public.safety_alerts (tourist_profile_id, zone_id, triggered_at);
@@ -0,0 +1,25 @@
+-- Last known position per tourist, maintained by the safety API on every location ingest
+CREATE TABLE IF NOT EXISTS public.tourist_last_locations (
+  tourist_profile_id BIGINT PRIMARY KEY REFERENCES public.tourist_profiles(id) ON DELETE CASCADE,
+  tourist_id_code VARCHAR(32) NOT NULL,
+  lat DOUBLE PRECISION NOT NULL,
+  lng DOUBLE PRECISION NOT NULL,
+  accuracy_m DOUBLE PRECISION,
+  source VARCHAR(32),
+  recorded_at TIMESTAMP NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS ix_tourist_last_locations_tourist_id_code ON public.tourist_last_locations (tourist_id_code);
+CREATE INDEX IF NOT EXISTS ix_tourist_last_locations_recorded_at ON public.tourist_last_locations (recorded_at);
+CREATE INDEX IF NOT EXISTS ix_tourist_last_locations_updated_at ON public.tourist_last_locations (updated_at);
+
+-- Seed from existing history
+INSERT INTO public.tourist_last_locations (
+  tourist_profile_id, tourist_id_code, lat, lng, accuracy_m, source, recorded_at
+)
+SELECT DISTINCT ON (tourist_profile_id)
+  tourist_profile_id, tourist_id_code, lat, lng, accuracy_m, source, recorded_at
+FROM public.tourist_locations
+ORDER BY tourist_profile_id, recorded_at DESC
+ON CONFLICT (tourist_profile_id) DO NOTHING;
@@ -0,0 +1,9 @@
+-- Reference point for server-side trajectory thinning: the last fix actually written to tourist_locations
+ALTER TABLE public.tourist_last_locations
+ADD COLUMN IF NOT EXISTS stored_lat DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS stored_lng DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS stored_at TIMESTAMP;
+
+UPDATE public.tourist_last_locations
+SET stored_lat = lat, stored_lng = lng, stored_at = recorded_at
+WHERE stored_at IS NULL;
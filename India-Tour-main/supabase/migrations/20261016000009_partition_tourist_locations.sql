@@ -0,0 +1,76 @@
+-- Range-partition tourist_locations by recorded_at.
+-- The existing table becomes the "legacy" partition holding all history up to the
+-- next Monday; the safety API creates day/week partitions ahead of time from there on
+-- (SAFETY_LOCATION_PARTITION_PERIOD) and the retention job drops old ones whole.
+DO $$
+DECLARE
+  cutover TIMESTAMP;
+  id_seq TEXT;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('public.tourist_locations')) = 'p' THEN
+    RETURN;
+  END IF;
+
+  SELECT date_trunc('week', greatest(now() AT TIME ZONE 'utc', coalesce(max(recorded_at), now() AT TIME ZONE 'utc')))
+         + interval '1 week'
+    INTO cutover
+    FROM public.tourist_locations;
+
+  id_seq := pg_get_serial_sequence('public.tourist_locations', 'id');
+
+  ALTER TABLE public.tourist_locations RENAME TO tourist_locations_legacy;
+  ALTER TABLE public.tourist_locations_legacy RENAME CONSTRAINT tourist_locations_pkey TO tourist_locations_legacy_pkey;
+  ALTER INDEX IF EXISTS public.ix_tourist_locations_id RENAME TO ix_tourist_locations_legacy_id;
+  ALTER INDEX IF EXISTS public.ix_tourist_locations_tourist_profile_id RENAME TO ix_tourist_locations_legacy_tourist_profile_id;
+  ALTER INDEX IF EXISTS public.ix_tourist_locations_tourist_id_code RENAME TO ix_tourist_locations_legacy_tourist_id_code;
+  ALTER INDEX IF EXISTS public.ix_tourist_locations_recorded_at RENAME TO ix_tourist_locations_legacy_recorded_at;
+  UPDATE public.tourist_locations_legacy SET recorded_at = now() AT TIME ZONE 'utc' WHERE recorded_at IS NULL;
+
+  CREATE TABLE public.tourist_locations (
+    id BIGINT NOT NULL,
+    tourist_profile_id BIGINT REFERENCES public.tourist_profiles(id) ON DELETE CASCADE,
+    tourist_id_code VARCHAR(32),
+    lat DOUBLE PRECISION,
+    lng DOUBLE PRECISION,
+    accuracy_m DOUBLE PRECISION,
+    source VARCHAR(32),
+    recorded_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, recorded_at)
+  ) PARTITION BY RANGE (recorded_at);
+
+  -- Keep using the old id sequence, owned by the parent so dropping the legacy partition keeps it
+  EXECUTE format('ALTER TABLE public.tourist_locations ALTER COLUMN id SET DEFAULT nextval(%L::regclass)', id_seq);
+  EXECUTE format('ALTER SEQUENCE %s OWNED BY public.tourist_locations.id', id_seq);
+
+  EXECUTE format(
+    'ALTER TABLE public.tourist_locations ATTACH PARTITION public.tourist_locations_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+    cutover
+  );
+
+  -- Catches fixes for periods whose partition has not been created (yet)
+  CREATE TABLE public.tourist_locations_default PARTITION OF public.tourist_locations DEFAULT;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_tourist_locations_id ON public.tourist_locations (id);
+CREATE INDEX IF NOT EXISTS ix_tourist_locations_tourist_profile_id ON public.tourist_locations (tourist_profile_id);
+CREATE INDEX IF NOT EXISTS ix_tourist_locations_tourist_id_code ON public.tourist_locations (tourist_id_code);
+CREATE INDEX IF NOT EXISTS ix_tourist_locations_recorded_at ON public.tourist_locations (recorded_at);
+
+-- Hourly per-tourist movement summaries (app/jobs/location_rollups.py)
+CREATE TABLE IF NOT EXISTS public.tourist_location_rollups (
+  id BIGSERIAL PRIMARY KEY,
+  tourist_profile_id BIGINT NOT NULL REFERENCES public.tourist_profiles(id) ON DELETE CASCADE,
+  tourist_id_code VARCHAR(32) NOT NULL,
+  hour_start TIMESTAMP NOT NULL,
+  fix_count INTEGER NOT NULL,
+  centroid_lat DOUBLE PRECISION NOT NULL,
+  centroid_lng DOUBLE PRECISION NOT NULL,
+  distance_m DOUBLE PRECISION NOT NULL,
+  first_recorded_at TIMESTAMP NOT NULL,
+  last_recorded_at TIMESTAMP NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+  CONSTRAINT uq_tourist_location_rollups_profile_hour UNIQUE (tourist_profile_id, hour_start)
+);
+
+CREATE INDEX IF NOT EXISTS ix_tourist_location_rollups_tourist_id_code ON public.tourist_location_rollups (tourist_id_code);
+CREATE INDEX IF NOT EXISTS ix_tourist_location_rollups_hour_start ON public.tourist_location_rollups (hour_start);
@@ -0,0 +1,10 @@
+-- Token buckets shared by all safety API workers (SAFETY_RATE_LIMIT_BACKEND=database)
+CREATE TABLE IF NOT EXISTS public.rate_limit_buckets (
+  key VARCHAR(191) PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  updated_at DOUBLE PRECISION NOT NULL,
+  full_at DOUBLE PRECISION NOT NULL,
+  last_allowed BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_full_at ON public.rate_limit_buckets (full_at);
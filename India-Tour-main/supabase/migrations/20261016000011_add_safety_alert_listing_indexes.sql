@@ -0,0 +1,14 @@
+-- Composite indexes for keyset-paginated alert listing: ORDER BY triggered_at DESC, id DESC
+-- with an optional equality filter. They supersede the single-column indexes below.
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_triggered_id ON public.safety_alerts (triggered_at, id);
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_status_triggered ON public.safety_alerts (status, triggered_at, id);
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_type_triggered ON public.safety_alerts (type, triggered_at, id);
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_severity_triggered ON public.safety_alerts (severity, triggered_at, id);
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_profile_triggered ON public.safety_alerts (tourist_profile_id, triggered_at, id);
+CREATE INDEX IF NOT EXISTS ix_safety_alerts_code_triggered ON public.safety_alerts (tourist_id_code, triggered_at, id);
+
+DROP INDEX IF EXISTS public.ix_safety_alerts_triggered_at;
+DROP INDEX IF EXISTS public.ix_safety_alerts_status;
+DROP INDEX IF EXISTS public.ix_safety_alerts_type;
+DROP INDEX IF EXISTS public.ix_safety_alerts_severity;
+DROP INDEX IF EXISTS public.ix_safety_alerts_tourist_id_code;
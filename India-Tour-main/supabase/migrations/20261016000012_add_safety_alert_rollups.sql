@@ -0,0 +1,27 @@
+-- Hourly alert counts behind GET /api/alerts/stats, kept current by the safety API
+CREATE TABLE IF NOT EXISTS public.safety_alert_rollups (
+  id BIGSERIAL PRIMARY KEY,
+  bucket_start TIMESTAMP NOT NULL,
+  severity VARCHAR(16) NOT NULL,
+  type VARCHAR(32) NOT NULL,
+  status VARCHAR(16) NOT NULL,
+  city VARCHAR(128) NOT NULL DEFAULT '',
+  count INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT uq_safety_alert_rollups_bucket_key UNIQUE (bucket_start, severity, type, status, city)
+);
+
+CREATE INDEX IF NOT EXISTS ix_safety_alert_rollups_bucket_start ON public.safety_alert_rollups (bucket_start);
+
+-- Backfill from existing alerts
+INSERT INTO public.safety_alert_rollups (bucket_start, severity, type, status, city, count)
+SELECT
+  date_trunc('hour', triggered_at),
+  severity,
+  type,
+  COALESCE(status, 'new'),
+  LEFT(COALESCE(NULLIF(extra_data->>'zone_city', ''), NULLIF(extra_data->>'city', ''), ''), 128),
+  COUNT(*)
+FROM public.safety_alerts
+WHERE triggered_at IS NOT NULL
+GROUP BY 1, 2, 3, 4, 5
+ON CONFLICT (bucket_start, severity, type, status, city) DO UPDATE SET count = EXCLUDED.count;
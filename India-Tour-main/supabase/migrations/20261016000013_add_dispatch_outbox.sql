@@ -0,0 +1,16 @@
+-- Transactional outbox for panic notifications, drained by safety API workers
+CREATE TABLE IF NOT EXISTS public.dispatch_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  kind VARCHAR(32) NOT NULL,
+  alert_id BIGINT REFERENCES public.safety_alerts(id) ON DELETE CASCADE,
+  payload JSONB,
+  status VARCHAR(16) NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+  last_error TEXT,
+  created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+  sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_dispatch_outbox_status_next_attempt ON public.dispatch_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_dispatch_outbox_alert_id ON public.dispatch_outbox (alert_id);
@@ -0,0 +1,2 @@
+-- Notification channels already delivered for an outbox row; retries skip them
+ALTER TABLE public.dispatch_outbox ADD COLUMN IF NOT EXISTS delivered_channels JSONB;
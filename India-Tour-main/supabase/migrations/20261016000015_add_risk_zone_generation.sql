@@ -0,0 +1,13 @@
+-- Zone-set generation counter: bumped by the safety API with every risk zone write,
+-- zone download ETags are derived from it
+CREATE TABLE IF NOT EXISTS public.risk_zone_generation (
+  id INTEGER PRIMARY KEY,
+  generation BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+INSERT INTO public.risk_zone_generation (id, generation) VALUES (1, 1)
+ON CONFLICT (id) DO NOTHING;
+
+-- Delta sync (?since=) reads zones by last write
+CREATE INDEX IF NOT EXISTS ix_risk_zones_updated_at ON public.risk_zones (updated_at);
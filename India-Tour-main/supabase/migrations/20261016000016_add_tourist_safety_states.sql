@@ -0,0 +1,9 @@
+-- Per-tourist safety score accumulator, maintained by the safety API on every alert write.
+-- Rows are seeded from safety_alerts the first time a tourist's score is read or changes.
+CREATE TABLE IF NOT EXISTS public.tourist_safety_states (
+  tourist_profile_id BIGINT PRIMARY KEY REFERENCES public.tourist_profiles(id) ON DELETE CASCADE,
+  buckets JSONB NOT NULL DEFAULT '{}'::jsonb,
+  open_panics JSONB NOT NULL DEFAULT '{}'::jsonb,
+  last_alert_at TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
@@ -0,0 +1,15 @@
+-- Tourist ID code numbers (TR-000123) for the safety API. Each API worker reserves a block
+-- of values with nextval() and hands them out in memory, so concurrent registrations no
+-- longer race on "highest id + 1". Starts after the highest code already issued.
+CREATE SEQUENCE IF NOT EXISTS public.tourist_id_code_seq;
+
+SELECT setval(
+  'public.tourist_id_code_seq',
+  COALESCE(
+    (SELECT MAX(substr(tourist_id_code, 4)::bigint)
+     FROM public.tourist_profiles
+     WHERE tourist_id_code ~ '^TR-[0-9]+$'),
+    0
+  ) + 1,
+  false
+);
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl
-from typing import List
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     SUPABASE_JWT_AUDIENCE: str | None = None
     SUPABASE_JWT_ISSUER: str | None = None
     SUPABASE_JWT_SECRET: str | None = None  # optional if using public key verification later
+    SAFETY_AUTH_CACHE_ENTRIES: int = 10000  # verified tokens kept per worker (0 disables)
+    SAFETY_AUTH_CACHE_MAX_TTL_SECONDS: float = 300.0  # re-verify at least this often, even before exp
 
     # Admin configuration
     SAFETY_ADMIN_EMAILS: List[str] = []
@@ -23,14 +25,85 @@ class Settings(BaseSettings):
     # Simple field-level encryption key for sensitive profile fields
     SAFETY_ENCRYPTION_KEY: str | None = None
 
-    # Optional real alert dispatch configuration (SMS / email)
+    # Optional real alert dispatch configuration (SMS / email / police webhook)
     SAFETY_DISPATCH_ENABLED: bool = False
-    SAFETY_DISPATCH_PROVIDER: str | None = None  # e.g. "twilio" or "sendgrid"
+    SAFETY_DISPATCH_PROVIDER: str | None = None  # legacy single provider: "twilio" or "sendgrid"
+    # Channels notified in parallel; unset means every channel that is configured below
+    SAFETY_DISPATCH_CHANNELS: Optional[List[Literal["sms", "email", "police_webhook", "stub"]]] = None
     TWILIO_ACCOUNT_SID: str | None = None
     TWILIO_AUTH_TOKEN: str | None = None
     TWILIO_FROM_NUMBER: str | None = None
     SENDGRID_API_KEY: str | None = None
     SAFETY_DISPATCH_FROM_EMAIL: str | None = None
+    SAFETY_DISPATCH_ALERT_EMAILS: List[str] = []  # ops desk recipients of panic emails
+    SAFETY_POLICE_WEBHOOK_URL: str | None = None
+    SAFETY_POLICE_WEBHOOK_TOKEN: str | None = None
+    SAFETY_DISPATCH_STUB_URL: str | None = None  # local stub provider for offline benchmarks
+    SAFETY_DISPATCH_SMS_TIMEOUT_SECONDS: float = 5.0
+    SAFETY_DISPATCH_EMAIL_TIMEOUT_SECONDS: float = 10.0
+    SAFETY_DISPATCH_WEBHOOK_TIMEOUT_SECONDS: float = 3.0
+    SAFETY_DISPATCH_POOL_SIZE: int = 20  # keep-alive connections per channel
+
+    # Panic dispatch outbox: background workers deliver rows written with the alert
+    SAFETY_DISPATCH_WORKERS: int = 2  # 0 leaves the outbox for another process to drain
+    SAFETY_DISPATCH_POLL_SECONDS: float = 2.0
+    SAFETY_DISPATCH_MAX_ATTEMPTS: int = 8  # then the row is dead-lettered
+    SAFETY_DISPATCH_BACKOFF_SECONDS: float = 2.0  # doubled per attempt
+    SAFETY_DISPATCH_BACKOFF_MAX_SECONDS: float = 600.0
+    SAFETY_DISPATCH_LEASE_SECONDS: float = 60.0  # a claimed row is retried if not finished by then
+
+    # Geofencing: in-process spatial index over active risk zones
+    SAFETY_ZONE_INDEX_CELL_DEG: float = 0.05  # ~5.5 km grid cells
+    SAFETY_ZONE_INDEX_TTL_SECONDS: float = 30.0  # picks up zone edits made by other workers
+    SAFETY_ZONE_CODEC_CACHE_ENTRIES: int = 10000  # encoded zone records for binary zone downloads
+    SAFETY_ZONE_DELTA_OVERLAP_SECONDS: float = 5.0  # zone deltas re-read this far behind the cursor
+
+    # Optional write-behind persistence of raw location fixes
+    SAFETY_LOCATION_WRITE_BEHIND: bool = False
+    SAFETY_LOCATION_WRITE_BATCH_SIZE: int = 500
+    SAFETY_LOCATION_WRITE_FLUSH_MS: int = 200
+    SAFETY_LOCATION_WRITE_QUEUE_MAX: int = 20000
+    SAFETY_LOCATION_WRITE_ENQUEUE_TIMEOUT_MS: int = 100
+
+    # Trajectory thinning: skip storing fixes that only repeat the last stored point
+    SAFETY_LOCATION_THINNING: bool = False
+    SAFETY_LOCATION_THIN_MIN_DISTANCE_M: float = 25.0
+    SAFETY_LOCATION_THIN_MAX_INTERVAL_SECONDS: float = 300.0  # always keep one fix per interval
+    SAFETY_LOCATION_THIN_KEEP_SOURCES: List[str] = ["manual", "panic"]
+
+    # Time-partitioned location history. On Postgres partitions are managed whenever the
+    # migration has converted tourist_locations; elsewhere the flag enables table-per-period.
+    SAFETY_LOCATION_PARTITIONING: bool = False
+    SAFETY_LOCATION_PARTITION_PERIOD: Literal["day", "week"] = "week"
+    SAFETY_LOCATION_PARTITION_PREMAKE: int = 2  # future periods created ahead of time
+    SAFETY_LOCATION_RETENTION_DAYS: int = 90
+
+    # Analytics heatmap tiles: cached (tile, hour) counts
+    SAFETY_HEATMAP_CACHE_ENTRIES: int = 20000
+    SAFETY_HEATMAP_OPEN_TTL_SECONDS: float = 30.0  # the current hour is recomputed this often
+    SAFETY_HEATMAP_LOCATION_TTL_SECONDS: float = 900.0  # past location hours too (writes from other processes)
+
+    # Nearby-tourist queries: in-process grid over tourist_last_locations
+    SAFETY_NEARBY_CELL_DEG: float = 0.02  # ~2.2 km grid cells
+    SAFETY_NEARBY_SYNC_SECONDS: float = 1.0  # changed rows are read at most this often
+    SAFETY_NEARBY_SYNC_OVERLAP_SECONDS: float = 2.0  # re-read window for late-committing writes
+    SAFETY_NEARBY_REBUILD_SECONDS: float = 600.0  # full rebuild drops stale and deleted tourists
+    SAFETY_NEARBY_MAX_AGE_HOURS: float = 24.0  # older positions are not indexed
+
+    # Active profile lookups by user_id / tourist_id_code (services.profile_cache)
+    SAFETY_PROFILE_CACHE_ENTRIES: int = 20000
+    SAFETY_PROFILE_CACHE_TTL_SECONDS: float = 30.0  # bounds staleness after writes on other workers
+
+    # Tourist ID codes: numbers reserved from the database per block, handed out in memory
+    SAFETY_TOURIST_CODE_BLOCK_SIZE: int = 50
+
+    # Fleet-wide safety score recomputation (jobs.recompute_safety_scores)
+    SAFETY_SCORE_BATCH_SIZE: int = 5000  # alert rows per fetch from the server-side cursor
+    SAFETY_SCORE_BATCH_WORKERS: int = 1  # > 1 shards profiles (id % workers) across processes
+
+    # Rate limiting: "memory" is per worker, "database" shares buckets across workers
+    SAFETY_RATE_LIMIT_BACKEND: Literal["memory", "database"] = "memory"
+    SAFETY_RATE_LIMIT_MAX_KEYS: int = 100000  # in-memory backend cap (LRU)
 
     class Config:
         env_file = ".env"
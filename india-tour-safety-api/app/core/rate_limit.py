@@ -0,0 +1,219 @@
+"""Token-bucket rate limiting with pluggable backends.
+
+Each limiter allows bursts of up to ``capacity`` calls and refills at
+``capacity / per_seconds`` tokens per second, so sustained traffic is held
+to the same "N calls per window" the old sliding-window deques enforced.
+A bucket is two floats, and a bucket that has been idle long enough to
+refill completely carries no information, so backends evict it.
+
+Backends (``SAFETY_RATE_LIMIT_BACKEND``):
+
+* ``memory`` – per-process LRU of buckets. Limits are per worker.
+* ``database`` – one row per active key in ``rate_limit_buckets``, updated
+  with a single atomic upsert, so limits hold across ``uvicorn --workers``
+  and hosts sharing the database.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from time import monotonic, time
+from typing import Any, Dict, List, Optional, Protocol
+
+from fastapi import HTTPException
+from sqlalchemy import case, delete
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+
+class RateLimitBackend(Protocol):
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0.0 if allowed, else seconds until it would be."""
+
+    def reset(self, key: str) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class MemoryRateLimitBackend:
+    """In-process buckets in an LRU, evicted once idle long enough to be full again."""
+
+    def __init__(self, max_keys: int = 100_000, clock=monotonic):  # noqa: ANN001
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [tokens, updated_at, full_at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        with self._lock:
+            now = self.clock()
+            self._evict_idle(now)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+                self._buckets.move_to_end(key)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            full_at = now + (capacity - tokens) / refill_per_second
+            if bucket is None:
+                self._buckets[key] = [tokens, now, full_at]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self._evicted += 1
+            else:
+                bucket[:] = [tokens, now, full_at]
+            return 0.0 if allowed else (cost - tokens) / refill_per_second
+
+    def _evict_idle(self, now: float) -> None:
+        # LRU order approximates full_at order; stopping at the first live bucket keeps this O(1) amortized
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                return
+            del self._buckets[key]
+            self._evicted += 1
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._buckets), "evicted_total": self._evicted}
+
+
+class DatabaseRateLimitBackend:
+    """Buckets shared through the ``rate_limit_buckets`` table.
+
+    Each acquire is one ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``
+    statement that refills, decides and deducts in the database, so
+    concurrent workers never read-modify-write the same bucket. Rows whose
+    bucket would be full again are deleted every ``cleanup_interval`` seconds.
+    """
+
+    def __init__(self, engine: Engine, cleanup_interval: float = 60.0, clock=time):  # noqa: ANN001
+        from .. import models
+        from ..db import upsert_insert
+
+        dialect_insert = upsert_insert(engine)
+        if dialect_insert is None:
+            raise ValueError(f"Database rate limiting is not supported on {engine.dialect.name}")
+
+        self.engine = engine
+        self.table = models.RateLimitBucket.__table__
+        self.cleanup_interval = cleanup_interval
+        self.clock = clock
+        self._insert = dialect_insert
+        self._next_cleanup = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = self.clock()
+        t = self.table
+        refilled_raw = t.c.tokens + (now - t.c.updated_at) * refill_per_second
+        refilled = case((refilled_raw >= capacity, capacity), else_=refilled_raw)
+        allowed = refilled >= cost
+        tokens = case((allowed, refilled - cost), else_=refilled)
+
+        stmt = self._insert(t).values(
+            key=key,
+            tokens=capacity - cost,
+            updated_at=now,
+            full_at=now + cost / refill_per_second,
+            last_allowed=capacity >= cost,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.key],
+            set_={
+                "tokens": tokens,
+                "updated_at": now,
+                "full_at": now + (capacity - tokens) / refill_per_second,
+                "last_allowed": allowed,
+            },
+        ).returning(t.c.tokens, t.c.last_allowed)
+
+        with self.engine.begin() as conn:
+            remaining, was_allowed = conn.execute(stmt).one()
+        self._maybe_cleanup(now)
+        return 0.0 if was_allowed else (cost - remaining) / refill_per_second
+
+    def _maybe_cleanup(self, now: float) -> None:
+        with self._lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + self.cleanup_interval
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.full_at <= now))
+
+    def reset(self, key: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.key == key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "database"}
+
+
+_backend: Optional[RateLimitBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.SAFETY_RATE_LIMIT_BACKEND == "database":
+                    from ..db import engine
+
+                    _backend = DatabaseRateLimitBackend(engine)
+                else:
+                    _backend = MemoryRateLimitBackend(max_keys=settings.SAFETY_RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+
+class RateLimiter:
+    """A named limit ("N calls per window") applied per key."""
+
+    def __init__(
+        self,
+        name: str,
+        max_calls: int,
+        window_seconds: float,
+        detail: str = "Too many requests, please slow down.",
+        backend: Optional[RateLimitBackend] = None,
+    ):
+        self.name = name
+        self.capacity = float(max_calls)
+        self.refill_per_second = max_calls / window_seconds
+        self.detail = detail
+        self._backend = backend
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        return self._backend or get_rate_limit_backend()
+
+    def _key(self, key: object) -> str:
+        return f"{self.name}:{key}"
+
+    def check(self, key: object) -> None:
+        """Consume one call for ``key`` or raise 429 with a Retry-After header."""
+
+        retry_after = self.backend.acquire(self._key(key), self.capacity, self.refill_per_second)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail=self.detail,
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
+
+    def reset(self, key: object) -> None:
+        self.backend.reset(self._key(key))
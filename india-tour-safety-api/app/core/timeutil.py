@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+
+
+def naive_utc(ts: datetime) -> datetime:
+    """``ts`` as a naive UTC datetime, the form every timestamp column is stored in.
+
+    Aware values are converted to UTC first; naive values are taken to be UTC
+    already. Compare or subtract client timestamps only after this.
+    """
+
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
@@ -0,0 +1,78 @@
+"""Per-process cache of verified JWTs.
+
+Verifying an HS256 token (base64 decoding, JSON parsing, HMAC and claim
+checks) is a measurable share of a cheap request such as a location ping,
+and clients send the same token for its whole lifetime. Successful
+verifications are kept in an LRU keyed by the SHA-256 of the token (the
+token itself is not stored) until the token's ``exp``, capped at
+``SAFETY_AUTH_CACHE_MAX_TTL_SECONDS`` so a change to the JWT settings made
+on the running ``settings`` object reaches cached tokens within that time.
+The admin list is different: ``deps`` reads ``SAFETY_ADMIN_EMAILS`` once at
+import, so adding or removing an admin takes a restart (which also empties
+this cache). Failed verifications are never cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from time import time
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class VerifiedTokenCache:
+    """LRU of ``token hash -> (expires_at, (user_id, role))``; times are Unix epoch seconds."""
+
+    def __init__(self, max_entries: int = 10_000, max_ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[float, Tuple[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: bytes, now: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        now = time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: bytes, identity: Tuple[str, str], exp: Any = None, now: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        now = time() if now is None else now
+        expires_at = now + self.max_ttl
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits_total": self._hits, "misses_total": self._misses}
+
+
+verified_tokens = VerifiedTokenCache(settings.SAFETY_AUTH_CACHE_ENTRIES, settings.SAFETY_AUTH_CACHE_MAX_TTL_SECONDS)
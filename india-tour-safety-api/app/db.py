@@ -1,4 +1,7 @@
+from typing import Any, Callable, Optional, Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from .core.config import settings
@@ -12,6 +15,18 @@ engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def upsert_insert(bind: Union[Connection, Engine]) -> Optional[Callable[..., Any]]:
+    """The dialect's ``insert`` (with ``on_conflict_do_update``/``_nothing``), or None if it has none."""
+
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
 def get_db():
     from sqlalchemy.orm import Session
 
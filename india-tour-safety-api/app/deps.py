@@ -2,8 +2,17 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status, Header
 from jose import jwt, JWTError
+from sqlalchemy.orm import Session
 
+from . import models
 from .core.config import settings
+from .core.token_cache import token_key, verified_tokens
+from .db import get_db
+from .services.profile_cache import profile_cache
+
+
+# Settings are fixed for the life of the process
+_ADMIN_EMAILS = frozenset(settings.SAFETY_ADMIN_EMAILS or [])
 
 
 class CurrentUser:
@@ -21,27 +30,38 @@ def _demo_user() -> CurrentUser:
     return CurrentUser(user_id="demo-user", role="tourist")
 
 
-def get_current_user(authorization: str | None = Header(default=None, alias="Authorization")) -> CurrentUser:
-    """Resolve the current user.
+def bearer_token(authorization: str | None) -> str | None:
+    """The token of an ``Authorization: Bearer ...`` header value, if that is what it is."""
 
-    - If SUPABASE_JWT_SECRET is **not** configured: return a demo user so that
-      local development works without auth.
-    - If SUPABASE_JWT_SECRET **is** configured: require a valid Bearer token
-      and raise 401 on missing/invalid credentials.
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return authorization.split(" ", 1)[1]
+
+
+def authenticate_token(token: str | None) -> CurrentUser:
+    """Resolve a user from a raw JWT (without the ``Bearer`` prefix).
+
+    Shared by the Authorization-header dependency (and so the SSE alert
+    stream) and transports that cannot send headers (the WebSocket location
+    stream passes ``?token=``). Follows the same rules as
+    ``get_current_user``. Verified tokens are cached until they expire (see
+    ``core.token_cache``), so a client's repeated requests skip the decode.
     """
 
     # Auth not configured yet: keep previous relaxed behaviour
     if not settings.SUPABASE_JWT_SECRET:
         return _demo_user()
 
-    # Auth configured: enforce proper Bearer token
-    if not authorization or not authorization.startswith("Bearer "):
+    if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
         )
 
-    token = authorization.split(" ", 1)[1]
+    key = token_key(token)
+    cached = verified_tokens.get(key)
+    if cached is not None:
+        return CurrentUser(user_id=cached[0], role=cached[1])
 
     try:
         payload = jwt.decode(
@@ -67,15 +87,27 @@ def get_current_user(authorization: str | None = Header(default=None, alias="Aut
     email = payload.get("email")
     role_claim = payload.get("role")
 
-    admin_emails = set(settings.SAFETY_ADMIN_EMAILS or [])
-    if email and email in admin_emails:
+    if email and email in _ADMIN_EMAILS:
         role = "admin"
     else:
         role = role_claim or "tourist"
 
+    verified_tokens.put(key, (str(user_id), role), payload.get("exp"))
     return CurrentUser(user_id=str(user_id), role=role)
 
 
+def get_current_user(authorization: str | None = Header(default=None, alias="Authorization")) -> CurrentUser:
+    """Resolve the current user.
+
+    - If SUPABASE_JWT_SECRET is **not** configured: return a demo user so that
+      local development works without auth.
+    - If SUPABASE_JWT_SECRET **is** configured: require a valid Bearer token
+      and raise 401 on missing/invalid credentials.
+    """
+
+    return authenticate_token(bearer_token(authorization))
+
+
 def require_admin(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if user.role != "admin":
         raise HTTPException(
@@ -83,3 +115,16 @@ def require_admin(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
             detail="Admin privileges required",
         )
     return user
+
+
+def get_active_profile(
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+) -> Optional[models.TouristProfile]:
+    """The current user's active tourist profile, or None.
+
+    The user -> profile id mapping comes from ``services.profile_cache``, so
+    this is usually a primary-key load (or an identity-map hit).
+    """
+
+    return profile_cache.load_by_user(db, user.id)
@@ -0,0 +1,157 @@
+"""Offline Douglas–Peucker compaction of historical location tracks.
+
+Ingest-time thinning only drops fixes that repeat the last stored point;
+this job additionally removes points that lie within ``epsilon_m`` of the
+simplified track, so storage follows actual movement rather than ping rate.
+
+Run from the project root (india-tour-safety-api), e.g. nightly:
+
+    python -m app.jobs.compact_tracks --older-than-days 2 --lookback-days 7 --epsilon-m 15
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import Table, delete, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db import SessionLocal
+from ..services.geometry import douglas_peucker
+from ..services.location_partitions import location_partitions
+from ..services.location_rules import INACTIVITY_GAP
+
+
+_DELETE_CHUNK = 1000
+
+
+def track_keep_mask(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    recorded_at: Sequence[datetime],
+    sources: Sequence[str | None],
+    epsilon_m: float,
+    max_gap: timedelta = INACTIVITY_GAP,
+) -> np.ndarray:
+    """Keep-mask for one time-ordered track.
+
+    The track is split wherever two fixes are more than ``max_gap`` apart, so
+    the fixes on both sides of an inactivity gap survive, and fixes from the
+    thinning keep-sources (manual check-ins, panic) are never removed.
+    """
+
+    n = len(lats)
+    keep = np.zeros(n, dtype=bool)
+    start = 0
+    for i in range(1, n + 1):
+        if i == n or recorded_at[i] - recorded_at[i - 1] > max_gap:
+            keep[start:i] = douglas_peucker(lats[start:i], lngs[start:i], epsilon_m)
+            start = i
+
+    keep_sources = set(settings.SAFETY_LOCATION_THIN_KEEP_SOURCES)
+    for i, source in enumerate(sources):
+        if source in keep_sources:
+            keep[i] = True
+    return keep
+
+
+def compact_profile_window(
+    db: Session,
+    profile_id: int,
+    start: datetime,
+    end: datetime,
+    epsilon_m: float,
+) -> tuple[int, int]:
+    """Compact one tourist's fixes in [start, end). Returns (scanned, deleted)."""
+
+    rows = []
+    for table in location_partitions.tables_for_range(db, start, end):
+        rows.extend(
+            (table, *row)
+            for row in db.execute(
+                select(table.c.id, table.c.lat, table.c.lng, table.c.recorded_at, table.c.source).where(
+                    table.c.tourist_profile_id == profile_id,
+                    table.c.recorded_at >= start,
+                    table.c.recorded_at < end,
+                )
+            ).all()
+        )
+    if len(rows) < 3:
+        return len(rows), 0
+    rows.sort(key=lambda row: (row[4], row[1]))
+
+    tables, ids, lats, lngs, recorded_at, sources = zip(*rows)
+    keep = track_keep_mask(lats, lngs, recorded_at, sources, epsilon_m)
+    drop: Dict[Table, List[int]] = {}
+    for table, row_id, kept in zip(tables, ids, keep):
+        if not kept:
+            drop.setdefault(table, []).append(row_id)
+
+    for table, table_ids in drop.items():
+        for i in range(0, len(table_ids), _DELETE_CHUNK):
+            db.execute(delete(table).where(table.c.id.in_(table_ids[i : i + _DELETE_CHUNK])))
+    return len(rows), sum(len(table_ids) for table_ids in drop.values())
+
+
+def compact_tracks(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    epsilon_m: float,
+    window: timedelta = timedelta(days=1),
+) -> Dict[str, int]:
+    """Compact every tourist's track between ``start`` and ``end``, one window at a time."""
+
+    stats = {"profiles": 0, "scanned": 0, "deleted": 0}
+    profile_ids = set()
+    for table in location_partitions.tables_for_range(db, start, end):
+        profile_ids.update(
+            db.execute(
+                select(table.c.tourist_profile_id)
+                .where(table.c.recorded_at >= start, table.c.recorded_at < end)
+                .distinct()
+            ).scalars()
+        )
+
+    for profile_id in sorted(profile_ids):
+        stats["profiles"] += 1
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + window, end)
+            scanned, deleted = compact_profile_window(db, profile_id, window_start, window_end, epsilon_m)
+            stats["scanned"] += scanned
+            stats["deleted"] += deleted
+            window_start = window_end
+        db.commit()
+
+    return stats
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=float, default=2.0, help="leave recent tracks untouched")
+    parser.add_argument("--lookback-days", type=float, default=7.0, help="how far back to compact")
+    parser.add_argument("--epsilon-m", type=float, default=15.0, help="max deviation from the simplified track")
+    args = parser.parse_args(argv)
+
+    end = datetime.utcnow() - timedelta(days=args.older_than_days)
+    start = end - timedelta(days=args.lookback_days)
+
+    db = SessionLocal()
+    try:
+        stats = compact_tracks(db, start, end, args.epsilon_m)
+    finally:
+        db.close()
+    print(  # noqa: T201
+        f"[COMPACT] {start.isoformat()} .. {end.isoformat()}: "
+        f"{stats['profiles']} tourists, {stats['scanned']} fixes scanned, {stats['deleted']} removed",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Drain the panic dispatch outbox outside the API process.
+
+API processes drain ``dispatch_outbox`` themselves unless started with
+``SAFETY_DISPATCH_WORKERS=0``; this job is for deployments that prefer a
+dedicated worker, and for operating on dead-lettered rows.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m app.jobs.dispatch_worker               # run until interrupted
+    python -m app.jobs.dispatch_worker --once        # deliver what is due now, then exit
+    python -m app.jobs.dispatch_worker --requeue-dead
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+from typing import Sequence
+
+from ..db import SessionLocal
+from ..routers import incidents  # noqa: F401  (registers the panic handler)
+from ..services.dispatch_outbox import dispatch_outbox
+from ..services.notify import notifier
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="deliver rows that are due now and exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="reset dead-lettered rows to pending and exit")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads (default SAFETY_DISPATCH_WORKERS)")
+    args = parser.parse_args(argv)
+
+    if args.requeue_dead:
+        db = SessionLocal()
+        try:
+            count = dispatch_outbox.requeue_dead(db)
+        finally:
+            db.close()
+        print(f"[DISPATCH] Requeued {count} dead-lettered rows", flush=True)  # noqa: T201
+        return
+
+    if args.once:
+        total = 0
+        try:
+            while True:
+                claimed = dispatch_outbox.run_once()
+                total += claimed
+                if claimed < dispatch_outbox.batch_size:
+                    break
+        finally:
+            notifier.stop()
+        print(f"[DISPATCH] Processed {total} outbox rows: {dispatch_outbox.stats()}", flush=True)  # noqa: T201
+        return
+
+    dispatch_outbox.workers = max(1, args.workers or dispatch_outbox.workers)
+    dispatch_outbox.start()
+    print(f"[DISPATCH] Draining outbox with {dispatch_outbox.workers} workers", flush=True)  # noqa: T201
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispatch_outbox.stop()
+        notifier.stop()
+        print(f"[DISPATCH] Stopped: {dispatch_outbox.stats()}", flush=True)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
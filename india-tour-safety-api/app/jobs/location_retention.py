@@ -0,0 +1,53 @@
+"""Location history retention and partition upkeep.
+
+Creates the upcoming partitions ahead of time and removes history older
+than ``SAFETY_LOCATION_RETENTION_DAYS``. With partitioning on, whole
+partitions are dropped (instant, no table bloat) rather than deleting
+rows; partitions straddling the cutoff are kept until they fall entirely
+behind it.
+
+Run from the project root (india-tour-safety-api), e.g. daily:
+
+    python -m app.jobs.location_retention --retention-days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, Sequence
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db import SessionLocal
+from ..services.location_partitions import location_partitions
+
+
+def apply_retention(db: Session, retention_days: float, now: datetime | None = None) -> Dict[str, Any]:
+    now = now or datetime.utcnow()
+    location_partitions.premake(db.get_bind(), now)
+    result = location_partitions.drop_before(db, now - timedelta(days=retention_days))
+    db.commit()
+    return result
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=float, default=float(settings.SAFETY_LOCATION_RETENTION_DAYS))
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        result = apply_retention(db, args.retention_days)
+    finally:
+        db.close()
+    print(  # noqa: T201
+        f"[RETENTION] mode={result['mode']}: dropped {len(result['dropped_partitions'])} partitions "
+        f"({', '.join(result['dropped_partitions']) or '-'}), deleted {result['deleted_rows']} rows",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Hourly per-tourist movement rollups for analytics.
+
+For every tourist and hour this writes one ``tourist_location_rollups`` row
+with the fix count, the centroid, and the distance travelled (the sum of
+hops between consecutive fixes inside the hour). Re-running over the same
+hours replaces their rows, so the job is safe to schedule with overlap.
+
+Run from the project root (india-tour-safety-api), e.g. hourly:
+
+    python -m app.jobs.location_rollups --hours 3
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import SessionLocal
+from ..services.geometry import haversine_m
+from ..services.location_partitions import location_partitions
+
+
+def summarize_hours(
+    profile_ids: Sequence[int],
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    recorded_at: Sequence[datetime],
+) -> List[Dict[str, Any]]:
+    """Group fixes by (tourist, hour) and summarize each group.
+
+    Inputs may be in any order; the work is a sort plus a handful of
+    ``np.add.reduceat`` calls, independent of the number of groups.
+    """
+
+    n = len(profile_ids)
+    if n == 0:
+        return []
+
+    pids = np.asarray(profile_ids, dtype=np.int64)
+    ts = np.asarray(recorded_at, dtype="datetime64[us]")
+    order = np.lexsort((ts, pids))
+    pids, ts = pids[order], ts[order]
+    lats = np.asarray(lats, dtype=float)[order]
+    lngs = np.asarray(lngs, dtype=float)[order]
+    hours = ts.astype("datetime64[h]")
+
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = (pids[1:] != pids[:-1]) | (hours[1:] != hours[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], n)
+
+    # hop i -> i+1 is credited to fix i+1, and zeroed where a new group starts
+    hops = np.zeros(n)
+    hops[1:] = haversine_m(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+    hops[boundary] = 0.0
+
+    counts = ends - starts
+    centroid_lat = np.add.reduceat(lats, starts) / counts
+    centroid_lng = np.add.reduceat(lngs, starts) / counts
+    distance = np.add.reduceat(hops, starts)
+
+    return [
+        {
+            "tourist_profile_id": int(pids[s]),
+            "hour_start": hours[s].item(),
+            "fix_count": int(count),
+            "centroid_lat": float(c_lat),
+            "centroid_lng": float(c_lng),
+            "distance_m": float(dist),
+            "first_recorded_at": ts[s].item(),
+            "last_recorded_at": ts[e - 1].item(),
+        }
+        for s, e, count, c_lat, c_lng, dist in zip(starts, ends, counts, centroid_lat, centroid_lng, distance)
+    ]
+
+
+def rollup_hours(db: Session, start: datetime, end: datetime) -> Dict[str, int]:
+    """(Re)build rollups for every whole hour in [start, end)."""
+
+    start = start.replace(minute=0, second=0, microsecond=0)
+    end = end.replace(minute=0, second=0, microsecond=0)
+
+    profile_ids: List[int] = []
+    codes: Dict[int, str] = {}
+    lats: List[float] = []
+    lngs: List[float] = []
+    recorded_at: List[datetime] = []
+    for table in location_partitions.tables_for_range(db, start, end):
+        rows = db.execute(
+            select(
+                table.c.tourist_profile_id,
+                table.c.tourist_id_code,
+                table.c.lat,
+                table.c.lng,
+                table.c.recorded_at,
+            ).where(table.c.recorded_at >= start, table.c.recorded_at < end)
+        ).all()
+        for profile_id, code, lat, lng, ts in rows:
+            profile_ids.append(profile_id)
+            codes[profile_id] = code
+            lats.append(lat)
+            lngs.append(lng)
+            recorded_at.append(ts)
+
+    summaries = summarize_hours(profile_ids, lats, lngs, recorded_at)
+    for summary in summaries:
+        summary["tourist_id_code"] = codes[summary["tourist_profile_id"]]
+
+    rollup = models.TouristLocationRollup
+    db.execute(delete(rollup).where(rollup.hour_start >= start, rollup.hour_start < end))
+    if summaries:
+        db.execute(insert(rollup), summaries)
+    db.commit()
+    return {"fixes": len(profile_ids), "rollups": len(summaries)}
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=int, default=3, help="number of completed hours to (re)build")
+    args = parser.parse_args(argv)
+
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(hours=args.hours)
+
+    db = SessionLocal()
+    try:
+        stats = rollup_hours(db, start, end)
+    finally:
+        db.close()
+    print(  # noqa: T201
+        f"[ROLLUP] {start.isoformat()} .. {end.isoformat()}: "
+        f"{stats['fixes']} fixes -> {stats['rollups']} hourly rollups",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Recompute ``safety_alert_rollups`` from safety_alerts.
+
+The rollups are maintained incrementally as alerts are written, so this is
+only needed after loading alerts outside the API (bulk imports, manual SQL)
+or to verify the counts. It replaces every bucket from ``--since`` onwards
+(all of them by default) in one transaction; alert writes that land while
+it runs are counted by whichever of the two commits last, so run it when
+alert traffic is quiet.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m app.jobs.rebuild_alert_rollups --since 2026-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import SessionLocal
+from ..services.alert_events import snapshot
+from ..services.alert_rollups import hour_bucket, rollup_key
+
+
+def rebuild_alert_rollups(db: Session, since: Optional[datetime] = None) -> Dict[str, int]:
+    alert = models.SafetyAlert
+    rollup = models.SafetyAlertRollup
+    since = hour_bucket(since) if since else None
+
+    stmt = select(
+        alert.tourist_profile_id, alert.type, alert.severity, alert.status, alert.triggered_at, alert.extra_data
+    )
+    if since:
+        stmt = stmt.where(alert.triggered_at >= since)
+
+    counts: Counter = Counter()
+    alerts = 0
+    for row in db.execute(stmt.execution_options(yield_per=5000)):
+        key = rollup_key(snapshot(row))
+        if key is not None:
+            counts[key] += 1
+            alerts += 1
+
+    clear = delete(rollup)
+    if since:
+        clear = clear.where(rollup.bucket_start >= since)
+    db.execute(clear)
+    rows = [
+        {"bucket_start": b, "severity": sev, "type": typ, "status": st, "city": city, "count": count}
+        for (b, sev, typ, st, city), count in counts.items()
+    ]
+    if rows:
+        db.execute(insert(rollup), rows)
+    db.commit()
+    return {"alerts": alerts, "rollups": len(rows)}
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--since", type=datetime.fromisoformat, default=None, help="only rebuild buckets from this UTC time on"
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        stats = rebuild_alert_rollups(db, args.since)
+    finally:
+        db.close()
+    print(  # noqa: T201
+        f"[ALERT-ROLLUP] {stats['alerts']} alerts -> {stats['rollups']} rollup rows"
+        + (f" since {args.since.isoformat()}" if args.since else ""),
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
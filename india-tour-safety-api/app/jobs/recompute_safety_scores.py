@@ -0,0 +1,44 @@
+"""Recompute ``safety_score`` for every active tourist profile.
+
+Scores are otherwise refreshed when a tourist opens the app; this brings the
+whole fleet up to date (for sorting and triage in the ops dashboards) in one
+pass over the last 14 days of alerts. See ``services.safety_score_batch``.
+``--workers`` shards the profiles across that many processes.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m app.jobs.recompute_safety_scores --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Sequence
+
+from ..core.config import settings
+from ..db import SessionLocal
+from ..services.safety_score_batch import recompute_safety_scores
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.SAFETY_SCORE_BATCH_WORKERS)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.SAFETY_SCORE_BATCH_SIZE, help="alert rows per cursor fetch"
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        stats = recompute_safety_scores(db, workers=args.workers, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(  # noqa: T201
+        f"[SAFETY-SCORE] {stats['profiles']} profiles, {stats['alerts']} alerts -> "
+        f"{stats['updated']} updated in {stats['total_seconds']}s ({stats['workers']} workers)",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,13 @@ import os
 
 from .core.config import settings
 from .db import Base, engine
-from .routers import tourists, risk_zones, locations, incidents, alerts, itinerary
+from .routers import tourists, risk_zones, locations, incidents, alerts, analytics, itinerary, ops
+from .services import alert_rollups  # noqa: F401  (keeps safety_alert_rollups in step with alert writes)
+from .services import safety_score  # noqa: F401  (keeps tourist_safety_states in step with alert writes)
+from .services.dispatch_outbox import dispatch_outbox
+from .services.location_partitions import location_partitions
+from .services.location_writer import location_writer
+from .services.notify import notifier
 
 
 def create_app() -> FastAPI:
@@ -20,6 +26,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
     # Routers
@@ -28,13 +35,28 @@ def create_app() -> FastAPI:
     app.include_router(locations.router, prefix="/api")
     app.include_router(incidents.router, prefix="/api")
     app.include_router(alerts.router, prefix="/api")
+    app.include_router(analytics.router, prefix="/api")
     app.include_router(itinerary.router, prefix="/api")
+    app.include_router(ops.router, prefix="/api")
 
     @app.on_event("startup")
     def on_startup() -> None:  # noqa: D401
         """Create database tables on startup if they don't exist."""
 
         Base.metadata.create_all(bind=engine)
+        location_partitions.premake(engine)
+
+        if settings.SAFETY_LOCATION_WRITE_BEHIND:
+            location_writer.start()
+        dispatch_outbox.start()
+
+    @app.on_event("shutdown")
+    def on_shutdown() -> None:  # noqa: D401
+        """Drain queued location fixes and finish in-flight dispatches before the worker exits."""
+
+        location_writer.stop()
+        dispatch_outbox.stop()
+        notifier.stop()
 
     @app.get("/")
     def root() -> dict[str, str]:  # noqa: D401
@@ -9,9 +9,12 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    Sequence,
     String,
     Text,
+    UniqueConstraint,
     JSON,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -93,14 +96,47 @@ class RiskZone(Base):
     created_by: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
     )
 
 
+# Source of tourist ID code numbers on PostgreSQL (see ``services.tourist_codes``)
+tourist_id_code_seq = Sequence("tourist_id_code_seq", metadata=Base.metadata)
+
+
+class TouristCodeCounter(Base):
+    """Next free tourist ID code number, for databases without sequences (SQLite).
+
+    Workers reserve blocks of numbers by advancing ``next_value``.
+    """
+
+    __tablename__ = "tourist_code_counters"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    next_value: Mapped[int] = mapped_column(BigInteger)
+
+
+class RiskZoneGeneration(Base):
+    """Single-row counter bumped by every risk zone write (see ``services.zone_versions``)."""
+
+    __tablename__ = "risk_zone_generation"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    generation: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class TouristLocation(Base):
+    """Raw location history.
+
+    Writes and history reads go through ``services.location_partitions``,
+    which routes them to per-day / per-week partitions when enabled.
+    """
+
     __tablename__ = "tourist_locations"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
+    # SQLite only auto-increments INTEGER primary keys (used by the table-per-period router)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
     tourist_profile_id: Mapped[int] = mapped_column(
         BigInteger, ForeignKey("tourist_profiles.id", ondelete="CASCADE"), index=True
     )
@@ -116,18 +152,104 @@ class TouristLocation(Base):
     tourist_profile: Mapped[TouristProfile] = relationship(back_populates="locations")
 
 
+class TouristLastLocation(Base):
+    """Latest known fix per tourist, kept up to date on every ingest.
+
+    Lets the inactivity rule and the live map read one row per tourist
+    instead of searching the ever-growing tourist_locations history.
+    """
+
+    __tablename__ = "tourist_last_locations"
+
+    tourist_profile_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("tourist_profiles.id", ondelete="CASCADE"), primary_key=True
+    )
+    tourist_id_code: Mapped[str] = mapped_column(String(32), index=True)
+
+    lat: Mapped[float] = mapped_column(Float)
+    lng: Mapped[float] = mapped_column(Float)
+    accuracy_m: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    source: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+    # Last fix actually written to tourist_locations (the reference point for thinning)
+    stored_lat: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    stored_lng: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    stored_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
+
+
+class TouristSafetyState(Base):
+    """Per-tourist safety score accumulator, kept in step with alert writes.
+
+    See ``services.safety_score``: hourly buckets of alert penalty weights,
+    the open critical panics and the latest alert time, enough to derive the
+    current score without reading the tourist's alerts.
+    """
+
+    __tablename__ = "tourist_safety_states"
+
+    tourist_profile_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("tourist_profiles.id", ondelete="CASCADE"), primary_key=True
+    )
+    buckets: Mapped[dict] = mapped_column(JSON, default=dict)
+    open_panics: Mapped[dict] = mapped_column(JSON, default=dict)
+    last_alert_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TouristLocationRollup(Base):
+    """Hourly per-tourist movement summary written by ``app.jobs.location_rollups``."""
+
+    __tablename__ = "tourist_location_rollups"
+    __table_args__ = (
+        UniqueConstraint("tourist_profile_id", "hour_start", name="uq_tourist_location_rollups_profile_hour"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
+    tourist_profile_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("tourist_profiles.id", ondelete="CASCADE"), index=True
+    )
+    tourist_id_code: Mapped[str] = mapped_column(String(32), index=True)
+    hour_start: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+    fix_count: Mapped[int] = mapped_column(Integer)
+    centroid_lat: Mapped[float] = mapped_column(Float)
+    centroid_lng: Mapped[float] = mapped_column(Float)
+    distance_m: Mapped[float] = mapped_column(Float)  # sum of hops between consecutive fixes in the hour
+    first_recorded_at: Mapped[datetime] = mapped_column(DateTime)
+    last_recorded_at: Mapped[datetime] = mapped_column(DateTime)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class SafetyAlert(Base):
     __tablename__ = "safety_alerts"
+    __table_args__ = (
+        # Geofence de-duplication: "alert for this tourist and zone since <window start>?"
+        Index("ix_safety_alerts_profile_zone_triggered", "tourist_profile_id", "zone_id", "triggered_at"),
+        # Alert listing: keyset pages on (triggered_at, id), optionally behind one equality filter
+        Index("ix_safety_alerts_triggered_id", "triggered_at", "id"),
+        Index("ix_safety_alerts_status_triggered", "status", "triggered_at", "id"),
+        Index("ix_safety_alerts_type_triggered", "type", "triggered_at", "id"),
+        Index("ix_safety_alerts_severity_triggered", "severity", "triggered_at", "id"),
+        Index("ix_safety_alerts_profile_triggered", "tourist_profile_id", "triggered_at", "id"),
+        Index("ix_safety_alerts_code_triggered", "tourist_id_code", "triggered_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
     tourist_profile_id: Mapped[Optional[int]] = mapped_column(
         BigInteger, ForeignKey("tourist_profiles.id", ondelete="SET NULL"), nullable=True
     )
-    tourist_id_code: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
+    tourist_id_code: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
-    type: Mapped[str] = mapped_column(String(32), index=True)
-    severity: Mapped[str] = mapped_column(String(16), index=True)
-    status: Mapped[str] = mapped_column(String(16), index=True, default="new")
+    type: Mapped[str] = mapped_column(String(32))
+    severity: Mapped[str] = mapped_column(String(16))
+    status: Mapped[str] = mapped_column(String(16), default="new")
 
     title: Mapped[str] = mapped_column(String(255))
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -135,7 +257,12 @@ class SafetyAlert(Base):
     lat: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     lng: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
-    triggered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    # Set for geofence_breach alerts; mirrors extra_data["zone_id"] as an indexable column
+    zone_id: Mapped[Optional[int]] = mapped_column(
+        BigInteger, ForeignKey("risk_zones.id", ondelete="SET NULL"), nullable=True
+    )
+
+    triggered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     resolved_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     resolved_by: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
 
@@ -145,6 +272,63 @@ class SafetyAlert(Base):
     tourist_profile: Mapped[Optional[TouristProfile]] = relationship(back_populates="alerts")
 
 
+class SafetyAlertRollup(Base):
+    """Alert counts per hour and (severity, type, status, city).
+
+    Kept current by ``app.services.alert_rollups`` as alerts are created and
+    change status, so ``GET /api/alerts/stats`` never scans safety_alerts.
+    ``city`` is '' when the alert carries none.
+    """
+
+    __tablename__ = "safety_alert_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "bucket_start", "severity", "type", "status", "city", name="uq_safety_alert_rollups_bucket_key"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, index=True)
+    severity: Mapped[str] = mapped_column(String(16))
+    type: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16))
+    city: Mapped[str] = mapped_column(String(128), default="")
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class DispatchOutbox(Base):
+    """Notification work written in the same transaction as the alert it is about.
+
+    ``app.services.dispatch_outbox`` workers claim due ``pending`` rows, run
+    the handler for ``kind`` and mark them ``sent``; failures are retried
+    with exponential backoff until ``max attempts``, then the row is ``dead``.
+    A claimed row's ``next_attempt_at`` is pushed out by the lease, so work
+    from a crashed worker is picked up again (delivery is at least once).
+    """
+
+    __tablename__ = "dispatch_outbox"
+    __table_args__ = (Index("ix_dispatch_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32))
+    alert_id: Mapped[Optional[int]] = mapped_column(
+        BigInteger, ForeignKey("safety_alerts.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    payload: Mapped[Optional[JSON]] = mapped_column(JSON, nullable=True)
+    # Channels already notified, so retries only repeat the ones that failed
+    delivered_channels: Mapped[Optional[JSON]] = mapped_column(JSON, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(16), default="pending")  # pending | sent | dead
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    alert: Mapped[Optional["SafetyAlert"]] = relationship()
+
+
 class UserItinerary(Base):
     """Backend mirror of the Supabase user_itineraries_v2 table.
 
@@ -161,3 +345,19 @@ class UserItinerary(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+
+
+class RateLimitBucket(Base):
+    """Token bucket shared by all API workers (``SAFETY_RATE_LIMIT_BACKEND=database``).
+
+    Times are Unix epoch seconds; ``full_at`` is when the bucket will have
+    refilled completely, after which the row can be deleted.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(String(191), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float)
+    updated_at: Mapped[float] = mapped_column(Float)
+    full_at: Mapped[float] = mapped_column(Float, index=True)
+    last_allowed: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -1,36 +1,85 @@
-from typing import List, Optional
+import asyncio
+import base64
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_, update
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
+from ..core.timeutil import naive_utc
 from ..db import get_db
 from ..deps import get_current_user, require_admin, CurrentUser
+from ..services.alert_events import AlertChange, dispatch_alert_changes, snapshot
+from ..services.alert_feed import alert_feed, format_sse
+from ..services.alert_rollups import hour_bucket
+from ..services.location_rules import recent_geofence_alerts
+from ..services.profile_cache import profile_cache
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
 
+# Offset paging is kept for small result sets; deeper pages should follow X-Next-Cursor
+_ALERTS_MAX_OFFSET = 10_000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+_STREAM_KEEPALIVE_SECONDS = 15.0
+_STATS_MAX_RANGE = timedelta(days=366)
+# action -> (new status, statuses it applies to); acknowledging never reopens a resolved alert
+_BULK_ACTIONS = {
+    "acknowledge": ("acknowledged", ("new",)),
+    "resolve": ("resolved", None),
+}
+
+
+def encode_alert_cursor(alert: models.SafetyAlert) -> str:
+    raw = json.dumps([alert.triggered_at.isoformat(), alert.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_alert_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        triggered_at, alert_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(triggered_at), int(alert_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
 @router.get("/", response_model=List[schemas.SafetyAlertOut])
 def list_alerts(
+    response: Response,
     status_filter: Optional[str] = Query(default=None, alias="status"),
     type_filter: Optional[str] = Query(default=None, alias="type"),
     severity_filter: Optional[str] = Query(default=None, alias="severity"),
     tourist_id_code: Optional[str] = Query(default=None),
-    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    offset: int = Query(default=0, ge=0, le=_ALERTS_MAX_OFFSET),
     limit: int = Query(default=50, ge=1, le=200),
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ):
+    """List alerts newest first.
+
+    Pages are ordered by (triggered_at, id) descending. When a page is full,
+    the ``X-Next-Cursor`` response header carries an opaque cursor; pass it
+    back as ``?cursor=`` to continue with a keyset seek instead of an OFFSET
+    scan. ``offset`` still works (up to 10,000) but cannot be combined with
+    ``cursor``.
+    """
+
+    if cursor and offset:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either cursor or offset, not both")
+
     q = db.query(models.SafetyAlert)
 
     # Tourists only see their own alerts
     if user.role != "admin":
         # Map current user to their active profile
-        profile = (
-            db.query(models.TouristProfile)
-            .filter(models.TouristProfile.user_id == user.id, models.TouristProfile.is_active == True)  # noqa: E712
-            .first()
-        )
+        profile = profile_cache.by_user(db, user.id)
         if not profile:
             return []
         q = q.filter(models.SafetyAlert.tourist_profile_id == profile.id)
@@ -46,15 +95,206 @@ def list_alerts(
     if severity_filter:
         q = q.filter(models.SafetyAlert.severity == severity_filter)
 
+    if cursor:
+        after_triggered_at, after_id = decode_alert_cursor(cursor)
+        q = q.filter(
+            tuple_(models.SafetyAlert.triggered_at, models.SafetyAlert.id) < tuple_(after_triggered_at, after_id)
+        )
+
     alerts = (
-        q.order_by(models.SafetyAlert.triggered_at.desc())
+        q.order_by(models.SafetyAlert.triggered_at.desc(), models.SafetyAlert.id.desc())
         .offset(offset)
         .limit(limit)
         .all()
     )
+    if len(alerts) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_alert_cursor(alerts[-1])
     return alerts
 
 
+@router.get("/stats", response_model=schemas.AlertStatsOut)
+def alert_stats(
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    bucket: Literal["hour", "day"] = Query(default="hour"),
+    severity_filter: Optional[str] = Query(default=None, alias="severity"),
+    type_filter: Optional[str] = Query(default=None, alias="type"),
+    status_filter: Optional[str] = Query(default=None, alias="status"),
+    city: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    """Alert counts by severity, type, status and city, per hour or day (admin only).
+
+    Defaults to the last 24 hours. Hours are UTC and ``since``/``until`` are
+    rounded down to whole hours. Served from ``safety_alert_rollups``, so the
+    cost depends on the number of buckets, not the number of alerts. Alerts
+    without a city are counted under "".
+    """
+
+    until = hour_bucket(naive_utc(until)) if until else hour_bucket(datetime.utcnow()) + timedelta(hours=1)
+    since = hour_bucket(naive_utc(since)) if since else until - timedelta(hours=24)
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must be before until")
+    if until - since > _STATS_MAX_RANGE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Range is limited to 366 days")
+
+    r = models.SafetyAlertRollup
+    q = db.query(r.bucket_start, r.severity, r.type, r.status, r.city, r.count).filter(
+        r.bucket_start >= since, r.bucket_start < until, r.count != 0
+    )
+    if severity_filter:
+        q = q.filter(r.severity == severity_filter)
+    if type_filter:
+        q = q.filter(r.type == type_filter)
+    if status_filter:
+        q = q.filter(r.status == status_filter)
+    if city is not None:
+        q = q.filter(r.city == city)
+
+    totals: Dict[str, Counter] = {name: Counter() for name in ("severity", "type", "status", "city")}
+    per_bucket: Dict[datetime, Dict[str, Counter]] = defaultdict(
+        lambda: {name: Counter() for name in ("severity", "type", "status")}
+    )
+    for bucket_start, sev, typ, st, row_city, count in q:
+        if bucket == "day":
+            bucket_start = bucket_start.replace(hour=0)
+        for name, value in (("severity", sev), ("type", typ), ("status", st)):
+            totals[name][value] += count
+            per_bucket[bucket_start][name][value] += count
+        totals["city"][row_city] += count
+
+    return schemas.AlertStatsOut(
+        since=since,
+        until=until,
+        bucket=bucket,
+        total=sum(totals["status"].values()),
+        by_severity=dict(totals["severity"]),
+        by_type=dict(totals["type"]),
+        by_status=dict(totals["status"]),
+        by_city=dict(totals["city"]),
+        buckets=[
+            schemas.AlertStatsBucket(
+                bucket_start=start,
+                total=sum(counts["status"].values()),
+                by_severity=dict(counts["severity"]),
+                by_type=dict(counts["type"]),
+                by_status=dict(counts["status"]),
+            )
+            for start, counts in sorted(per_bucket.items())
+        ],
+    )
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    """Server-Sent Events feed of new and changed alerts (admin only).
+
+    Events are ``alert_created`` / ``alert_updated`` with the alert as JSON
+    data. Reconnecting with ``Last-Event-ID`` replays what was missed; a
+    ``reset`` event means the gap could not be replayed and the console
+    should reload the list. The feed covers alerts produced by this worker.
+    """
+
+    subscription = alert_feed.subscribe(last_event_id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.overflowed:
+                try:
+                    item = await asyncio.wait_for(subscription.get(), timeout=_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.overflowed:
+                    # Fell too far behind: drop the connection so the client resumes from history
+                    break
+                yield format_sse(item)
+        finally:
+            alert_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/bulk")
+def bulk_update_alerts(
+    body: schemas.AlertBulkRequest,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),
+):
+    """Acknowledge or resolve many alerts in one transaction (admin only).
+
+    Select alerts by ``ids`` or by ``filter`` (the ``list_alerts`` filters).
+    The change is set-based ``UPDATE ... RETURNING`` (one statement per
+    status the selected alerts are currently in); alerts already in the
+    target state (or resolved, for ``acknowledge``) are left alone. The
+    response is NDJSON: a summary line ``{"action", "updated", "skipped"}``
+    followed by one line per updated alert. ``skipped`` counts requested ids
+    that were missing or unchanged, and is null for filter selections.
+    """
+
+    t = models.SafetyAlert.__table__
+    new_status, from_statuses = _BULK_ACTIONS[body.action]
+
+    selection = [t.c.status.in_(from_statuses)] if from_statuses else [t.c.status != new_status]
+    if body.ids is not None:
+        selection.append(t.c.id.in_(set(body.ids)))
+    else:
+        selection.extend(t.c[field] == value for field, value in body.filter.model_dump().items() if value)
+
+    values = {"status": new_status}
+    if new_status == "resolved":
+        values.update(resolved_by=user.id, resolved_at=datetime.utcnow())
+
+    # One UPDATE per current status (there are only a few), so every returned
+    # row's previous status is known for the rollups without a read-then-write
+    previous_statuses = db.execute(select(t.c.status).where(*selection).distinct()).scalars().all()
+    updated = []
+    for previous_status in previous_statuses:
+        result = db.execute(
+            update(t).where(*selection, t.c.status == previous_status).values(**values).returning(*t.c)
+        )
+        updated.extend((previous_status, row) for row in result)
+
+    # Set-based updates bypass the ORM flush hooks, so report the changes directly
+    changes = []
+    for previous_status, row in updated:
+        after = snapshot(row._asdict())
+        changes.append(AlertChange(after._replace(status=previous_status), after))
+    dispatch_alert_changes(db.connection(), changes)
+    db.commit()
+
+    rows = sorted((row for _, row in updated), key=lambda row: row.id)
+    for row in rows:
+        if new_status == "resolved":
+            recent_geofence_alerts.discard(row.tourist_profile_id, row.zone_id)
+        alert_feed.publish("alert_updated", row)
+
+    summary = {
+        "action": body.action,
+        "updated": len(rows),
+        "skipped": len(set(body.ids)) - len(rows) if body.ids is not None else None,
+    }
+
+    def lines() -> Iterator[str]:
+        yield json.dumps(summary) + "\n"
+        for row in rows:
+            yield schemas.SafetyAlertOut.model_validate(row).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/{alert_id}/acknowledge", response_model=schemas.SafetyAlertOut)
 def acknowledge_alert(
     alert_id: int,
@@ -67,6 +307,7 @@ def acknowledge_alert(
     alert.status = "acknowledged"
     db.commit()
     db.refresh(alert)
+    alert_feed.publish("alert_updated", alert)
     return alert
 
 
@@ -76,8 +317,6 @@ def resolve_alert(
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(require_admin),
 ):
-    from datetime import datetime
-
     alert = db.query(models.SafetyAlert).filter(models.SafetyAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert not found")
@@ -86,4 +325,7 @@ def resolve_alert(
     alert.resolved_at = datetime.utcnow()
     db.commit()
     db.refresh(alert)
+    # A resolved geofence alert no longer suppresses a new one for the same zone
+    recent_geofence_alerts.discard(alert.tourist_profile_id, alert.zone_id)
+    alert_feed.publish("alert_updated", alert)
     return alert
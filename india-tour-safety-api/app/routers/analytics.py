@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..core.timeutil import naive_utc
+from ..db import get_db
+from ..deps import require_admin, CurrentUser
+from ..services.heatmap import MAX_ZOOM, heatmaps, hour_floor, sparse_cells, tile_bounds
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+_HEATMAP_MAX_RANGE = timedelta(days=31)
+_HEATMAP_DEFAULT_TYPES = ["panic", "geofence_breach"]
+
+
+@router.get("/heatmap", response_model=schemas.HeatmapTileOut)
+def heatmap_tile(
+    z: int = Query(ge=0, le=MAX_ZOOM),
+    x: int = Query(ge=0),
+    y: int = Query(ge=0),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    source: Literal["alerts", "locations"] = Query(default="alerts"),
+    alert_type: Optional[List[str]] = Query(default=None, alias="type"),
+    grid: int = Query(default=64, ge=8, le=256),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    """Point density for one slippy-map tile (admin only).
+
+    The tile is split into ``grid x grid`` cells (a power of two from 8 to
+    256, so cells line up with the tiles ``log2(grid)`` zooms deeper).
+    ``cells`` lists the non-empty ones as ``[col, row, count]`` with row 0
+    at the top (north).
+    Counts cover whole UTC hours from ``since`` (default: 24 hours ago) to
+    ``until`` (default: now). ``source=alerts`` counts alerts of the given
+    ``type`` values (default panic and geofence_breach); ``source=locations``
+    counts raw location fixes.
+    """
+
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tile is outside the zoom level")
+    if grid & (grid - 1):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="grid must be a power of two")
+
+    now = datetime.utcnow()
+    until = naive_utc(until) if until else now
+    since = hour_floor(naive_utc(since) if since else until - timedelta(hours=24))
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must be before until")
+    if until - since > _HEATMAP_MAX_RANGE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Range is limited to 31 days")
+
+    types = (alert_type or _HEATMAP_DEFAULT_TYPES) if source == "alerts" else []
+    counts = heatmaps.tile_counts(db, source, z, x, y, since, until, grid, types, now=now)
+
+    return schemas.HeatmapTileOut(
+        z=z,
+        x=x,
+        y=y,
+        source=source,
+        since=since,
+        until=until,
+        grid=grid,
+        bbox=list(tile_bounds(z, x, y)),
+        total=int(counts.sum()),
+        max=int(counts.max(initial=0)),
+        cells=sparse_cells(counts, grid),
+    )
@@ -1,7 +1,4 @@
 from datetime import datetime
-from time import time
-from collections import deque
-from typing import Deque, Dict
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -10,90 +7,81 @@ from .. import models, schemas
 from ..db import get_db
 from ..deps import get_current_user, CurrentUser
 from ..core.config import settings
+from ..core.rate_limit import RateLimiter
+from ..core.security import decrypt_field
+from ..services.alert_feed import alert_feed
+from ..services.dispatch_outbox import OutboxItem, dispatch_outbox
+from ..services.notify import NotificationError, notifier
+from ..services.profile_cache import AnyProfile, profile_cache
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
 
 _PANIC_RATE_WINDOW_SECONDS = 60
 _PANIC_RATE_MAX_CALLS = 3
-_panic_calls: Dict[int, Deque[float]] = {}
+_panic_limiter = RateLimiter(
+    "panic",
+    _PANIC_RATE_MAX_CALLS,
+    _PANIC_RATE_WINDOW_SECONDS,
+    detail="Too many panic requests, please wait a moment.",
+)
 
 
-def _check_panic_rate_limit(user_id: int) -> None:
-    now = time()
-    calls = _panic_calls.setdefault(user_id, deque())
-    while calls and now - calls[0] > _PANIC_RATE_WINDOW_SECONDS:
-        calls.popleft()
-    if len(calls) >= _PANIC_RATE_MAX_CALLS:
-        raise HTTPException(status_code=429, detail="Too many panic requests, please wait a moment.")
-    calls.append(now)
+def _check_panic_rate_limit(user_id: int | str) -> None:
+    _panic_limiter.check(user_id)
 
 
-def _dispatch_panic_alert(alert: models.SafetyAlert, profile: models.TouristProfile) -> None:
-    """Simulate sending an alert to emergency contacts / authorities.
+PANIC_DISPATCH_KIND = "panic_alert"
 
-    For this prototype we simply log a line; in production this hook can be wired
-    to SMS / email gateways or an operations dashboard.
-    """
 
-    try:
-        contact_name = profile.emergency_contact_name or "(unknown contact)"
-        contact_phone = profile.emergency_contact_phone or "(no phone)"
-        print(  # noqa: T201
-            "[DISPATCH] Panic for "
-            f"{profile.full_name} ({profile.tourist_id_code}) – "
-            f"notify {contact_name} at {contact_phone}; "
-            f"location=({alert.lat},{alert.lng}); note={alert.description!r}",
-            flush=True,
-        )
-
-        # Optional hook: integrate with real providers when enabled.
-        if settings.SAFETY_DISPATCH_ENABLED and settings.SAFETY_DISPATCH_PROVIDER:
-            provider = settings.SAFETY_DISPATCH_PROVIDER.lower()
-            if provider == "twilio":
-                _dispatch_via_twilio(alert, profile)
-            elif provider == "sendgrid":
-                _dispatch_via_sendgrid(alert, profile)
-    except Exception:
-        # Dispatch is best-effort for demo; failures should not block the API.
-        pass
-
-
-def _dispatch_via_twilio(alert: models.SafetyAlert, profile: models.TouristProfile) -> None:
-    """Placeholder Twilio SMS dispatch hook.
-
-    In a real deployment you would import the Twilio client and send an SMS
-    using TWILIO_* settings. For this project we just log the intent so that
-    the wiring is clear without requiring live credentials.
-    """
+def _panic_dispatch_payload(alert: models.SafetyAlert, profile: AnyProfile) -> dict:
+    """Everything delivery needs, captured when the alert is raised."""
 
-    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN or not settings.TWILIO_FROM_NUMBER:
-        return
-
-    contact_phone = profile.emergency_contact_phone or "(no phone)"
-    print(  # noqa: T201
-        "[TWILIO] Would send SMS from "
-        f"{settings.TWILIO_FROM_NUMBER} to {contact_phone} for panic alert {alert.id}",
-        flush=True,
-    )
+    return {
+        "full_name": profile.full_name,
+        "tourist_id_code": profile.tourist_id_code,
+        "emergency_contact_name": profile.emergency_contact_name,
+        # Stored encrypted (see routers.tourists); delivery needs the number itself
+        "emergency_contact_phone": decrypt_field(profile.emergency_contact_phone),
+        "lat": alert.lat,
+        "lng": alert.lng,
+        "note": alert.description,
+    }
 
 
-def _dispatch_via_sendgrid(alert: models.SafetyAlert, profile: models.TouristProfile) -> None:
-    """Placeholder SendGrid email dispatch hook.
+def _dispatch_panic_alert(item: OutboxItem) -> None:
+    """Send a panic alert to emergency contacts / authorities.
 
-    In a real deployment you would use the SendGrid client and SAFETY_DISPATCH_FROM_EMAIL
-    to send an email to configured recipients.
+    Runs on a dispatch outbox worker, not in the request. Always logs a
+    line; with ``SAFETY_DISPATCH_ENABLED`` it also notifies every configured
+    channel (SMS, email, police webhook) in parallel. Channels that succeed
+    are recorded on the outbox row, and a failure of any other raises so the
+    outbox retries just those with backoff.
     """
 
-    if not settings.SENDGRID_API_KEY or not settings.SAFETY_DISPATCH_FROM_EMAIL:
-        return
-
+    payload = item.payload
+    contact_name = payload.get("emergency_contact_name") or "(unknown contact)"
+    contact_phone = payload.get("emergency_contact_phone") or "(no phone)"
     print(  # noqa: T201
-        "[SENDGRID] Would send email from "
-        f"{settings.SAFETY_DISPATCH_FROM_EMAIL} for panic alert {alert.id}",
+        "[DISPATCH] Panic for "
+        f"{payload.get('full_name')} ({payload.get('tourist_id_code')}) – "
+        f"notify {contact_name} at {contact_phone}; "
+        f"location=({payload.get('lat')},{payload.get('lng')}); note={payload.get('note')!r}",
         flush=True,
     )
 
+    if not settings.SAFETY_DISPATCH_ENABLED:
+        return
+
+    results = notifier.send(item.alert_id, payload, skip=item.delivered)
+    item.delivered.extend(result.channel for result in results if result.ok)
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise NotificationError(failed)
+
+
+dispatch_outbox.register(PANIC_DISPATCH_KIND, _dispatch_panic_alert)
+
 
 @router.post("/panic", response_model=schemas.SafetyAlertOut)
 def trigger_panic(
@@ -104,13 +92,10 @@ def trigger_panic(
     _check_panic_rate_limit(user.id)
 
     # If tourist_id_code is not provided, map from current user to their active profile
-    query = db.query(models.TouristProfile).filter(models.TouristProfile.is_active == True)  # noqa: E712
     if body.tourist_id_code:
-        query = query.filter(models.TouristProfile.tourist_id_code == body.tourist_id_code)
+        profile = profile_cache.by_code(db, body.tourist_id_code)
     else:
-        query = query.filter(models.TouristProfile.user_id == user.id)
-
-    profile = query.first()
+        profile = profile_cache.by_user(db, user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Active tourist profile not found")
 
@@ -120,6 +105,8 @@ def trigger_panic(
         "source": "panic_button",
         "triggered_by": user.id,
     }
+    if profile.city:
+        extra_data["city"] = profile.city
     if body.note:
         extra_data["note"] = body.note
     if profile.emergency_contact_name or profile.emergency_contact_phone:
@@ -140,9 +127,11 @@ def trigger_panic(
         extra_data=extra_data,
     )
     db.add(alert)
+    # Same transaction as the alert: if it commits, delivery will be attempted
+    dispatch_outbox.enqueue(db, PANIC_DISPATCH_KIND, _panic_dispatch_payload(alert, profile), alert=alert)
     db.commit()
     db.refresh(alert)
-
-    _dispatch_panic_alert(alert, profile)
+    dispatch_outbox.notify()
+    alert_feed.publish("alert_created", alert)
 
     return alert
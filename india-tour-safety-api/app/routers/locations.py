@@ -1,31 +1,39 @@
+import json
 from datetime import datetime, timedelta
-from time import time
-from collections import deque
-from typing import Deque, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..db import get_db
-from ..deps import get_current_user, CurrentUser
+from ..core.rate_limit import RateLimiter
+from ..core.timeutil import naive_utc
+from ..db import SessionLocal, get_db
+from ..deps import authenticate_token, bearer_token, get_current_user, require_admin, CurrentUser
+from ..services.location_rules import commit_alerts, ingest_fixes
+from ..services.nearby import nearby_tourists
+from ..services.profile_cache import ProfileRef, profile_cache
+from ..services.zone_codec import binary_zone_response, encode_zone_query, wants_binary
+from ..services.zone_versions import changed_since, zone_cache_headers, zone_delta
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
 
 _LOC_RATE_WINDOW_SECONDS = 300
 _LOC_RATE_MAX_CALLS = 120
-_location_calls: Dict[int, Deque[float]] = {}
+_location_limiter = RateLimiter(
+    "location",
+    _LOC_RATE_MAX_CALLS,
+    _LOC_RATE_WINDOW_SECONDS,
+    detail="Too many location updates, please slow down.",
+)
+_LOC_BATCH_MAX_FIXES = 500
 
 
 def _check_location_rate_limit(profile_id: int) -> None:
-    now = time()
-    calls = _location_calls.setdefault(profile_id, deque())
-    while calls and now - calls[0] > _LOC_RATE_WINDOW_SECONDS:
-        calls.popleft()
-    if len(calls) >= _LOC_RATE_MAX_CALLS:
-        raise HTTPException(status_code=429, detail="Too many location updates, please slow down.")
-    calls.append(now)
+    _location_limiter.check(profile_id)
 
 
 def _point_in_bbox(point_lat: float, point_lng: float, geom: dict) -> bool:
@@ -41,149 +49,246 @@ def _point_in_bbox(point_lat: float, point_lng: float, geom: dict) -> bool:
     return min_lat <= point_lat <= max_lat and min_lng <= point_lng <= max_lng
 
 
-@router.get("/zones", response_model=List[schemas.RiskZoneOut])
-def list_risk_zones(db: Session = Depends(get_db)):
-    zones = (
+@router.get("/zones", response_model=Union[List[schemas.RiskZoneOut], schemas.RiskZoneDeltaOut])
+def list_risk_zones(
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    """Active risk zones for the tourist app, with ETag / ``If-None-Match`` revalidation.
+
+    With ``since`` (the ``cursor`` of the previous delta) only zones created,
+    changed or deactivated after it are returned, as a ``RiskZoneDeltaOut``.
+    ``Accept: application/vnd.indiatour.zones+binary`` selects the compact
+    encoding of ``services.zone_codec``.
+    """
+
+    since = naive_utc(since) if since else None
+    binary = wants_binary(request.headers.get("accept"))
+    not_modified = zone_cache_headers(db, request, response, since, binary)
+    if not_modified is not None:
+        return not_modified
+    if since is not None:
+        if binary:
+            q = changed_since(db.query(models.RiskZone), since)
+            return binary_zone_response(encode_zone_query(db, q, since), response)
+        return zone_delta(db.query(models.RiskZone), since)
+
+    q = (
         db.query(models.RiskZone)
         .filter(models.RiskZone.is_active == True)  # noqa: E712
         .order_by(models.RiskZone.risk_level.desc(), models.RiskZone.name)
-        .all()
     )
-    return zones
+    if binary:
+        return binary_zone_response(encode_zone_query(db, q), response)
+    return q.all()
 
 
-@router.post("/", response_model=List[schemas.SafetyAlertOut])
-def ingest_location(
-    body: schemas.LocationIn,
+@router.get("/latest", response_model=List[schemas.TouristLastLocationOut])
+def list_latest_locations(
+    active_within_minutes: Optional[int] = Query(default=None, ge=1),
+    limit: int = Query(default=1000, ge=1, le=10000),
     db: Session = Depends(get_db),
-    user: CurrentUser = Depends(get_current_user),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
 ):
-    profile = (
-        db.query(models.TouristProfile)
-        .filter(
-            models.TouristProfile.tourist_id_code == body.tourist_id_code,
-            models.TouristProfile.is_active == True,  # noqa: E712
+    """Last known position of every tourist, for the live map (admin only)."""
+
+    q = db.query(models.TouristLastLocation)
+    if active_within_minutes:
+        since = datetime.utcnow() - timedelta(minutes=active_within_minutes)
+        q = q.filter(models.TouristLastLocation.recorded_at >= since)
+    return q.order_by(models.TouristLastLocation.recorded_at.desc()).limit(limit).all()
+
+
+@router.get("/nearby", response_model=List[schemas.NearbyTouristOut])
+def list_nearby_tourists(
+    lat: float = Query(ge=-90, le=90),
+    lng: float = Query(ge=-180, le=180),
+    radius_m: float = Query(default=2000, gt=0, le=50000),
+    active_within_minutes: int = Query(default=60, ge=1, le=1440),
+    exclude_tourist_id_code: Optional[str] = Query(default=None),
+    limit: int = Query(default=500, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    """Tourists whose last known position is within ``radius_m`` of a point, nearest first (admin only).
+
+    Served from an in-process grid over tourist_last_locations that picks up
+    new positions within about a second. ``exclude_tourist_id_code`` leaves out
+    one tourist, e.g. the one who raised the alert.
+    """
+
+    exclude_profile_id = None
+    if exclude_tourist_id_code:
+        exclude_profile_id = (
+            db.query(models.TouristProfile.id)
+            .filter(models.TouristProfile.tourist_id_code == exclude_tourist_id_code)
+            .scalar()
         )
-        .first()
+
+    return nearby_tourists.nearby(
+        db,
+        lat,
+        lng,
+        radius_m,
+        active_within=timedelta(minutes=active_within_minutes),
+        limit=limit,
+        exclude_profile_id=exclude_profile_id,
     )
+
+
+def _get_active_profile_by_code(db: Session, tourist_id_code: str) -> ProfileRef:
+    profile = profile_cache.by_code(db, tourist_id_code)
     if not profile:
         raise HTTPException(status_code=404, detail="Active tourist profile not found")
+    return profile
+
+
+@router.post("/", response_model=List[schemas.SafetyAlertOut])
+def ingest_location(
+    body: schemas.LocationIn,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    profile = _get_active_profile_by_code(db, body.tourist_id_code)
 
     _check_location_rate_limit(profile.id)
 
-    # Normalize recorded_at to a naive UTC datetime so arithmetic with
-    # database timestamps (which are stored as naive UTC) is safe.
-    if body.recorded_at is not None:
-        if body.recorded_at.tzinfo is not None:
-            recorded_at = body.recorded_at.replace(tzinfo=None)
-        else:
-            recorded_at = body.recorded_at
-    else:
-        recorded_at = datetime.utcnow()
-
-    loc = models.TouristLocation(
-        tourist_profile_id=profile.id,
-        tourist_id_code=profile.tourist_id_code,
-        lat=body.lat,
-        lng=body.lng,
-        accuracy_m=body.accuracy_m,
-        source=body.source or "web",
-        recorded_at=recorded_at,
-    )
-    db.add(loc)
+    alerts = ingest_fixes(db, profile, [body])
 
-    alerts: list[models.SafetyAlert] = []
+    commit_alerts(db, alerts)
+    return alerts
 
-    # Simple geofence check using bbox in geom
-    zones = (
-        db.query(models.RiskZone)
-        .filter(models.RiskZone.is_active == True)  # noqa: E712
-        .all()
-    )
-    now = datetime.utcnow()
-    window_start = now - timedelta(minutes=5)
-
-    for zone in zones:
-        if not isinstance(zone.geom, dict):
-            continue
-        if not _point_in_bbox(body.lat, body.lng, zone.geom):
-            continue
-
-        # Only create alerts for higher risk levels
-        if zone.risk_level.lower() not in {"medium", "high"}:
-            continue
-
-        # De-duplicate alerts for same zone and tourist in a short window
-        existing = (
-            db.query(models.SafetyAlert)
-            .filter(
-                models.SafetyAlert.tourist_profile_id == profile.id,
-                models.SafetyAlert.type == "geofence_breach",
-                models.SafetyAlert.triggered_at >= window_start,
-                models.SafetyAlert.status != "resolved",
-                models.SafetyAlert.extra_data["zone_id"].as_integer() == zone.id,
-            )
-            .first()
-        )
-        if existing:
-            continue
-
-        alert = models.SafetyAlert(
-            tourist_profile_id=profile.id,
-            tourist_id_code=profile.tourist_id_code,
-            type="geofence_breach",
-            severity="high" if zone.risk_level.lower() == "high" else "medium",
-            status="new",
-            title=f"Entered {zone.risk_level.capitalize()} risk zone: {zone.name}",
-            description=zone.description,
-            lat=body.lat,
-            lng=body.lng,
-            triggered_at=now,
-            extra_data={"zone_id": zone.id, "zone_city": zone.city},
-        )
-        db.add(alert)
-        alerts.append(alert)
-
-    # Simple anomaly placeholder: if last location was >30 minutes ago, create inactivity alert
-    last_loc = (
-        db.query(models.TouristLocation)
-        .filter(models.TouristLocation.tourist_profile_id == profile.id)
-        .order_by(models.TouristLocation.recorded_at.desc())
-        .offset(1)
-        .first()
-    )
-    if last_loc and (recorded_at - last_loc.recorded_at) > timedelta(minutes=30):
-        anomaly_existing = (
-            db.query(models.SafetyAlert)
-            .filter(
-                models.SafetyAlert.tourist_profile_id == profile.id,
-                models.SafetyAlert.type == "inactivity",
-                models.SafetyAlert.status != "resolved",
-            )
-            .first()
+
+@router.post("/batch", response_model=List[schemas.SafetyAlertOut])
+def ingest_location_batch(
+    body: List[schemas.LocationIn],
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Ingest an ordered array of queued fixes for one tourist in a single transaction.
+
+    Intended for clients replaying fixes buffered while offline: the profile
+    lookup, zone scan and alert de-duplication run once for the whole batch.
+    """
+
+    if not body:
+        raise HTTPException(status_code=400, detail="At least one location fix is required")
+    if len(body) > _LOC_BATCH_MAX_FIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {_LOC_BATCH_MAX_FIXES} location fixes",
         )
-        if not anomaly_existing:
-            anomaly = models.SafetyAlert(
-                tourist_profile_id=profile.id,
-                tourist_id_code=profile.tourist_id_code,
-                type="inactivity",
-                severity="medium",
-                status="new",
-                title="No movement detected for over 30 minutes",
-                description="System detected a long gap between location updates.",
-                lat=body.lat,
-                lng=body.lng,
-                triggered_at=now,
-                extra_data={
-                    "rule": "inactivity_30_min",
-                    "last_recorded_at": last_loc.recorded_at.isoformat(),
-                },
-            )
-            db.add(anomaly)
-            alerts.append(anomaly)
-
-    db.commit()
-    for a in alerts:
-        db.refresh(a)
+    tourist_id_code = body[0].tourist_id_code
+    if any(fix.tourist_id_code != tourist_id_code for fix in body):
+        raise HTTPException(status_code=400, detail="All fixes in a batch must belong to the same tourist")
 
+    profile = _get_active_profile_by_code(db, tourist_id_code)
+
+    _check_location_rate_limit(profile.id)
+
+    alerts = ingest_fixes(db, profile, body)
+
+    commit_alerts(db, alerts)
     return alerts
+
+
+def _parse_stream_fixes(raw: str, tourist_id_code: str) -> List[schemas.LocationIn]:
+    """Parse one stream message: a fix object or an array of fixes.
+
+    ``tourist_id_code`` may be omitted from the fixes; it defaults to the
+    tourist the stream was opened for, and any other value is rejected.
+    """
+
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Messages must be JSON")
+
+    items = message if isinstance(message, list) else [message]
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one location fix is required")
+    if len(items) > _LOC_BATCH_MAX_FIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A message may contain at most {_LOC_BATCH_MAX_FIXES} location fixes",
+        )
+
+    fixes: List[schemas.LocationIn] = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=400, detail="Each location fix must be an object")
+        try:
+            fix = schemas.LocationIn(**{"tourist_id_code": tourist_id_code, **item})
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False))
+        if fix.tourist_id_code != tourist_id_code:
+            raise HTTPException(status_code=400, detail="Fixes on a stream must belong to its tourist")
+        fixes.append(fix)
+    return fixes
+
+
+def _load_stream_profile(tourist_id_code: str) -> ProfileRef:
+    db = SessionLocal()
+    try:
+        # A plain value object: commits on later sessions never expire (and reload) it
+        return _get_active_profile_by_code(db, tourist_id_code)
+    finally:
+        db.close()
+
+
+def _ingest_stream_fixes(profile: ProfileRef, fixes: List[schemas.LocationIn]) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        _check_location_rate_limit(profile.id)
+        alerts = ingest_fixes(db, profile, fixes)
+        commit_alerts(db, alerts)
+        return [schemas.SafetyAlertOut.model_validate(alert).model_dump(mode="json") for alert in alerts]
+    finally:
+        db.close()
+
+
+@router.websocket("/stream")
+async def stream_locations(
+    websocket: WebSocket,
+    tourist_id_code: str = Query(...),
+    token: Optional[str] = Query(default=None),
+):
+    """Long-lived location channel for one tourist.
+
+    The token (``?token=`` or a Bearer Authorization header) and the profile
+    are resolved once on connect. Each message is a fix or an array of fixes,
+    evaluated by the same ``ingest_fixes`` rules as ``POST /locations``;
+    alerts are pushed back as ``{"type": "alert", "alert": {...}}`` and every
+    message is answered with ``{"type": "ack", "received": n}`` or
+    ``{"type": "error", "status": ..., "detail": ...}``. Connect failures close
+    the socket with code 4000 + the HTTP status (e.g. 4401, 4404).
+    """
+
+    await websocket.accept()
+
+    if token is None:
+        token = bearer_token(websocket.headers.get("authorization"))
+    try:
+        authenticate_token(token)
+        profile = await run_in_threadpool(_load_stream_profile, tourist_id_code)
+    except HTTPException as exc:
+        await websocket.close(code=4000 + exc.status_code, reason=str(exc.detail))
+        return
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                fixes = _parse_stream_fixes(raw, tourist_id_code)
+                alerts = await run_in_threadpool(_ingest_stream_fixes, profile, fixes)
+            except HTTPException as exc:
+                await websocket.send_json({"type": "error", "status": exc.status_code, "detail": exc.detail})
+                continue
+
+            for alert in alerts:
+                await websocket.send_json({"type": "alert", "alert": alert})
+            await websocket.send_json({"type": "ack", "received": len(fixes)})
+    except WebSocketDisconnect:
+        return
@@ -0,0 +1,37 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from ..core.rate_limit import get_rate_limit_backend
+from ..core.token_cache import verified_tokens
+from ..deps import require_admin, CurrentUser
+from ..services.alert_feed import alert_feed
+from ..services.dispatch_outbox import dispatch_outbox
+from ..services.heatmap import heatmaps
+from ..services.location_writer import location_writer
+from ..services.nearby import nearby_tourists
+from ..services.notify import notifier
+from ..services.profile_cache import profile_cache
+from ..services.tourist_codes import tourist_codes
+from ..services.zone_codec import zone_records
+
+router = APIRouter(prefix="/ops", tags=["ops"])
+
+
+@router.get("/metrics")
+def get_metrics(user: CurrentUser = Depends(require_admin)) -> dict[str, Any]:  # noqa: ARG001
+    """In-process runtime counters for this worker (admin only)."""
+
+    return {
+        "location_write_queue": location_writer.stats(),
+        "rate_limit": get_rate_limit_backend().stats(),
+        "alert_feed": alert_feed.stats(),
+        "dispatch_outbox": dispatch_outbox.stats(),
+        "notifications": notifier.stats(),
+        "heatmap_cache": heatmaps.cache.stats(),
+        "nearby_index": nearby_tourists.stats(),
+        "zone_codec_cache": zone_records.stats(),
+        "tourist_codes": tourist_codes.stats(),
+        "profile_cache": profile_cache.stats(),
+        "auth_cache": verified_tokens.stats(),
+    }
@@ -1,28 +1,58 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
+from ..core.timeutil import naive_utc
 from ..db import get_db
 from ..deps import get_current_user, require_admin, CurrentUser
+from ..services.zone_index import invalidate_zone_index
+from ..services.zone_codec import binary_zone_response, encode_zone_query, wants_binary
+from ..services.zone_versions import changed_since, zone_cache_headers, zone_delta
 
 router = APIRouter(prefix="/risk-zones", tags=["risk-zones"])
 
 
-@router.get("/", response_model=List[schemas.RiskZoneOut])
+@router.get("/", response_model=Union[List[schemas.RiskZoneOut], schemas.RiskZoneDeltaOut])
 def list_risk_zones(
+    request: Request,
+    response: Response,
     city: Optional[str] = Query(default=None),
     active_only: bool = Query(default=True),
+    since: Optional[datetime] = Query(default=None),
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),  # noqa: ARG001
 ):
+    """List risk zones, with ETag / ``If-None-Match`` revalidation.
+
+    With ``since`` (the ``cursor`` of the previous delta) only zones written
+    after it are returned, as a ``RiskZoneDeltaOut``; ``active_only`` does not
+    apply there, since deactivated zones are reported in ``removed``.
+    ``Accept: application/vnd.indiatour.zones+binary`` selects the compact
+    encoding of ``services.zone_codec``.
+    """
+
+    since = naive_utc(since) if since else None
+    binary = wants_binary(request.headers.get("accept"))
+    not_modified = zone_cache_headers(db, request, response, city, active_only, since, binary)
+    if not_modified is not None:
+        return not_modified
+
     q = db.query(models.RiskZone)
     if city:
         q = q.filter(models.RiskZone.city == city)
+    if since is not None:
+        if binary:
+            return binary_zone_response(encode_zone_query(db, changed_since(q, since), since), response)
+        return zone_delta(q, since)
     if active_only:
         q = q.filter(models.RiskZone.is_active == True)  # noqa: E712
-    return q.order_by(models.RiskZone.id.desc()).all()
+    q = q.order_by(models.RiskZone.id.desc())
+    if binary:
+        return binary_zone_response(encode_zone_query(db, q), response)
+    return q.all()
 
 
 @router.post("/", response_model=schemas.RiskZoneOut)
@@ -38,4 +68,25 @@ def create_risk_zone(
     db.add(zone)
     db.commit()
     db.refresh(zone)
+    invalidate_zone_index()
+    return zone
+
+
+@router.patch("/{zone_id}", response_model=schemas.RiskZoneOut)
+def update_risk_zone(
+    zone_id: int,
+    body: schemas.RiskZoneUpdate,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    zone = db.query(models.RiskZone).filter(models.RiskZone.id == zone_id).first()
+    if not zone:
+        raise HTTPException(status_code=404, detail="Risk zone not found")
+
+    for field, value in body.dict(exclude_unset=True).items():
+        setattr(zone, field, value)
+
+    db.commit()
+    db.refresh(zone)
+    invalidate_zone_index()
     return zone
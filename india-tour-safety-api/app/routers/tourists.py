@@ -1,21 +1,23 @@
-from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..db import get_db
-from ..deps import get_current_user, CurrentUser, require_admin
+from ..deps import get_active_profile, get_current_user, CurrentUser, require_admin
 from ..core.security import encrypt_field, decrypt_field
+from ..core.config import settings
+from ..services.safety_score import safety_score
+from ..services.safety_score_batch import recompute_safety_scores
+from ..services.tourist_codes import tourist_codes
 
 router = APIRouter(prefix="/tourists", tags=["tourists"])
 
 
 def _generate_tourist_code(db: Session) -> str:
-    # Simple incremental code TR-<id>; in production you might want a more robust scheme
-    last = db.query(models.TouristProfile).order_by(models.TouristProfile.id.desc()).first()
-    next_id = 1 if not last else last.id + 1
-    return f"TR-{next_id:06d}"
+    # TR-<n> from a per-worker block of reserved numbers (see services.tourist_codes)
+    return tourist_codes.next_code(db.get_bind())
 
 
 @router.post("/", response_model=schemas.TouristProfileOut)
@@ -23,13 +25,8 @@ def create_or_update_tourist_profile(
     body: schemas.TouristProfileCreate,
     db: Session = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
+    profile: Optional[models.TouristProfile] = Depends(get_active_profile),
 ):
-    profile = (
-        db.query(models.TouristProfile)
-        .filter(models.TouristProfile.user_id == user.id, models.TouristProfile.is_active == True)  # noqa: E712
-        .first()
-    )
-
     payload = body.dict(exclude_unset=True)
     if "id_number" in payload and payload["id_number"] is not None:
         payload["id_number"] = encrypt_field(payload["id_number"])
@@ -63,14 +60,8 @@ def create_or_update_tourist_profile(
 
 @router.get("/me", response_model=schemas.TouristProfileOut)
 def get_my_tourist_profile(
-    db: Session = Depends(get_db),
-    user: CurrentUser = Depends(get_current_user),
+    profile: Optional[models.TouristProfile] = Depends(get_active_profile),
 ):
-    profile = (
-        db.query(models.TouristProfile)
-        .filter(models.TouristProfile.user_id == user.id, models.TouristProfile.is_active == True)  # noqa: E712
-        .first()
-    )
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No active tourist profile found")
 
@@ -107,11 +98,11 @@ def get_tourist_by_code(
 @router.get("/me/safety-score")
 def get_my_safety_score(
     db: Session = Depends(get_db),
-    user: CurrentUser = Depends(get_current_user),
+    profile: Optional[models.TouristProfile] = Depends(get_active_profile),
 ):
-    """Compute a heuristic safety score for the current tourist.
+    """Heuristic safety score for the current tourist.
 
-    High level model:
+    High level model (details in ``services.safety_score``):
     - Start from 100 points.
     - Look back over the last 14 days of alerts.
     - Newer alerts have more impact than older ones (time decay).
@@ -121,97 +112,34 @@ def get_my_safety_score(
       ceiling to avoid showing a misleadingly high score.
     - If there have been no alerts for several days, allow gradual recovery back
       toward a high score.
-    The result is stored on the tourist profile and returned as JSON.
+    The score is derived from a per-tourist accumulator maintained on every
+    alert write, so this does not read the tourist's alerts. The profile's
+    ``safety_score`` is only written when the value changes.
     """
 
-    profile = (
-        db.query(models.TouristProfile)
-        .filter(models.TouristProfile.user_id == user.id, models.TouristProfile.is_active == True)  # noqa: E712
-        .first()
-    )
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No active tourist profile found")
 
-    now = datetime.utcnow()
-    window_start = now - timedelta(days=14)
-
-    recent_alerts = (
-        db.query(models.SafetyAlert)
-        .filter(
-            models.SafetyAlert.tourist_profile_id == profile.id,
-            models.SafetyAlert.triggered_at >= window_start,
-        )
-        .all()
-    )
+    score = safety_score(db.connection(), profile.id)
+    if profile.safety_score != score:
+        profile.safety_score = score
+    db.commit()  # also keeps a state seeded on first use
 
-    score = 100.0
-    for alert in recent_alerts:
-        if not alert.triggered_at:
-            continue
-
-        # Time decay: recent alerts penalise more than older ones, over a 14-day window.
-        age_days = max(0.0, (now - alert.triggered_at).total_seconds() / 86400.0)
-        decay = 1.0 - min(age_days, 14.0) / 14.0
-        decay = max(decay, 0.3)  # never count completely as zero
-
-        # Base penalty by severity
-        if alert.severity == "critical":
-            base_penalty = 25.0
-        elif alert.severity == "high":
-            base_penalty = 15.0
-        elif alert.severity in {"medium", "low"}:
-            base_penalty = 7.0
-        else:
-            base_penalty = 5.0
-
-        # Extra weight by type / geography context
-        geo_factor = 1.0
-        if alert.type == "panic":
-            geo_factor = 1.5
-        elif alert.type == "geofence_breach":
-            geo_factor = 1.2
-
-        # Resolved incidents still affect the score but a bit less than active ones.
-        resolution_factor = 0.7 if alert.status == "resolved" else 1.0
-
-        penalty = base_penalty * decay * geo_factor * resolution_factor
-        score -= penalty
-
-    # If there is any unresolved critical panic in last 24h, clamp to a lower ceiling.
-    recent_critical_panic = (
-        db.query(models.SafetyAlert)
-        .filter(
-            models.SafetyAlert.tourist_profile_id == profile.id,
-            models.SafetyAlert.type == "panic",
-            models.SafetyAlert.severity == "critical",
-            models.SafetyAlert.status != "resolved",
-            models.SafetyAlert.triggered_at >= now - timedelta(hours=24),
-        )
-        .first()
-    )
-    if recent_critical_panic is not None:
-        score = min(score, 40.0)
-
-    # Gentle recovery: if there have been no alerts at all in the last 3 days,
-    # nudge the score upwards toward a "safe" band.
-    quiet_window_start = now - timedelta(days=3)
-    has_recent_incident = (
-        db.query(models.SafetyAlert)
-        .filter(
-            models.SafetyAlert.tourist_profile_id == profile.id,
-            models.SafetyAlert.triggered_at >= quiet_window_start,
-        )
-        .first()
-        is not None
-    )
+    return {"safety_score": score}
 
-    if not has_recent_incident and score < 90.0:
-        score = min(90.0, score + 10.0)
 
-    score = max(0.0, min(100.0, score))
+@router.post("/safety-scores/recompute")
+def recompute_all_safety_scores(
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_admin),  # noqa: ARG001
+):
+    """Recompute ``safety_score`` for every active tourist (admin only).
 
-    profile.safety_score = int(round(score))
-    db.add(profile)
-    db.commit()
+    Same model as ``/me/safety-score``, evaluated for the whole fleet in one
+    streamed pass over the last 14 days of alerts; only changed scores are
+    written. Always runs in this process (``SAFETY_SCORE_BATCH_WORKERS`` only
+    applies to the job): for large fleets use the
+    ``app.jobs.recompute_safety_scores`` job, which does not hold a request open.
+    """
 
-    return {"safety_score": profile.safety_score}
+    return recompute_safety_scores(db, workers=1, batch_size=settings.SAFETY_SCORE_BATCH_SIZE)
@@ -1,7 +1,9 @@
 from datetime import date, datetime
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field, root_validator
+from pydantic import BaseModel, Field, root_validator, validator
+
+from .services.geometry import normalize_zone_geometry
 
 
 class TouristProfileBase(BaseModel):
@@ -86,7 +88,10 @@ class RiskZoneBase(BaseModel):
 
 
 class RiskZoneCreate(RiskZoneBase):
-    pass
+    @validator("geom")
+    def validate_geom(cls, value: Any) -> dict:
+        # Accepts {"bbox": [...]} or GeoJSON Polygon/MultiPolygon; adds the bbox used for prefiltering.
+        return normalize_zone_geometry(value)
 
 
 class RiskZoneUpdate(BaseModel):
@@ -98,6 +103,12 @@ class RiskZoneUpdate(BaseModel):
     geom: Optional[Any] = None
     is_active: Optional[bool] = None
 
+    @validator("geom")
+    def validate_geom(cls, value: Any) -> Optional[dict]:
+        if value is None:
+            return None
+        return normalize_zone_geometry(value)
+
 
 class RiskZoneOut(RiskZoneBase):
     id: int
@@ -110,6 +121,12 @@ class RiskZoneOut(RiskZoneBase):
         from_attributes = True
 
 
+class RiskZoneDeltaOut(BaseModel):
+    cursor: datetime
+    zones: list[RiskZoneOut]
+    removed: list[int]
+
+
 class LocationIn(BaseModel):
     tourist_id_code: str
     lat: float
@@ -133,6 +150,28 @@ class TouristLocationOut(BaseModel):
         from_attributes = True
 
 
+class TouristLastLocationOut(BaseModel):
+    tourist_profile_id: int
+    tourist_id_code: str
+    lat: float
+    lng: float
+    accuracy_m: Optional[float]
+    source: Optional[str]
+    recorded_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class NearbyTouristOut(BaseModel):
+    tourist_profile_id: int
+    tourist_id_code: str
+    lat: float
+    lng: float
+    recorded_at: datetime
+    distance_m: float
+
+
 class SafetyAlertBase(BaseModel):
     type: str
     severity: str
@@ -148,6 +187,7 @@ class SafetyAlertOut(SafetyAlertBase):
     tourist_profile_id: Optional[int]
     tourist_id_code: Optional[str]
     status: str
+    zone_id: Optional[int] = None
     triggered_at: datetime
     resolved_at: Optional[datetime]
     resolved_by: Optional[str]
@@ -156,6 +196,62 @@ class SafetyAlertOut(SafetyAlertBase):
         from_attributes = True
 
 
+class AlertBulkFilter(BaseModel):
+    status: Optional[str] = None
+    type: Optional[str] = None
+    severity: Optional[str] = None
+    tourist_id_code: Optional[str] = None
+
+
+class AlertBulkRequest(BaseModel):
+    action: Literal["acknowledge", "resolve"]
+    ids: Optional[list[int]] = Field(default=None, min_length=1, max_length=10_000)
+    filter: Optional[AlertBulkFilter] = None
+
+    @root_validator(skip_on_failure=True)
+    def validate_single_selector(cls, values: dict) -> dict:
+        ids, alert_filter = values.get("ids"), values.get("filter")
+        if (ids is None) == (alert_filter is None):
+            raise ValueError("Provide either ids or filter, not both.")
+        if alert_filter is not None and not any(alert_filter.model_dump().values()):
+            raise ValueError("filter needs at least one field; bulk updates of every alert are not allowed.")
+        return values
+
+
+class AlertStatsBucket(BaseModel):
+    bucket_start: datetime
+    total: int
+    by_severity: dict[str, int]
+    by_type: dict[str, int]
+    by_status: dict[str, int]
+
+
+class AlertStatsOut(BaseModel):
+    since: datetime
+    until: datetime
+    bucket: str
+    total: int
+    by_severity: dict[str, int]
+    by_type: dict[str, int]
+    by_status: dict[str, int]
+    by_city: dict[str, int]
+    buckets: list[AlertStatsBucket]
+
+
+class HeatmapTileOut(BaseModel):
+    z: int
+    x: int
+    y: int
+    source: str
+    since: datetime
+    until: datetime
+    grid: int
+    bbox: list[float]  # min_lng, min_lat, max_lng, max_lat
+    total: int
+    max: int
+    cells: list[list[int]]  # [col, row, count] for non-empty cells
+
+
 class PanicRequest(BaseModel):
     tourist_id_code: Optional[str] = None
     lat: Optional[float] = None
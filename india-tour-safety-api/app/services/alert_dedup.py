@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+
+class RecentAlertCache:
+    """Bounded in-process memory of recent geofence alerts.
+
+    Maps ``(profile_id, zone_id)`` to the ``triggered_at`` of the latest
+    unresolved geofence alert, so "already alerted for this zone?" can be
+    answered without a query while the entry is inside the de-duplication
+    window. Only positive answers are cached: a miss always falls back to
+    the database, which keeps alerts created by other workers visible.
+    """
+
+    def __init__(self, window: timedelta, max_entries: int = 100_000):
+        self.window = window
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], datetime]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def alerted_zones(self, profile_id: int, zone_ids: Iterable[int], now: datetime) -> set[int]:
+        window_start = now - self.window
+        alerted: set[int] = set()
+        with self._lock:
+            for zone_id in zone_ids:
+                key = (profile_id, zone_id)
+                triggered_at = self._entries.get(key)
+                if triggered_at is None:
+                    continue
+                if triggered_at < window_start:
+                    del self._entries[key]
+                    continue
+                alerted.add(zone_id)
+        return alerted
+
+    def record(self, profile_id: int, zone_id: int, triggered_at: datetime) -> None:
+        key = (profile_id, zone_id)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or triggered_at > current:
+                self._entries[key] = triggered_at
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, profile_id: Optional[int], zone_id: Optional[int]) -> None:
+        if profile_id is None or zone_id is None:
+            return
+        with self._lock:
+            self._entries.pop((profile_id, zone_id), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
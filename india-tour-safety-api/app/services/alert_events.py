@@ -0,0 +1,119 @@
+"""Flush-time hooks for SafetyAlert inserts, updates and deletes.
+
+Derived tables that must stay consistent with safety_alerts (the stats
+rollups, for example) register a handler here instead of being updated by
+every endpoint that touches alerts. Handlers run inside the flush, on the
+same connection and transaction, so a rollback discards their writes too.
+
+Set-based ``UPDATE`` statements bypass the ORM; code issuing them passes
+the resulting changes to ``dispatch_alert_changes`` itself.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+class AlertSnapshot(NamedTuple):
+    """The alert fields derived data is keyed on."""
+
+    id: Optional[int]
+    tourist_profile_id: Optional[int]
+    type: str
+    severity: str
+    status: str
+    triggered_at: datetime
+    city: str
+
+
+class AlertChange(NamedTuple):
+    before: Optional[AlertSnapshot]  # None for an insert
+    after: Optional[AlertSnapshot]  # None for a delete
+
+
+AlertChangeHandler = Callable[[Connection, List[AlertChange]], None]
+
+_handlers: List[AlertChangeHandler] = []
+
+_TRACKED = ("tourist_profile_id", "type", "severity", "status", "triggered_at", "extra_data")
+
+
+def _load_previous_value(target: Any, value: Any, oldvalue: Any, initiator: Any) -> None:  # noqa: ARG001
+    pass
+
+
+# active_history makes the ORM load the old value when a tracked attribute is set on an
+# expired alert (e.g. right after a commit); otherwise the "before" snapshot would already
+# hold the new value and the change would be dropped as a no-op.
+for _name in _TRACKED:
+    event.listen(getattr(models.SafetyAlert, _name), "set", _load_previous_value, active_history=True)
+
+
+def on_alert_changes(handler: AlertChangeHandler) -> AlertChangeHandler:
+    """Register ``handler`` (usable as a decorator)."""
+
+    if handler not in _handlers:
+        _handlers.append(handler)
+    return handler
+
+
+def alert_city(extra_data: Any) -> str:
+    if not isinstance(extra_data, dict):
+        return ""
+    return str(extra_data.get("zone_city") or extra_data.get("city") or "")[:128]
+
+
+def snapshot(values: Any, alert_id: Optional[int] = None) -> AlertSnapshot:
+    """Build a snapshot from an alert, a Row or a mapping with the tracked fields."""
+
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name, None)
+    return AlertSnapshot(
+        id=alert_id if alert_id is not None else get("id"),
+        tourist_profile_id=get("tourist_profile_id"),
+        type=get("type"),
+        severity=get("severity"),
+        status=get("status") or "new",
+        triggered_at=get("triggered_at"),
+        city=alert_city(get("extra_data")),
+    )
+
+
+def dispatch_alert_changes(connection: Connection, changes: List[AlertChange]) -> None:
+    changes = [change for change in changes if change.before != change.after]
+    if not changes:
+        return
+    for handler in _handlers:
+        handler(connection, changes)
+
+
+def _previous_values(alert: models.SafetyAlert) -> dict:
+    state = inspect(alert)
+    values = {}
+    for name in _TRACKED:
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if history.deleted else getattr(alert, name)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_alert_changes(session: Session, flush_context: Any) -> None:  # noqa: ARG001
+    changes: List[AlertChange] = []
+    for obj in session.new:
+        if isinstance(obj, models.SafetyAlert):
+            changes.append(AlertChange(None, snapshot(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, models.SafetyAlert) and session.is_modified(obj, include_collections=False):
+            changes.append(AlertChange(snapshot(_previous_values(obj), obj.id), snapshot(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, models.SafetyAlert):
+            changes.append(AlertChange(snapshot(_previous_values(obj), obj.id), None))
+
+    if changes and _handlers:
+        dispatch_alert_changes(session.connection(), changes)
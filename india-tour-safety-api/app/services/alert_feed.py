@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .. import models, schemas
+
+
+FEED_HISTORY = 1000  # events kept for Last-Event-ID resume
+SUBSCRIBER_BUFFER = 256  # events queued per console before it is disconnected
+
+logger = logging.getLogger(__name__)
+
+# (event id, event name, payload)
+FeedEvent = Tuple[str, str, Dict[str, Any]]
+# In-process consumers (cache invalidation etc.), called with (event name, payload)
+FeedListener = Callable[[str, Dict[str, Any]], None]
+
+
+class AlertSubscription:
+    """One SSE client: a bounded asyncio queue fed from any thread.
+
+    A subscriber that falls ``SUBSCRIBER_BUFFER`` events behind is marked
+    overflowed and disconnected rather than silently skipping alerts; the
+    browser reconnects with Last-Event-ID and catches up from the history.
+    The replayed events are held in ``backlog`` (served before the queue),
+    not in the queue, so a gap longer than the buffer can still be replayed.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[FeedEvent]" = asyncio.Queue(maxsize=buffer)
+        self.backlog: Deque[FeedEvent] = deque()
+        self.overflowed = False
+
+    def push(self, event: FeedEvent) -> None:
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: FeedEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> FeedEvent:
+        if self.backlog:
+            return self.backlog.popleft()
+        return await self.queue.get()
+
+
+class AlertFeed:
+    """In-process fan-out of alert changes to live admin consoles.
+
+    Event ids are ``<epoch>-<sequence>``; the epoch changes every time the
+    process starts, so a Last-Event-ID from another worker or an earlier run
+    is recognised as unknown and answered with a ``reset`` event (the client
+    should refetch the list) instead of a silently incomplete replay.
+    """
+
+    def __init__(self, history: int = FEED_HISTORY, subscriber_buffer: int = SUBSCRIBER_BUFFER):
+        self.subscriber_buffer = subscriber_buffer
+        self.epoch = secrets.token_hex(4)
+        self._history: Deque[Tuple[int, FeedEvent]] = deque(maxlen=history)
+        self._seq = 0
+        self._subscribers: Set[AlertSubscription] = set()
+        self._listeners: List[FeedListener] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._overflowed = 0
+
+    def publish(self, event: str, alert: models.SafetyAlert) -> str:
+        payload = schemas.SafetyAlertOut.model_validate(alert).model_dump(mode="json")
+        with self._lock:
+            self._seq += 1
+            item: FeedEvent = (f"{self.epoch}-{self._seq}", event, payload)
+            self._history.append((self._seq, item))
+            self._published += 1
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.push(item)
+                except RuntimeError:
+                    # The subscriber's event loop has shut down
+                    self._subscribers.discard(subscriber)
+        for listener in self._listeners:
+            try:
+                listener(event, payload)
+            except Exception:
+                logger.exception("Alert feed listener %r failed", listener)
+        return item[0]
+
+    def add_listener(self, listener: FeedListener) -> None:
+        """Call ``listener`` synchronously (in the publishing thread) for every event."""
+
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def publish_many(self, event: str, alerts: List[models.SafetyAlert]) -> None:
+        for alert in alerts:
+            self.publish(event, alert)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> AlertSubscription:
+        """Register a subscriber, pre-loaded with anything it missed since ``last_event_id``."""
+
+        subscription = AlertSubscription(asyncio.get_running_loop(), self.subscriber_buffer)
+        with self._lock:
+            if last_event_id:
+                subscription.backlog.extend(self._replay(last_event_id))
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _replay(self, last_event_id: str) -> List[FeedEvent]:
+        epoch, _, seq = last_event_id.partition("-")
+        oldest = self._history[0][0] if self._history else self._seq + 1
+        if epoch != self.epoch or not seq.isdigit() or int(seq) + 1 < oldest:
+            return [(f"{self.epoch}-{self._seq}", "reset", {"reason": "history unavailable"})]
+        return [item for seq_no, item in self._history if seq_no > int(seq)]
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if subscription.overflowed:
+                self._overflowed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published_total": self._published,
+                "overflow_disconnects_total": self._overflowed,
+                "history": len(self._history),
+            }
+
+
+def format_sse(item: FeedEvent) -> str:
+    event_id, event, payload = item
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+alert_feed = AlertFeed()
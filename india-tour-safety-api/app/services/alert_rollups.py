@@ -0,0 +1,89 @@
+"""Incremental hourly alert counts in ``safety_alert_rollups``.
+
+Every alert change moves one unit between (hour, severity, type, status,
+city) cells: an insert adds one to its cell, a status change takes one from
+the old cell and adds it to the new one. The deltas of a flush are netted
+and applied with one upsert per touched cell, inside the same transaction
+as the alert write, so the rollups never drift from safety_alerts.
+``app.jobs.rebuild_alert_rollups`` recomputes them from scratch if needed.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, update
+from sqlalchemy.engine import Connection
+
+from .. import models
+from ..db import upsert_insert
+from .alert_events import AlertChange, AlertSnapshot, on_alert_changes
+
+# (bucket_start, severity, type, status, city)
+RollupKey = Tuple[datetime, str, str, str, str]
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_key(alert: AlertSnapshot) -> Optional[RollupKey]:
+    if alert.triggered_at is None:
+        return None
+    return (hour_bucket(alert.triggered_at), alert.severity, alert.type, alert.status, alert.city or "")
+
+
+def rollup_deltas(changes: Iterable[AlertChange]) -> Dict[RollupKey, int]:
+    deltas: Counter = Counter()
+    for change in changes:
+        before = rollup_key(change.before) if change.before else None
+        after = rollup_key(change.after) if change.after else None
+        if before == after:
+            continue
+        if before is not None:
+            deltas[before] -= 1
+        if after is not None:
+            deltas[after] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_rollup_deltas(connection: Connection, deltas: Dict[RollupKey, int]) -> None:
+    """Add ``deltas`` to their cells, creating cells that do not exist yet."""
+
+    if not deltas:
+        return
+    t = models.SafetyAlertRollup.__table__
+    rows = [
+        {"bucket_start": b, "severity": sev, "type": typ, "status": st, "city": city, "count": delta}
+        for (b, sev, typ, st, city), delta in sorted(deltas.items())  # fixed order avoids upsert deadlocks
+    ]
+
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(t)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.bucket_start, t.c.severity, t.c.type, t.c.status, t.c.city],
+            set_={"count": t.c.count + stmt.excluded["count"]},
+        )
+        for row in rows:
+            connection.execute(stmt, row)
+        return
+
+    for row in rows:
+        match = and_(
+            t.c.bucket_start == row["bucket_start"],
+            t.c.severity == row["severity"],
+            t.c.type == row["type"],
+            t.c.status == row["status"],
+            t.c.city == row["city"],
+        )
+        result = connection.execute(update(t).where(match).values(count=t.c.count + row["count"]))
+        if result.rowcount == 0:
+            connection.execute(insert(t).values(**row))
+
+
+@on_alert_changes
+def _update_alert_rollups(connection: Connection, changes: List[AlertChange]) -> None:
+    apply_rollup_deltas(connection, rollup_deltas(changes))
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from ..db import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxItem(NamedTuple):
+    id: int
+    kind: str
+    alert_id: Optional[int]
+    payload: Dict[str, Any]
+    attempts: int  # including the current one
+    # Sub-deliveries (e.g. notification channels) already done; handlers append to it and
+    # it is saved whatever the outcome, so a retry can skip them
+    delivered: List[str]
+
+
+# Deliver the item or raise to have it retried
+OutboxHandler = Callable[[OutboxItem], None]
+
+
+class DispatchOutbox:
+    """Background delivery of ``dispatch_outbox`` rows.
+
+    Producers call ``enqueue`` inside the transaction that creates the alert
+    and ``notify`` after committing; request latency is then just that
+    commit. A pool of worker threads claims due rows in small batches
+    (``FOR UPDATE SKIP LOCKED`` where supported, so several API processes
+    can drain one table), runs the handler registered for the row's kind
+    outside any transaction and records the outcome. Failed rows are retried
+    after ``backoff_seconds * 2**(attempt-1)`` (jittered, capped at
+    ``backoff_max_seconds``) and marked ``dead`` after ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        workers: int = 2,
+        poll_seconds: float = 2.0,
+        batch_size: int = 10,
+        max_attempts: int = 8,
+        backoff_seconds: float = 2.0,
+        backoff_max_seconds: float = 600.0,
+        lease_seconds: float = 60.0,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        self.clock = clock
+
+        self._handlers: Dict[str, OutboxHandler] = {}
+        self._threads: List[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+
+    def register(self, kind: str, handler: OutboxHandler) -> None:
+        self._handlers[kind] = handler
+
+    def enqueue(
+        self, db: Session, kind: str, payload: Dict[str, Any], alert: Optional[models.SafetyAlert] = None
+    ) -> models.DispatchOutbox:
+        """Add a row to ``db``'s transaction; it becomes visible to workers on commit."""
+
+        row = models.DispatchOutbox(kind=kind, payload=payload, alert=alert, next_attempt_at=self.clock())
+        db.add(row)
+        return row
+
+    def notify(self) -> None:
+        """Wake idle workers so freshly committed rows go out without waiting for the poll."""
+
+        self._wake.set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"dispatch-outbox-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Finish in-flight deliveries and join the workers; unclaimed rows stay for the next start."""
+
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run_once(self) -> int:
+        """Claim and process one batch of due rows; returns how many were claimed."""
+
+        items = self._claim()
+        for item in items:
+            self._process(item)
+        return len(items)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            # Cleared before claiming, so a notify() during the batch triggers another pass
+            self._wake.clear()
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Dispatch outbox poll failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._wake.wait(self.poll_seconds)
+
+    def _claim(self) -> List[OutboxItem]:
+        t = models.DispatchOutbox.__table__
+        now = self.clock()
+        due = (t.c.status == "pending", t.c.next_attempt_at <= now)
+        candidates = (
+            select(t.c.id)
+            .where(*due)
+            .order_by(t.c.next_attempt_at, t.c.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        db = self.session_factory()
+        try:
+            # The lease doubles as the retry time should this worker die mid-delivery
+            rows = db.execute(
+                update(t)
+                .where(t.c.id.in_(candidates.scalar_subquery()), *due)
+                .values(attempts=t.c.attempts + 1, next_attempt_at=now + self.lease)
+                .returning(t.c.id, t.c.kind, t.c.alert_id, t.c.payload, t.c.attempts, t.c.delivered_channels)
+            ).all()
+            db.commit()
+        finally:
+            db.close()
+        return [
+            OutboxItem(row.id, row.kind, row.alert_id, row.payload or {}, row.attempts, row.delivered_channels or [])
+            for row in rows
+        ]
+
+    def _process(self, item: OutboxItem) -> None:
+        handler = self._handlers.get(item.kind)
+        error: Optional[str] = None
+        if handler is None:
+            error = f"No handler registered for {item.kind!r}"
+        else:
+            try:
+                handler(item)
+            except Exception as exc:  # noqa: BLE001
+                error = f"{type(exc).__name__}: {exc}"[:2000]
+                logger.warning("Dispatch %s #%d attempt %d failed: %s", item.kind, item.id, item.attempts, error)
+
+        now = self.clock()
+        if error is None:
+            values: Dict[str, Any] = {"status": "sent", "sent_at": now, "last_error": None}
+        elif handler is None or item.attempts >= self.max_attempts:
+            values = {"status": "dead", "last_error": error}
+            logger.error("Dispatch %s #%d dead-lettered after %d attempts", item.kind, item.id, item.attempts)
+        else:
+            values = {"last_error": error, "next_attempt_at": now + timedelta(seconds=self.backoff(item.attempts))}
+        values["delivered_channels"] = list(item.delivered)
+
+        t = models.DispatchOutbox.__table__
+        db = self.session_factory()
+        try:
+            db.execute(update(t).where(t.c.id == item.id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            if error is None:
+                self._sent += 1
+            elif values.get("status") == "dead":
+                self._dead += 1
+            else:
+                self._retried += 1
+
+    def requeue_dead(self, db: Session) -> int:
+        """Give every dead-lettered row a fresh set of attempts."""
+
+        t = models.DispatchOutbox.__table__
+        result = db.execute(
+            update(t).where(t.c.status == "dead").values(status="pending", attempts=0, next_attempt_at=self.clock())
+        )
+        db.commit()
+        return result.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "sent_total": self._sent,
+                "retried_total": self._retried,
+                "dead_total": self._dead,
+            }
+
+
+dispatch_outbox = DispatchOutbox(
+    SessionLocal,
+    workers=settings.SAFETY_DISPATCH_WORKERS,
+    poll_seconds=settings.SAFETY_DISPATCH_POLL_SECONDS,
+    max_attempts=settings.SAFETY_DISPATCH_MAX_ATTEMPTS,
+    backoff_seconds=settings.SAFETY_DISPATCH_BACKOFF_SECONDS,
+    backoff_max_seconds=settings.SAFETY_DISPATCH_BACKOFF_MAX_SECONDS,
+    lease_seconds=settings.SAFETY_DISPATCH_LEASE_SECONDS,
+)
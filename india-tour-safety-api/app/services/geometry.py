@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+BBox = Tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+class ZoneShape:
+    """Parsed zone geometry.
+
+    ``rings`` holds every ring (outer boundaries and holes, across all
+    polygons of a MultiPolygon) as closed ``(k, 2)`` arrays of ``[lng, lat]``.
+    A bbox-only geom has no rings and is treated as an exact rectangle.
+    """
+
+    __slots__ = ("bbox", "rings")
+
+    def __init__(self, bbox: BBox, rings: Optional[List[np.ndarray]] = None):
+        self.bbox = bbox
+        self.rings = rings or []
+
+    @property
+    def is_rect(self) -> bool:
+        return not self.rings
+
+
+def _parse_bbox(raw: object) -> BBox:
+    if not isinstance(raw, (list, tuple)) or len(raw) != 4:
+        raise ValueError("bbox must be [min_lng, min_lat, max_lng, max_lat]")
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in raw)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("bbox values must be numbers") from exc
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        raise ValueError("bbox values must be finite")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox minimum must not exceed maximum")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _parse_ring(raw: object) -> np.ndarray:
+    try:
+        ring = np.asarray(raw, dtype=float)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("ring coordinates must be [lng, lat] number pairs") from exc
+    if ring.ndim != 2 or ring.shape[1] < 2:
+        raise ValueError("ring coordinates must be [lng, lat] number pairs")
+    ring = ring[:, :2]
+    if not np.isfinite(ring).all():
+        raise ValueError("ring coordinates must be finite")
+    if not np.array_equal(ring[0], ring[-1]):
+        ring = np.vstack([ring, ring[:1]])
+    if len(ring) < 4:
+        raise ValueError("a ring needs at least three distinct positions")
+    return ring
+
+
+def _parse_polygon(raw: object) -> List[np.ndarray]:
+    if not isinstance(raw, (list, tuple)) or not raw:
+        raise ValueError("Polygon coordinates must be a non-empty list of rings")
+    return [_parse_ring(ring) for ring in raw]
+
+
+def parse_zone_geometry(geom: object) -> ZoneShape:
+    """Parse a ``RiskZone.geom`` value.
+
+    Accepts the legacy ``{"bbox": [...]}`` rectangle as well as GeoJSON
+    Polygon / MultiPolygon geometries (optionally wrapped in a Feature).
+    Raises ``ValueError`` for anything else.
+    """
+
+    if not isinstance(geom, dict):
+        raise ValueError("geom must be an object")
+
+    if geom.get("type") == "Feature":
+        return parse_zone_geometry(geom.get("geometry"))
+
+    geom_type = geom.get("type")
+    if geom_type is None:
+        return ZoneShape(_parse_bbox(geom.get("bbox")))
+
+    coordinates = geom.get("coordinates")
+    if geom_type == "Polygon":
+        rings = _parse_polygon(coordinates)
+    elif geom_type == "MultiPolygon":
+        if not isinstance(coordinates, (list, tuple)) or not coordinates:
+            raise ValueError("MultiPolygon coordinates must be a non-empty list of polygons")
+        rings = [ring for polygon in coordinates for ring in _parse_polygon(polygon)]
+    else:
+        raise ValueError(f"Unsupported geometry type: {geom_type}")
+
+    points = np.vstack(rings)
+    min_lng, min_lat = points.min(axis=0)
+    max_lng, max_lat = points.max(axis=0)
+    return ZoneShape((float(min_lng), float(min_lat), float(max_lng), float(max_lat)), rings)
+
+
+def normalize_zone_geometry(geom: object) -> dict:
+    """Validate a zone geom and make sure it carries a top-level bbox.
+
+    Clients that only understand the bbox (and the bbox prefilter itself)
+    keep working for polygon zones.
+    """
+
+    shape = parse_zone_geometry(geom)
+    normalized = dict(geom)  # type: ignore[arg-type]
+    normalized["bbox"] = list(shape.bbox)
+    return normalized
+
+
+class GeofenceEngine:
+    """Vectorized point-in-zone evaluation over many points and many zones.
+
+    Zone and ring bboxes are precomputed so the even-odd crossing test only
+    runs for (point, ring) pairs that survive the bbox prefilter. Rings of a
+    zone are combined with XOR, which handles polygon holes and the disjoint
+    parts of a MultiPolygon in one pass.
+    """
+
+    def __init__(self, shapes: Sequence[ZoneShape]):
+        self.size = len(shapes)
+        self.zone_bboxes = np.array([shape.bbox for shape in shapes], dtype=float).reshape(-1, 4)
+        self.zone_is_rect = np.array([shape.is_rect for shape in shapes], dtype=bool)
+
+        rings: List[np.ndarray] = []
+        ring_zone: List[int] = []
+        for position, shape in enumerate(shapes):
+            rings.extend(shape.rings)
+            ring_zone.extend([position] * len(shape.rings))
+        self.rings = rings
+        self.ring_zone = np.array(ring_zone, dtype=np.int64)
+        self.ring_bboxes = np.array(
+            [(r[:, 0].min(), r[:, 1].min(), r[:, 0].max(), r[:, 1].max()) for r in rings],
+            dtype=float,
+        ).reshape(-1, 4)
+
+    @staticmethod
+    def _in_bboxes(lats: np.ndarray, lngs: np.ndarray, bboxes: np.ndarray) -> np.ndarray:
+        return (
+            (lngs[:, None] >= bboxes[None, :, 0])
+            & (lngs[:, None] <= bboxes[None, :, 2])
+            & (lats[:, None] >= bboxes[None, :, 1])
+            & (lats[:, None] <= bboxes[None, :, 3])
+        )
+
+    @staticmethod
+    def _in_ring(lats: np.ndarray, lngs: np.ndarray, ring: np.ndarray) -> np.ndarray:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        straddles = (y1[None, :] > lats[:, None]) != (y2[None, :] > lats[:, None])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1[None, :] + (lats[:, None] - y1[None, :]) * (x2 - x1)[None, :] / (y2 - y1)[None, :]
+        crossings = straddles & (lngs[:, None] < x_cross)
+        return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+    def contains(
+        self,
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        zones: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """Return an ``(n_points, n_zones)`` boolean matrix.
+
+        ``zones`` optionally restricts evaluation to a subset of zone
+        positions; the result columns then follow that order.
+        """
+
+        lats = np.asarray(lats, dtype=float).reshape(-1)
+        lngs = np.asarray(lngs, dtype=float).reshape(-1)
+        positions = np.arange(self.size) if zones is None else np.asarray(zones, dtype=np.int64).reshape(-1)
+
+        # bbox prefilter; for bbox-only zones this is already the exact answer
+        in_bbox = self._in_bboxes(lats, lngs, self.zone_bboxes[positions])
+        result = in_bbox & self.zone_is_rect[positions][None, :]
+
+        poly_columns = np.flatnonzero(~self.zone_is_rect[positions] & in_bbox.any(axis=0))
+        if poly_columns.size == 0 or not self.rings:
+            return result
+
+        column_of = {int(positions[column]): int(column) for column in poly_columns}
+        ring_ids = np.flatnonzero(np.isin(self.ring_zone, positions[poly_columns]))
+        in_ring_bbox = self._in_bboxes(lats, lngs, self.ring_bboxes[ring_ids])
+
+        for k, ring_id in enumerate(ring_ids):
+            point_ids = np.flatnonzero(in_ring_bbox[:, k])
+            if point_ids.size == 0:
+                continue
+            inside = self._in_ring(lats[point_ids], lngs[point_ids], self.rings[ring_id])
+            column = column_of[int(self.ring_zone[ring_id])]
+            result[point_ids, column] ^= inside
+
+        return result
+
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_m(lat1: ArrayLike, lng1: ArrayLike, lat2: ArrayLike, lng2: ArrayLike) -> np.ndarray:
+    """Great-circle distance in metres; accepts scalars or NumPy arrays (broadcast)."""
+
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def douglas_peucker(lats: Sequence[float], lngs: Sequence[float], epsilon_m: float) -> np.ndarray:
+    """Return a keep-mask simplifying a track with the Douglas–Peucker algorithm.
+
+    Points are projected to a local equirectangular plane in metres (fine at
+    city scale), and each split measures the distance of every point in the
+    segment to the chord in one vectorized step. Endpoints are always kept.
+    """
+
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    n = len(lats)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    scale = np.radians(1.0) * EARTH_RADIUS_M
+    xs = lngs * scale * np.cos(np.radians(lats.mean()))
+    ys = lats * scale
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg_x, seg_y = xs[start + 1 : end], ys[start + 1 : end]
+        dx, dy = xs[end] - xs[start], ys[end] - ys[start]
+        chord = np.hypot(dx, dy)
+        if chord == 0:
+            distances = np.hypot(seg_x - xs[start], seg_y - ys[start])
+        else:
+            distances = np.abs(dy * (seg_x - xs[start]) - dx * (seg_y - ys[start])) / chord
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > epsilon_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
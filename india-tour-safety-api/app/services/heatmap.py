@@ -0,0 +1,348 @@
+"""Density heatmaps of alerts and location fixes on slippy-map tiles.
+
+A tile ``z/x/y`` (the usual web-mercator scheme) is split into ``grid x
+grid`` cells, i.e. the tiles of zoom ``z + log2(grid)``. Points are binned
+with a vectorized projection plus ``np.bincount``.
+
+Counts are cached per (source, filter, tile, grid, hour) in an LRU, sparse
+(only non-empty cells), and a request for a time range sums its hours. Past
+hours do not change, apart from late writes, so they stay cached until
+evicted. The open hour expires after a short TTL, and for alerts
+``invalidate_alert`` (driven by the alert feed) drops exactly the affected
+(tile, hour) entries as new alerts are committed, so they appear at once.
+
+Location fixes can arrive hours late (batch and offline uploads keep their
+recorded_at). Writers register their rows with ``track_location_writes``
+and, once the session commits, the closed hours they fall in are dropped
+the same way. Past location hours also expire after a longer TTL, which
+covers writes this process does not see (other workers, jobs).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from .alert_feed import alert_feed
+from .location_partitions import location_partitions
+
+
+MAX_ZOOM = 18
+MAX_LAT = 85.05112878  # web-mercator limit
+HOUR = timedelta(hours=1)
+LATE_WRITE_GRACE = timedelta(minutes=5)  # write-behind / clock skew allowance before an hour is final
+
+# (source, filter, z, x, y, grid, hour_start)
+CacheKey = Tuple[str, Tuple[str, ...], int, int, int, int, datetime]
+SparseCounts = Tuple[np.ndarray, np.ndarray]  # (flat cell indices, counts)
+
+_INFO_KEY = "heatmap_late_locations"
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of a tile."""
+
+    n = 2**z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _project(lngs: np.ndarray, lats: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fractional tile coordinates at zoom ``z``."""
+
+    n = 2.0**z
+    lat_rad = np.radians(np.clip(lats, -MAX_LAT, MAX_LAT))
+    px = (lngs + 180.0) / 360.0 * n
+    py = (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n
+    return px, py
+
+
+def bin_points(lats: ArrayLike, lngs: ArrayLike, z: int, x: int, y: int, grid: int) -> SparseCounts:
+    """Count points per cell of tile ``z/x/y``; points outside the tile are ignored."""
+
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    if lats.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    px, py = _project(lngs, lats, z)
+    col = np.floor((px - x) * grid).astype(np.int64)
+    row = np.floor((py - y) * grid).astype(np.int64)
+    inside = (col >= 0) & (col < grid) & (row >= 0) & (row < grid)
+    counts = np.bincount(row[inside] * grid + col[inside], minlength=grid * grid)
+    cells = np.flatnonzero(counts)
+    return cells, counts[cells]
+
+
+def hour_floor(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class HeatmapCache:
+    """LRU of sparse per-hour tile counts, with point-based invalidation."""
+
+    def __init__(
+        self,
+        max_entries: int = 20_000,
+        open_ttl_seconds: float = 30.0,
+        location_ttl_seconds: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.open_ttl = open_ttl_seconds
+        self.location_ttl = location_ttl_seconds
+        # key -> (counts, expires_at monotonic or None)
+        self._entries: "OrderedDict[CacheKey, Tuple[SparseCounts, Optional[float]]]" = OrderedDict()
+        # (source, z, x, y, hour) -> keys, so an alert can find its entries at every zoom
+        self._by_tile: Dict[Tuple[str, int, int, int, datetime], Set[CacheKey]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidated = 0
+
+    def get(self, key: CacheKey) -> Optional[SparseCounts]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > monotonic()):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self._misses += 1
+            return None
+
+    def put(self, key: CacheKey, counts: SparseCounts, final: bool) -> None:
+        with self._lock:
+            self._remove(key)
+            if not final:
+                expires: Optional[float] = monotonic() + self.open_ttl
+            elif key[0] == "locations" and self.location_ttl is not None:
+                expires = monotonic() + self.location_ttl
+            else:
+                expires = None
+            self._entries[key] = (counts, expires)
+            self._by_tile[(key[0], key[2], key[3], key[4], key[6])].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: CacheKey) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        tile = (key[0], key[2], key[3], key[4], key[6])
+        keys = self._by_tile.get(tile)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_tile[tile]
+
+    def invalidate_point(self, source: str, lat: float, lng: float, ts: datetime) -> int:
+        """Drop the entries (any zoom, filter or grid) whose tile and hour contain this point."""
+
+        return self.invalidate_points(source, [lat], [lng], [ts])
+
+    def invalidate_points(
+        self, source: str, lats: Sequence[float], lngs: Sequence[float], stamps: Sequence[datetime]
+    ) -> int:
+        """``invalidate_point`` for many points, each (tile, hour) looked up once."""
+
+        if not stamps:
+            return 0
+        hours = [hour_floor(ts) for ts in stamps]
+        dropped = 0
+        with self._lock:
+            if not self._by_tile:
+                return 0
+            px, py = _project(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float), MAX_ZOOM)
+            points = set(zip(px.astype(np.int64).tolist(), py.astype(np.int64).tolist(), hours))
+            for z in range(MAX_ZOOM + 1):
+                shift = MAX_ZOOM - z
+                for tx, ty, hour in {(col >> shift, row >> shift, hour) for col, row, hour in points}:
+                    for key in list(self._by_tile.get((source, z, tx, ty, hour), ())):
+                        self._remove(key)
+                        dropped += 1
+            self._invalidated += dropped
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_tile.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits_total": self._hits,
+                "misses_total": self._misses,
+                "invalidated_total": self._invalidated,
+            }
+
+
+class HeatmapService:
+    def __init__(self, cache: HeatmapCache):
+        self.cache = cache
+
+    def tile_counts(
+        self,
+        db: Session,
+        source: str,
+        z: int,
+        x: int,
+        y: int,
+        since: datetime,
+        until: datetime,
+        grid: int,
+        alert_types: Sequence[str] = (),
+        now: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Dense ``grid * grid`` counts for whole hours in [hour_floor(since), until)."""
+
+        now = now or datetime.utcnow()
+        type_key = tuple(sorted(set(alert_types)))
+        total = np.zeros(grid * grid, dtype=np.int64)
+
+        hours = []
+        hour = hour_floor(since)
+        while hour < until:
+            hours.append(hour)
+            hour += HOUR
+
+        missing = []
+        for hour in hours:
+            cached = self.cache.get((source, type_key, z, x, y, grid, hour))
+            if cached is None:
+                missing.append(hour)
+            else:
+                np.add.at(total, cached[0], cached[1])
+        if not missing:
+            return total
+
+        # One query covering every missing hour, split per hour in numpy
+        start, end = missing[0], missing[-1] + HOUR
+        lats, lngs, stamps = self._load_points(db, source, type_key, tile_bounds(z, x, y), start, end)
+        hour_index = ((stamps - np.datetime64(start, "us")) // np.timedelta64(1, "h")).astype(np.int64)
+        for hour in missing:
+            mask = hour_index == (hour - start) // HOUR
+            cells, counts = bin_points(lats[mask], lngs[mask], z, x, y, grid)
+            np.add.at(total, cells, counts)
+            final = hour + HOUR + LATE_WRITE_GRACE <= now
+            self.cache.put((source, type_key, z, x, y, grid, hour), (cells, counts), final)
+        return total
+
+    def _load_points(
+        self,
+        db: Session,
+        source: str,
+        alert_types: Tuple[str, ...],
+        bounds: Tuple[float, float, float, float],
+        start: datetime,
+        end: datetime,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        min_lng, min_lat, max_lng, max_lat = bounds
+        rows: List[Tuple[float, float, datetime]] = []
+        if source == "alerts":
+            a = models.SafetyAlert
+            stmt = select(a.lat, a.lng, a.triggered_at).where(
+                a.triggered_at >= start,
+                a.triggered_at < end,
+                a.lat.between(min_lat, max_lat),
+                a.lng.between(min_lng, max_lng),
+            )
+            if alert_types:
+                stmt = stmt.where(a.type.in_(alert_types))
+            rows.extend(db.execute(stmt))
+        else:
+            for table in location_partitions.tables_for_range(db, start, end):
+                stmt = select(table.c.lat, table.c.lng, table.c.recorded_at).where(
+                    table.c.recorded_at >= start,
+                    table.c.recorded_at < end,
+                    table.c.lat.between(min_lat, max_lat),
+                    table.c.lng.between(min_lng, max_lng),
+                )
+                rows.extend(db.execute(stmt))
+
+        if not rows:
+            return np.empty(0), np.empty(0), np.empty(0, dtype="datetime64[us]")
+        lats, lngs, stamps = zip(*rows)
+        return np.asarray(lats, float), np.asarray(lngs, float), np.asarray(stamps, dtype="datetime64[us]")
+
+    def invalidate_alert(self, lat: Optional[float], lng: Optional[float], triggered_at: Optional[datetime]) -> int:
+        if lat is None or lng is None or triggered_at is None:
+            return 0
+        return self.cache.invalidate_point("alerts", lat, lng, triggered_at)
+
+    def invalidate_locations(self, points: Sequence[Tuple[float, float, datetime]]) -> int:
+        if not points:
+            return 0
+        lats, lngs, stamps = zip(*points)
+        return self.cache.invalidate_points("locations", lats, lngs, stamps)
+
+    def on_alert_event(self, event: str, payload: Dict[str, Any]) -> None:
+        """Alert feed listener: new alerts drop the cached (tile, hour) entries they fall in."""
+
+        if event != "alert_created":
+            return
+        triggered_at = payload.get("triggered_at")
+        if isinstance(triggered_at, str):
+            triggered_at = datetime.fromisoformat(triggered_at)
+        self.invalidate_alert(payload.get("lat"), payload.get("lng"), triggered_at)
+
+
+heatmaps = HeatmapService(
+    HeatmapCache(
+        max_entries=settings.SAFETY_HEATMAP_CACHE_ENTRIES,
+        open_ttl_seconds=settings.SAFETY_HEATMAP_OPEN_TTL_SECONDS,
+        location_ttl_seconds=settings.SAFETY_HEATMAP_LOCATION_TTL_SECONDS,
+    )
+)
+
+
+def track_location_writes(db: Session, rows: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> None:
+    """Remember the late rows (in an hour already closed) of a location write until ``db`` commits.
+
+    The open hour is left to its TTL, so live fixes cost nothing here.
+    """
+
+    closed_before = hour_floor(now or datetime.utcnow())
+    late = [
+        (row["lat"], row["lng"], row["recorded_at"])
+        for row in rows
+        if row.get("lat") is not None and row.get("lng") is not None and row["recorded_at"] < closed_before
+    ]
+    if late:
+        db.info.setdefault(_INFO_KEY, []).extend(late)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_late_locations(session: Session) -> None:
+    points = session.info.pop(_INFO_KEY, None)
+    if points:
+        heatmaps.invalidate_locations(points)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_late_locations(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+def sparse_cells(counts: np.ndarray, grid: int) -> List[List[int]]:
+    """``[[col, row, count], ...]`` for the non-empty cells."""
+
+    cells = np.flatnonzero(counts)
+    return [[int(c % grid), int(c // grid), int(counts[c])] for c in cells]
+
+
+alert_feed.add_listener(heatmaps.on_alert_event)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..db import upsert_insert
+from .location_partitions import location_partitions
+from .profile_cache import AnyProfile
+
+_POSITION_COLUMNS = ("tourist_id_code", "lat", "lng", "accuracy_m", "source", "recorded_at")
+_STORED_COLUMNS = ("stored_lat", "stored_lng", "stored_at")
+
+
+def get_last_location(db: Session, profile: AnyProfile) -> Optional[models.TouristLastLocation]:
+    """Return the tourist's last known position (a primary-key lookup).
+
+    The result is a snapshot, not attached to the session: it is only read
+    (the previous fix for the inactivity rule, the thinning reference), and
+    ``record_last_location`` writes the row with one atomic upsert. Tourists
+    whose history predates the tourist_last_locations table are seeded from
+    their latest stored fix; the seed is saved by ``record_last_location``.
+    """
+
+    t = models.TouristLastLocation.__table__
+    row = db.execute(select(t).where(t.c.tourist_profile_id == profile.id)).first()
+    if row is not None:
+        return models.TouristLastLocation(**row._mapping)
+
+    latest = None
+    for table in location_partitions.tables_for_range(db):
+        row = db.execute(
+            table.select()
+            .where(table.c.tourist_profile_id == profile.id)
+            .order_by(table.c.recorded_at.desc())
+            .limit(1)
+        ).first()
+        if row is not None and (latest is None or row.recorded_at > latest.recorded_at):
+            latest = row
+    if latest is None:
+        return None
+
+    return models.TouristLastLocation(
+        tourist_profile_id=profile.id,
+        tourist_id_code=profile.tourist_id_code,
+        lat=latest.lat,
+        lng=latest.lng,
+        accuracy_m=latest.accuracy_m,
+        source=latest.source,
+        recorded_at=latest.recorded_at,
+        stored_lat=latest.lat,
+        stored_lng=latest.lng,
+        stored_at=latest.recorded_at,
+    )
+
+
+def record_last_location(
+    db: Session,
+    profile: AnyProfile,
+    last: Optional[models.TouristLastLocation],
+    fix: schemas.LocationIn,
+    recorded_at: datetime,
+    stored: Optional[Tuple[schemas.LocationIn, datetime]] = None,
+) -> None:
+    """Move the last known position forward in one atomic upsert.
+
+    ``fix`` is the newest fix of the ingest and ``stored`` the newest one
+    written to tourist_locations (the thinning reference), if any. Each part
+    only replaces what the row holds when it is newer, and the comparison
+    runs in the database, so overlapping ingests for the same tourist (or
+    the first two, racing to create the row) keep the latest position
+    whichever commits last. ``last`` (from ``get_last_location``) supplies
+    a seeded thinning reference when the row does not exist yet.
+    """
+
+    t = models.TouristLastLocation.__table__
+    now = datetime.utcnow()
+    values: Dict[str, Any] = {
+        "tourist_profile_id": profile.id,
+        "tourist_id_code": profile.tourist_id_code,
+        "lat": fix.lat,
+        "lng": fix.lng,
+        "accuracy_m": fix.accuracy_m,
+        "source": fix.source or "web",
+        "recorded_at": recorded_at,
+        "updated_at": now,
+    }
+    if stored is not None:
+        stored_fix, stored_at = stored
+        values.update(stored_lat=stored_fix.lat, stored_lng=stored_fix.lng, stored_at=stored_at)
+    elif last is not None:
+        values.update(stored_lat=last.stored_lat, stored_lng=last.stored_lng, stored_at=last.stored_at)
+    else:
+        values.update(stored_lat=None, stored_lng=None, stored_at=None)
+
+    connection = db.connection()
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(t).values(**values)
+        new = stmt.excluded
+        newer = new.recorded_at > t.c.recorded_at
+        stored_newer = and_(new.stored_at.is_not(None), or_(t.c.stored_at.is_(None), new.stored_at > t.c.stored_at))
+        set_: Dict[str, Any] = {name: case((newer, new[name]), else_=t.c[name]) for name in _POSITION_COLUMNS}
+        set_.update({name: case((stored_newer, new[name]), else_=t.c[name]) for name in _STORED_COLUMNS})
+        set_["updated_at"] = now
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.tourist_profile_id], set_=set_, where=or_(newer, stored_newer)
+        )
+        connection.execute(stmt)
+        return
+
+    # Other dialects: conditional UPDATEs, then INSERT if the row does not exist yet
+    key = t.c.tourist_profile_id == profile.id
+    position = {name: values[name] for name in _POSITION_COLUMNS}
+    updated = connection.execute(
+        update(t).where(key, t.c.recorded_at < recorded_at).values(**position, updated_at=now)
+    ).rowcount
+    if values["stored_at"] is not None:
+        stored_values = {name: values[name] for name in _STORED_COLUMNS}
+        updated += connection.execute(
+            update(t)
+            .where(key, or_(t.c.stored_at.is_(None), t.c.stored_at < values["stored_at"]))
+            .values(**stored_values, updated_at=now)
+        ).rowcount
+    if not updated and connection.execute(select(t.c.tourist_profile_id).where(key)).first() is None:
+        connection.execute(insert(t).values(**values))
+
+
+def stored_point(last: Optional[models.TouristLastLocation]) -> Optional[Tuple[float, float, datetime]]:
+    if last is None or last.stored_at is None or last.stored_lat is None or last.stored_lng is None:
+        return None
+    return last.stored_lat, last.stored_lng, last.stored_at
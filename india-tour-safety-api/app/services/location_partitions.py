@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+
+PERIODS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+# Partition / period-table names: tourist_locations_<d|w><YYYYMMDD of the period start>
+_NAME_RE = re.compile(r"^(?P<parent>.+)_(?P<kind>[dw])(?P<start>\d{8})$")
+_BOUND_TO_RE = re.compile(r"TO \('(?P<to>[^']+)'\)")
+
+_DELETE_CHUNK = 5000
+
+
+def _connect(bind: Engine | Connection) -> ContextManager[Connection]:
+    return bind.connect() if isinstance(bind, Engine) else nullcontext(bind)
+
+
+def period_start(value: datetime, period: str) -> datetime:
+    start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        start -= timedelta(days=start.weekday())  # ISO weeks start on Monday
+    return start
+
+
+class LocationPartitionRouter:
+    """Routes tourist_locations writes and reads to time partitions.
+
+    Three modes, resolved once per database:
+
+    * ``native`` – Postgres, when the parent table has been converted to a
+      range-partitioned table (see the 20261016000009 migration). Rows are
+      inserted through the parent; partitions are created ahead of time by
+      ``premake`` (on startup and by the retention job) and anything without
+      one lands in the default partition, so ingest never runs DDL.
+    * ``tables`` – any other database with ``SAFETY_LOCATION_PARTITIONING``
+      on (SQLite in development): one plain table per period, with the
+      original table kept for rows written before partitioning was enabled.
+    * ``off`` – a single unpartitioned table, exactly as before.
+
+    Retention works in every mode: whole partitions are dropped where they
+    exist, and only the rows left in tables that straddle the cutoff (or an
+    unpartitioned table) are deleted.
+    """
+
+    def __init__(self, table: Table, period: str = "week", enabled: bool = False):
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported partition period: {period}")
+        self.table = table
+        self.period = period
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._mode: Optional[str] = None
+
+    # -- periods -----------------------------------------------------------------
+
+    def period_start(self, value: datetime) -> datetime:
+        return period_start(value, self.period)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.table.name}_{self.period[0]}{start:%Y%m%d}"
+
+    def _parse_name(self, name: str) -> Optional[Tuple[datetime, datetime]]:
+        match = _NAME_RE.match(name)
+        if match is None or match.group("parent") != self.table.name:
+            return None
+        start = datetime.strptime(match.group("start"), "%Y%m%d")
+        length = PERIODS["day" if match.group("kind") == "d" else "week"]
+        return start, start + length
+
+    # -- mode --------------------------------------------------------------------
+
+    def mode(self, bind: Engine | Connection) -> str:
+        if self._mode is None:
+            with self._lock:
+                if self._mode is None:
+                    self._mode = self._detect_mode(bind)
+        return self._mode
+
+    def _detect_mode(self, bind: Engine | Connection) -> str:
+        if bind.dialect.name == "postgresql":
+            with _connect(bind) as conn:
+                relkind = conn.execute(
+                    text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                    {"name": self.table.name},
+                ).scalar()
+            return "native" if relkind == "p" else "off"
+        return "tables" if self.enabled else "off"
+
+    def reset(self) -> None:
+        """Forget the detected mode (tests, after migrations)."""
+
+        with self._lock:
+            self._mode = None
+
+    # -- DDL ---------------------------------------------------------------------
+
+    def _period_table(self, name: str) -> Table:
+        with self._lock:
+            existing = self.table.metadata.tables.get(name)
+            if existing is not None:
+                return existing
+            return self.table.to_metadata(self.table.metadata, name=name)
+
+    def ensure(self, bind: Engine | Connection, starts: Iterable[datetime]) -> None:
+        """Make sure a partition exists for each period start.
+
+        Period tables are created on ``bind`` (the caller's connection during
+        an insert, so SQLite never waits on its own write lock and a rollback
+        takes the empty table with it). Native partitions get their own
+        transaction, since attaching one locks the parent table.
+        """
+
+        mode = self.mode(bind)
+        for start in sorted(set(starts)):
+            if mode == "native" and isinstance(bind, Engine):
+                self._create_native(bind, start)
+            elif mode == "tables":
+                self._period_table(self.partition_name(start)).create(bind, checkfirst=True)
+
+    def _create_native(self, engine: Engine, start: datetime) -> None:
+        quote = engine.dialect.identifier_preparer.quote
+        end = start + PERIODS[self.period]
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {quote(self.partition_name(start))} "
+                        f"PARTITION OF {quote(self.table.name)} "
+                        f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+                    )
+                )
+        except DBAPIError:
+            # Usually the range overlaps the legacy partition, one created with a different
+            # period, or rows already in the default partition; those rows stay where they are.
+            logger.warning("Could not create location partition for %s", start, exc_info=True)
+
+    def premake(self, engine: Engine, now: Optional[datetime] = None, ahead: Optional[int] = None) -> None:
+        """Create the current period's partition and ``ahead`` future ones."""
+
+        ahead = settings.SAFETY_LOCATION_PARTITION_PREMAKE if ahead is None else ahead
+        start = self.period_start(now or datetime.utcnow())
+        self.ensure(engine, [start + PERIODS[self.period] * i for i in range(ahead + 1)])
+
+    # -- writes ------------------------------------------------------------------
+
+    def insert(self, db: Session, rows: List[Row]) -> None:
+        """Bulk-insert location rows into the partitions their recorded_at falls in."""
+
+        if not rows:
+            return
+        if self.mode(db.get_bind()) != "tables":
+            # Unpartitioned, or Postgres routing rows to partitions itself
+            db.execute(insert(self.table), rows)
+            return
+
+        by_period: Dict[datetime, List[Row]] = {}
+        for row in rows:
+            by_period.setdefault(self.period_start(row["recorded_at"]), []).append(row)
+        self.ensure(db.connection(), by_period)
+        for start, period_rows in by_period.items():
+            db.execute(insert(self._period_table(self.partition_name(start))), period_rows)
+
+    # -- reads -------------------------------------------------------------------
+
+    def partitions(self, bind: Engine | Connection) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+        """List existing partitions as ``(name, start, end)``; None means unbounded."""
+
+        mode = self.mode(bind)
+        if mode == "native":
+            with _connect(bind) as conn:
+                rows = conn.execute(
+                    text(
+                        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                        "WHERE i.inhparent = to_regclass(:name)"
+                    ),
+                    {"name": self.table.name},
+                ).all()
+            found = []
+            for name, bound in rows:
+                parsed = self._parse_name(name)
+                match = _BOUND_TO_RE.search(bound or "")
+                end = datetime.fromisoformat(match.group("to")) if match else None
+                found.append((name, parsed[0] if parsed else None, end))
+            return sorted(found, key=lambda item: item[2] or datetime.max)
+        if mode == "tables":
+            found = []
+            for name in inspect(bind).get_table_names():
+                parsed = self._parse_name(name)
+                if parsed is not None:
+                    found.append((name, parsed[0], parsed[1]))
+            return sorted(found, key=lambda item: item[2] or datetime.max)
+        return []
+
+    def tables_for_range(
+        self,
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Table]:
+        """Tables to query for fixes recorded in [start, end).
+
+        With native partitioning (or none) this is just the parent table and
+        the database prunes partitions itself; in ``tables`` mode it is the
+        original table plus every period table overlapping the range.
+        """
+
+        engine = db.get_bind()
+        if self.mode(engine) != "tables":
+            return [self.table]
+        tables = [self.table]
+        for name, p_start, p_end in self.partitions(engine):
+            if (end is None or p_start < end) and (start is None or p_end > start):
+                tables.append(self._period_table(name))
+        return tables
+
+    # -- retention ---------------------------------------------------------------
+
+    def drop_before(self, db: Session, cutoff: datetime) -> Dict[str, Any]:
+        """Drop every partition that ends at or before ``cutoff``, then trim older rows.
+
+        The trim only has work left in partitions straddling the cutoff (the
+        legacy and default partitions, or the original table in ``tables``
+        mode), or in the whole table when partitioning is off.
+        """
+
+        engine = db.get_bind()
+        mode = self.mode(engine)
+        quote = engine.dialect.identifier_preparer.quote
+        dropped: List[str] = []
+        for name, _start, end in self.partitions(engine):
+            if end is None or end > cutoff:
+                continue
+            db.execute(text(f"DROP TABLE IF EXISTS {quote(name)}"))
+            db.commit()
+            with self._lock:
+                if name in self.table.metadata.tables:
+                    self.table.metadata.remove(self.table.metadata.tables[name])
+            dropped.append(name)
+
+        deleted = 0
+        for table in self.tables_for_range(db, end=cutoff):
+            deleted += self._delete_rows_before(db, table, cutoff)
+        return {"mode": mode, "dropped_partitions": dropped, "deleted_rows": deleted}
+
+    @staticmethod
+    def _delete_rows_before(db: Session, table: Table, cutoff: datetime) -> int:
+        deleted = 0
+        while True:
+            ids = db.execute(
+                select(table.c.id).where(table.c.recorded_at < cutoff).limit(_DELETE_CHUNK)
+            ).scalars().all()
+            if not ids:
+                return deleted
+            # recorded_at keeps the delete pruned to the old partitions
+            db.execute(delete(table).where(table.c.recorded_at < cutoff, table.c.id.in_(ids)))
+            db.commit()
+            deleted += len(ids)
+
+
+location_partitions = LocationPartitionRouter(
+    models.TouristLocation.__table__,
+    period=settings.SAFETY_LOCATION_PARTITION_PERIOD,
+    enabled=settings.SAFETY_LOCATION_PARTITIONING,
+)
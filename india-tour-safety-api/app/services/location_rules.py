@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..core.config import settings
+from ..core.timeutil import naive_utc
+from .alert_dedup import RecentAlertCache
+from .alert_feed import alert_feed
+from .heatmap import track_location_writes
+from .last_location import get_last_location, record_last_location, stored_point
+from .location_partitions import location_partitions
+from .location_writer import LocationQueueFull, location_writer
+from .profile_cache import AnyProfile
+from .thinning import select_fixes_to_store
+from .zone_index import get_zone_index
+
+
+GEOFENCE_DEDUP_WINDOW = timedelta(minutes=5)
+INACTIVITY_GAP = timedelta(minutes=30)
+ALERTING_RISK_LEVELS = {"medium", "high"}
+
+recent_geofence_alerts = RecentAlertCache(GEOFENCE_DEDUP_WINDOW)
+
+
+def normalize_recorded_at(value: Optional[datetime]) -> datetime:
+    """Normalize recorded_at to a naive UTC datetime.
+
+    Database timestamps are stored as naive UTC, so arithmetic between the two
+    is only safe once the client value has been normalized the same way. An
+    offset sent by the client is converted, not dropped.
+    """
+
+    if value is None:
+        return datetime.utcnow()
+    return naive_utc(value)
+
+
+def ingest_fixes(
+    db: Session,
+    profile: AnyProfile,
+    fixes: Sequence[schemas.LocationIn],
+) -> List[models.SafetyAlert]:
+    """Store location fixes for one tourist and evaluate the safety rules over them.
+
+    Fixes are processed in recorded_at order in a single pass: the location
+    rows that survive thinning are bulk-inserted (or handed to the
+    write-behind queue when it is enabled), every fix is checked against the
+    zone index in one vectorized call, recent geofence alerts are looked up
+    once for all matched zones, and inactivity is measured between
+    consecutive fixes starting from the tourist's last known position, which
+    is then moved forward to the newest fix. The new alerts are added to the
+    session; the caller persists them with ``commit_alerts``.
+    """
+
+    if not fixes:
+        return []
+
+    recorded = sorted(
+        ((normalize_recorded_at(fix.recorded_at), fix) for fix in fixes),
+        key=lambda item: item[0],
+    )
+
+    # Previous fix for the inactivity rule: O(1) read from the last-known-position store
+    last = get_last_location(db, profile)
+    previous_at = last.recorded_at if last else None
+
+    if settings.SAFETY_LOCATION_THINNING:
+        keep = select_fixes_to_store(
+            recorded,
+            stored_point(last),
+            min_distance_m=settings.SAFETY_LOCATION_THIN_MIN_DISTANCE_M,
+            max_interval=timedelta(seconds=settings.SAFETY_LOCATION_THIN_MAX_INTERVAL_SECONDS),
+            keep_sources=settings.SAFETY_LOCATION_THIN_KEEP_SOURCES,
+        )
+    else:
+        keep = [True] * len(recorded)
+    stored = [item for item, kept in zip(recorded, keep) if kept]
+
+    rows = [
+        {
+            "tourist_profile_id": profile.id,
+            "tourist_id_code": profile.tourist_id_code,
+            "lat": fix.lat,
+            "lng": fix.lng,
+            "accuracy_m": fix.accuracy_m,
+            "source": fix.source or "web",
+            "recorded_at": recorded_at,
+        }
+        for recorded_at, fix in stored
+    ]
+    try:
+        queued = location_writer.enqueue(rows)
+    except LocationQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Location queue is full, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    if rows and not queued:
+        location_partitions.insert(db, rows)
+        track_location_writes(db, rows)
+
+    now = datetime.utcnow()
+    zone_hits = get_zone_index(db).query_many(
+        [fix.lat for _, fix in recorded],
+        [fix.lng for _, fix in recorded],
+    )
+    alerted_zone_ids = _recently_alerted_zone_ids(
+        db,
+        profile.id,
+        {zone.id for zones in zone_hits for zone in zones if zone.risk_level.lower() in ALERTING_RISK_LEVELS},
+        now,
+    )
+
+    alerts: List[models.SafetyAlert] = []
+    inactivity_checked = False
+
+    for (recorded_at, fix), zones in zip(recorded, zone_hits):
+        for zone in zones:
+            # Only create alerts for higher risk levels, once per zone per window
+            if zone.risk_level.lower() not in ALERTING_RISK_LEVELS or zone.id in alerted_zone_ids:
+                continue
+            alerted_zone_ids.add(zone.id)
+
+            alert = models.SafetyAlert(
+                tourist_profile_id=profile.id,
+                tourist_id_code=profile.tourist_id_code,
+                type="geofence_breach",
+                severity="high" if zone.risk_level.lower() == "high" else "medium",
+                status="new",
+                title=f"Entered {zone.risk_level.capitalize()} risk zone: {zone.name}",
+                description=zone.description,
+                lat=fix.lat,
+                lng=fix.lng,
+                triggered_at=now,
+                zone_id=zone.id,
+                extra_data={"zone_id": zone.id, "zone_city": zone.city},
+            )
+            db.add(alert)
+            alerts.append(alert)
+
+        # Simple anomaly placeholder: a gap of >30 minutes since the previous fix
+        if (
+            not inactivity_checked
+            and previous_at is not None
+            and (recorded_at - previous_at) > INACTIVITY_GAP
+        ):
+            inactivity_checked = True
+            anomaly = _inactivity_alert(db, profile, fix, previous_at, now)
+            if anomaly is not None:
+                db.add(anomaly)
+                alerts.append(anomaly)
+        previous_at = recorded_at
+
+    latest_at, latest_fix = recorded[-1]
+    newest_stored = (stored[-1][1], stored[-1][0]) if stored else None
+    record_last_location(db, profile, last, latest_fix, latest_at, stored=newest_stored)
+
+    return alerts
+
+
+def commit_alerts(db: Session, alerts: List[models.SafetyAlert]) -> None:
+    """Commit an ingest, remember its geofence alerts for de-duplication and publish them."""
+
+    db.commit()
+    for alert in alerts:
+        db.refresh(alert)
+        if alert.type == "geofence_breach" and alert.zone_id is not None:
+            recent_geofence_alerts.record(alert.tourist_profile_id, alert.zone_id, alert.triggered_at)
+    alert_feed.publish_many("alert_created", alerts)
+
+
+def _recently_alerted_zone_ids(
+    db: Session,
+    profile_id: int,
+    zone_ids: set[int],
+    now: datetime,
+) -> set[int]:
+    """Return the zones already alerted for this tourist inside the window.
+
+    Answered from the in-process cache where possible; the remaining zones
+    are checked with one query served by the (profile, zone, triggered_at) index.
+    """
+
+    if not zone_ids:
+        return set()
+
+    alerted = recent_geofence_alerts.alerted_zones(profile_id, zone_ids, now)
+    missing = zone_ids - alerted
+    if not missing:
+        return alerted
+
+    rows = (
+        db.query(models.SafetyAlert.zone_id, models.SafetyAlert.triggered_at)
+        .filter(
+            models.SafetyAlert.tourist_profile_id == profile_id,
+            models.SafetyAlert.zone_id.in_(missing),
+            models.SafetyAlert.triggered_at >= now - GEOFENCE_DEDUP_WINDOW,
+            models.SafetyAlert.type == "geofence_breach",
+            models.SafetyAlert.status != "resolved",
+        )
+        .all()
+    )
+    for zone_id, triggered_at in rows:
+        recent_geofence_alerts.record(profile_id, zone_id, triggered_at)
+        alerted.add(zone_id)
+    return alerted
+
+
+def _inactivity_alert(
+    db: Session,
+    profile: AnyProfile,
+    fix: schemas.LocationIn,
+    last_recorded_at: datetime,
+    now: datetime,
+) -> Optional[models.SafetyAlert]:
+    anomaly_existing = (
+        db.query(models.SafetyAlert.id)
+        .filter(
+            models.SafetyAlert.tourist_profile_id == profile.id,
+            models.SafetyAlert.type == "inactivity",
+            models.SafetyAlert.status != "resolved",
+        )
+        .first()
+    )
+    if anomaly_existing:
+        return None
+
+    return models.SafetyAlert(
+        tourist_profile_id=profile.id,
+        tourist_id_code=profile.tourist_id_code,
+        type="inactivity",
+        severity="medium",
+        status="new",
+        title="No movement detected for over 30 minutes",
+        description="System detected a long gap between location updates.",
+        lat=fix.lat,
+        lng=fix.lng,
+        triggered_at=now,
+        extra_data={
+            "rule": "inactivity_30_min",
+            "last_recorded_at": last_recorded_at.isoformat(),
+            **({"city": profile.city} if profile.city else {}),
+        },
+    )
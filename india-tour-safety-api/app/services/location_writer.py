@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from ..db import SessionLocal
+from .heatmap import track_location_writes
+from .location_partitions import location_partitions
+
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+InsertRows = Callable[[Session, List[Row]], None]
+
+
+class LocationQueueFull(Exception):
+    """Raised when the write-behind queue stays full for the whole enqueue timeout."""
+
+
+class LocationWriteBehind:
+    """Bounded in-process queue that persists TouristLocation rows in the background.
+
+    Request handlers hand over the raw fix rows and return without waiting on
+    the insert; a worker thread flushes them with bulk INSERTs whenever
+    ``batch_size`` rows are pending or ``flush_interval_ms`` has elapsed.
+    When the queue is full, ``enqueue`` blocks for up to
+    ``enqueue_timeout_ms`` and then raises ``LocationQueueFull`` so callers
+    can shed load instead of growing memory. ``stop`` drains what is left.
+    ``insert_rows`` performs the actual write (the partition router in the
+    app; a plain bulk INSERT by default).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        max_queue: int = 20_000,
+        enqueue_timeout_ms: int = 100,
+        max_flush_attempts: int = 3,
+        insert_rows: Optional[InsertRows] = None,
+    ):
+        self.session_factory = session_factory
+        self.insert_rows = insert_rows or _insert_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout_ms / 1000.0
+        self.max_flush_attempts = max_flush_attempts
+
+        self._rows: Deque[Row] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._accepting = False
+        self._stopping = False
+
+        self._enqueued = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._failed = 0
+        self._rejected = 0
+        self._high_water = 0
+        self._last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._accepting = True
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="location-write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """Stop accepting rows, flush everything still queued and join the worker."""
+
+        with self._cond:
+            if self._thread is None:
+                return
+            self._accepting = False
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def enqueue(self, rows: List[Row]) -> bool:
+        """Queue rows for insertion.
+
+        Returns False when the writer is not running, in which case the caller
+        should insert synchronously.
+        """
+
+        if not rows:
+            return True
+        deadline = monotonic() + self.enqueue_timeout
+        with self._cond:
+            if len(rows) > self.max_queue:
+                self._rejected += len(rows)
+                raise LocationQueueFull()
+            while self._accepting and len(self._rows) + len(rows) > self.max_queue:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self._rejected += len(rows)
+                    raise LocationQueueFull()
+                self._cond.wait(remaining)
+            if not self._accepting:
+                return False
+
+            self._rows.extend(rows)
+            self._enqueued += len(rows)
+            self._high_water = max(self._high_water, len(self._rows))
+            self._cond.notify_all()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": self._accepting,
+                "depth": len(self._rows),
+                "capacity": self.max_queue,
+                "high_water_mark": self._high_water,
+                "enqueued_total": self._enqueued,
+                "flushed_total": self._flushed,
+                "flush_count": self._flushes,
+                "failed_total": self._failed,
+                "rejected_total": self._rejected,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+            }
+
+    def _take_batch(self) -> List[Row]:
+        with self._cond:
+            while not self._stopping and not self._rows:
+                self._cond.wait()
+            # Give the batch up to flush_interval from now to fill up
+            deadline = monotonic() + self.flush_interval
+            while not self._stopping and len(self._rows) < self.batch_size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._rows), self.batch_size)
+            batch = [self._rows.popleft() for _ in range(count)]
+            if batch:
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+                continue
+            with self._cond:
+                if self._stopping and not self._rows:
+                    return
+
+    def _flush(self, batch: List[Row]) -> None:
+        for attempt in range(1, self.max_flush_attempts + 1):
+            started = monotonic()
+            db = self.session_factory()
+            try:
+                self.insert_rows(db, batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception(
+                    "Location write-behind flush of %d rows failed (attempt %d/%d)",
+                    len(batch),
+                    attempt,
+                    self.max_flush_attempts,
+                )
+                continue
+            finally:
+                db.close()
+
+            with self._cond:
+                self._flushed += len(batch)
+                self._flushes += 1
+                self._last_flush_ms = (monotonic() - started) * 1000
+            return
+
+        with self._cond:
+            self._failed += len(batch)
+
+
+def _insert_rows(db: Session, rows: List[Row]) -> None:
+    db.execute(insert(models.TouristLocation), rows)
+
+
+def _insert_partitioned(db: Session, rows: List[Row]) -> None:
+    location_partitions.insert(db, rows)
+    track_location_writes(db, rows)
+
+
+location_writer = LocationWriteBehind(
+    SessionLocal,
+    batch_size=settings.SAFETY_LOCATION_WRITE_BATCH_SIZE,
+    flush_interval_ms=settings.SAFETY_LOCATION_WRITE_FLUSH_MS,
+    max_queue=settings.SAFETY_LOCATION_WRITE_QUEUE_MAX,
+    enqueue_timeout_ms=settings.SAFETY_LOCATION_WRITE_ENQUEUE_TIMEOUT_MS,
+    insert_rows=_insert_partitioned,
+)
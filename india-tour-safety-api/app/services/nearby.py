@@ -0,0 +1,275 @@
+"""In-process spatial index over each tourist's latest position.
+
+Answers "who is within ``radius_m`` of this point" without scanning
+``tourist_locations``. Positions live in NumPy columns (one slot per
+tourist) and a uniform lat/lng grid maps each cell to the slots inside it,
+so a query gathers the handful of cells covering the radius and computes
+haversine distances for those candidates in one vectorized step.
+
+The index follows ``tourist_last_locations`` incrementally: each sync reads
+only the rows whose ``updated_at`` moved since the previous one (with a
+small overlap for transactions that commit late). A periodic full rebuild
+drops tourists that went quiet or were deleted.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from .geometry import EARTH_RADIUS_M, haversine_m
+
+_M_PER_DEG_LAT = math.radians(1.0) * EARTH_RADIUS_M
+_MAX_QUERY_CELLS = 4096  # beyond this (huge radius, polar latitudes) every slot is a candidate
+
+
+class NearbyTourist(NamedTuple):
+    tourist_profile_id: int
+    tourist_id_code: str
+    lat: float
+    lng: float
+    recorded_at: datetime
+    distance_m: float
+
+
+class NearbyIndex:
+    """Latest positions in NumPy columns, bucketed by a uniform lat/lng grid."""
+
+    def __init__(self, cell_size_deg: float = 0.02, capacity: int = 1024):
+        self.cell_size = cell_size_deg
+        self._slots: Dict[int, int] = {}  # tourist_profile_id -> slot
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._codes: List[Optional[str]] = [None] * capacity
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._lats = np.zeros(capacity, dtype=float)
+        self._lngs = np.zeros(capacity, dtype=float)
+        self._recorded = np.zeros(capacity, dtype="datetime64[us]")
+        self._cell_of: List[Optional[Tuple[int, int]]] = [None] * capacity
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self._slots)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lng / self.cell_size), math.floor(lat / self.cell_size)
+
+    def _grow(self) -> None:
+        old = len(self._ids)
+        self._ids = np.concatenate([self._ids, np.zeros(old, dtype=np.int64)])
+        self._lats = np.concatenate([self._lats, np.zeros(old, dtype=float)])
+        self._lngs = np.concatenate([self._lngs, np.zeros(old, dtype=float)])
+        self._recorded = np.concatenate([self._recorded, np.zeros(old, dtype="datetime64[us]")])
+        self._codes.extend([None] * old)
+        self._cell_of.extend([None] * old)
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def upsert(self, profile_id: int, code: str, lat: float, lng: float, recorded_at: datetime) -> None:
+        with self._lock:
+            slot = self._slots.get(profile_id)
+            if slot is None:
+                if not self._free:
+                    self._grow()
+                slot = self._free.pop()
+                self._slots[profile_id] = slot
+            elif np.datetime64(recorded_at, "us") < self._recorded[slot]:
+                return  # never move a tourist back in time
+
+            cell = self._cell(lat, lng)
+            previous = self._cell_of[slot]
+            if previous != cell:
+                if previous is not None:
+                    self._discard(previous, slot)
+                self._cells.setdefault(cell, set()).add(slot)
+                self._cell_of[slot] = cell
+            self._ids[slot] = profile_id
+            self._codes[slot] = code
+            self._lats[slot] = lat
+            self._lngs[slot] = lng
+            self._recorded[slot] = np.datetime64(recorded_at, "us")
+
+    def remove(self, profile_id: int) -> None:
+        with self._lock:
+            slot = self._slots.pop(profile_id, None)
+            if slot is None:
+                return
+            cell = self._cell_of[slot]
+            if cell is not None:
+                self._discard(cell, slot)
+            self._cell_of[slot] = None
+            self._codes[slot] = None
+            self._free.append(slot)
+
+    def _discard(self, cell: Tuple[int, int], slot: int) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self._cells[cell]
+
+    def _candidates(self, lat: float, lng: float, radius_m: float) -> np.ndarray:
+        dlat = radius_m / _M_PER_DEG_LAT
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        dlng = radius_m / (_M_PER_DEG_LAT * cos_lat) if cos_lat > 1e-9 else 360.0
+        min_x, min_y = self._cell(lat - dlat, lng - dlng)
+        max_x, max_y = self._cell(lat + dlat, lng + dlng)
+        crosses_antimeridian = lng - dlng < -180.0 or lng + dlng > 180.0
+        if crosses_antimeridian or (max_x - min_x + 1) * (max_y - min_y + 1) > _MAX_QUERY_CELLS:
+            return np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+
+        slots: List[int] = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                members = self._cells.get((x, y))
+                if members:
+                    slots.extend(members)
+        return np.asarray(slots, dtype=np.int64)
+
+    def query(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        recorded_since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        exclude_profile_id: Optional[int] = None,
+    ) -> List[NearbyTourist]:
+        """Tourists within ``radius_m`` of the point, nearest first."""
+
+        with self._lock:
+            slots = self._candidates(lat, lng, radius_m)
+            if slots.size == 0:
+                return []
+            if recorded_since is not None:
+                slots = slots[self._recorded[slots] >= np.datetime64(recorded_since, "us")]
+            if exclude_profile_id is not None:
+                slots = slots[self._ids[slots] != exclude_profile_id]
+
+            distances = haversine_m(lat, lng, self._lats[slots], self._lngs[slots])
+            within = distances <= radius_m
+            slots, distances = slots[within], distances[within]
+            order = np.argsort(distances, kind="stable")
+            if limit is not None:
+                order = order[:limit]
+
+            return [
+                NearbyTourist(
+                    int(self._ids[slot]),
+                    self._codes[slot] or "",
+                    float(self._lats[slot]),
+                    float(self._lngs[slot]),
+                    self._recorded[slot].astype(datetime),
+                    float(distance),
+                )
+                for slot, distance in zip(slots[order], distances[order])
+            ]
+
+
+class NearbyService:
+    """Shared ``NearbyIndex`` kept in step with ``tourist_last_locations``."""
+
+    def __init__(
+        self,
+        cell_size_deg: float = 0.02,
+        sync_seconds: float = 1.0,
+        sync_overlap_seconds: float = 2.0,
+        rebuild_seconds: float = 600.0,
+        max_age_hours: float = 24.0,
+    ):
+        self.cell_size = cell_size_deg
+        self.sync_seconds = sync_seconds
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self.rebuild_seconds = rebuild_seconds
+        self.max_age = timedelta(hours=max_age_hours)
+        self._index: Optional[NearbyIndex] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._synced_to: Optional[datetime] = None  # high-water mark of updated_at
+        self._sync_lock = threading.Lock()
+        self._syncs = 0
+        self._rebuilds = 0
+
+    def _load(self, db: Session, since: Optional[datetime], now: datetime) -> List[Tuple]:
+        t = models.TouristLastLocation
+        stmt = select(t.tourist_profile_id, t.tourist_id_code, t.lat, t.lng, t.recorded_at, t.updated_at).where(
+            t.recorded_at >= now - self.max_age
+        )
+        if since is not None:
+            stmt = stmt.where(t.updated_at >= since)
+        return list(db.execute(stmt))
+
+    def _apply(self, index: NearbyIndex, rows: List[Tuple]) -> None:
+        for profile_id, code, lat, lng, recorded_at, updated_at in rows:
+            index.upsert(profile_id, code, lat, lng, recorded_at)
+            if updated_at is not None and (self._synced_to is None or updated_at > self._synced_to):
+                self._synced_to = updated_at
+
+    def get_index(self, db: Session, now: Optional[datetime] = None) -> NearbyIndex:
+        """Return the index, syncing changed rows (or rebuilding) when it is due."""
+
+        index = self._index
+        if index is not None and monotonic() - self._synced_at < self.sync_seconds:
+            return index
+
+        with self._sync_lock:
+            now = now or datetime.utcnow()
+            if self._index is None or monotonic() - self._built_at >= self.rebuild_seconds:
+                index = NearbyIndex(self.cell_size)
+                self._synced_to = None
+                self._apply(index, self._load(db, None, now))
+                self._index = index
+                self._built_at = self._synced_at = monotonic()
+                self._rebuilds += 1
+            elif monotonic() - self._synced_at >= self.sync_seconds:
+                since = self._synced_to - self.sync_overlap if self._synced_to is not None else None
+                self._apply(self._index, self._load(db, since, now))
+                self._synced_at = monotonic()
+                self._syncs += 1
+            return self._index
+
+    def nearby(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        active_within: Optional[timedelta] = None,
+        limit: Optional[int] = None,
+        exclude_profile_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> List[NearbyTourist]:
+        now = now or datetime.utcnow()
+        index = self.get_index(db, now)
+        since = now - active_within if active_within is not None else None
+        return index.query(lat, lng, radius_m, since, limit, exclude_profile_id)
+
+    def invalidate(self) -> None:
+        with self._sync_lock:
+            self._index = None
+
+    def stats(self) -> Dict[str, int]:
+        index = self._index
+        return {
+            "tourists": index.size if index is not None else 0,
+            "syncs_total": self._syncs,
+            "rebuilds_total": self._rebuilds,
+        }
+
+
+nearby_tourists = NearbyService(
+    cell_size_deg=settings.SAFETY_NEARBY_CELL_DEG,
+    sync_seconds=settings.SAFETY_NEARBY_SYNC_SECONDS,
+    sync_overlap_seconds=settings.SAFETY_NEARBY_SYNC_OVERLAP_SECONDS,
+    rebuild_seconds=settings.SAFETY_NEARBY_REBUILD_SECONDS,
+    max_age_hours=settings.SAFETY_NEARBY_MAX_AGE_HOURS,
+)
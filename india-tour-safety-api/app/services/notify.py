@@ -0,0 +1,244 @@
+"""Parallel panic notifications over pooled HTTP clients.
+
+A panic is sent to every configured channel at once (SMS through Twilio,
+email through SendGrid, the police desk webhook, and a local stub for
+benchmarks) from a single asyncio loop running on a background thread.
+Each channel owns one ``httpx.AsyncClient``, so connections to a provider
+are kept alive and reused across alerts, and each has its own timeout, so
+a slow email API cannot hold up the SMS. Callers (the dispatch outbox
+workers) block on ``send`` until every channel has finished.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import httpx
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Request kwargs for ``AsyncClient.request`` or None when there is nothing to send for this alert
+RequestBuilder = Callable[[Optional[int], Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class NotificationChannel(NamedTuple):
+    name: str
+    timeout: float
+    build: RequestBuilder
+
+
+class ChannelResult(NamedTuple):
+    channel: str
+    ok: bool
+    status_code: Optional[int] = None
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+    skipped: bool = False
+
+
+class NotificationError(Exception):
+    """Some channels failed; the outbox retries only those."""
+
+    def __init__(self, failed: List[ChannelResult]):
+        self.failed = failed
+        super().__init__("; ".join(f"{r.channel}: {r.error}" for r in failed))
+
+
+def panic_message(payload: Dict[str, Any]) -> str:
+    text = f"SOS: {payload.get('full_name')} ({payload.get('tourist_id_code')}) pressed the panic button."
+    if payload.get("lat") is not None and payload.get("lng") is not None:
+        text += f" Location: https://maps.google.com/?q={payload['lat']},{payload['lng']}"
+    if payload.get("note"):
+        text += f" Note: {payload['note']}"
+    return text
+
+
+def _sms_request(alert_id: Optional[int], payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    phone = payload.get("emergency_contact_phone")
+    if not phone:
+        return None
+    return {
+        "method": "POST",
+        "url": f"https://api.twilio.com/2010-04-01/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json",
+        "auth": (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+        "data": {"To": phone, "From": settings.TWILIO_FROM_NUMBER, "Body": panic_message(payload)},
+    }
+
+
+def _email_request(alert_id: Optional[int], payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {
+        "method": "POST",
+        "url": "https://api.sendgrid.com/v3/mail/send",
+        "headers": {"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+        "json": {
+            "personalizations": [{"to": [{"email": email} for email in settings.SAFETY_DISPATCH_ALERT_EMAILS]}],
+            "from": {"email": settings.SAFETY_DISPATCH_FROM_EMAIL},
+            "subject": f"Panic alert {alert_id}: {payload.get('tourist_id_code')}",
+            "content": [{"type": "text/plain", "value": panic_message(payload)}],
+        },
+    }
+
+
+def _webhook_request(url: str, token: Optional[str]) -> RequestBuilder:
+    def build(alert_id: Optional[int], payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return {
+            "method": "POST",
+            "url": url,
+            "headers": headers,
+            "json": {"event": "panic_alert", "alert_id": alert_id, **payload},
+        }
+
+    return build
+
+
+def build_channels() -> List[NotificationChannel]:
+    """Channels from settings: ``SAFETY_DISPATCH_CHANNELS``, else the legacy provider, else all configured."""
+
+    available: Dict[str, NotificationChannel] = {}
+    if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_FROM_NUMBER:
+        available["sms"] = NotificationChannel("sms", settings.SAFETY_DISPATCH_SMS_TIMEOUT_SECONDS, _sms_request)
+    if settings.SENDGRID_API_KEY and settings.SAFETY_DISPATCH_FROM_EMAIL and settings.SAFETY_DISPATCH_ALERT_EMAILS:
+        available["email"] = NotificationChannel(
+            "email", settings.SAFETY_DISPATCH_EMAIL_TIMEOUT_SECONDS, _email_request
+        )
+    if settings.SAFETY_POLICE_WEBHOOK_URL:
+        available["police_webhook"] = NotificationChannel(
+            "police_webhook",
+            settings.SAFETY_DISPATCH_WEBHOOK_TIMEOUT_SECONDS,
+            _webhook_request(settings.SAFETY_POLICE_WEBHOOK_URL, settings.SAFETY_POLICE_WEBHOOK_TOKEN),
+        )
+    if settings.SAFETY_DISPATCH_STUB_URL:
+        available["stub"] = NotificationChannel(
+            "stub",
+            settings.SAFETY_DISPATCH_WEBHOOK_TIMEOUT_SECONDS,
+            _webhook_request(settings.SAFETY_DISPATCH_STUB_URL, None),
+        )
+
+    names = settings.SAFETY_DISPATCH_CHANNELS
+    if names is None and settings.SAFETY_DISPATCH_PROVIDER:
+        names = [{"twilio": "sms", "sendgrid": "email"}.get(settings.SAFETY_DISPATCH_PROVIDER.lower(), "")]
+    if names is None:
+        return list(available.values())
+    return [available[name] for name in names if name in available]
+
+
+class NotificationDispatcher:
+    """Sends one alert to all channels concurrently on a private event loop."""
+
+    def __init__(
+        self,
+        channels: List[NotificationChannel],
+        pool_size: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.channels = channels
+        self.pool_size = pool_size
+        self.transport = transport  # tests and benchmarks can swap the network out
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {c.name: {"sent": 0, "failed": 0} for c in channels}
+
+    def start(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="notify-loop", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Close every pooled connection and stop the loop."""
+
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_clients(), loop).result(timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+
+    async def _close_clients(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def send(
+        self, alert_id: Optional[int], payload: Dict[str, Any], skip: Iterable[str] = ()
+    ) -> List[ChannelResult]:
+        """Notify every channel not in ``skip`` and wait for all of them (thread-safe)."""
+
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self.send_async(alert_id, payload, skip), self._loop)
+        # Each channel enforces its own timeout; this only guards against a wedged loop
+        return future.result(max((c.timeout for c in self.channels), default=0) + 5)
+
+    async def send_async(
+        self, alert_id: Optional[int], payload: Dict[str, Any], skip: Iterable[str] = ()
+    ) -> List[ChannelResult]:
+        skip = set(skip)
+        channels = [c for c in self.channels if c.name not in skip]
+        return list(await asyncio.gather(*(self._send_one(c, alert_id, payload) for c in channels)))
+
+    def _client(self, channel: NotificationChannel) -> httpx.AsyncClient:
+        # Only touched from the loop thread, so no locking
+        client = self._clients.get(channel.name)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(channel.timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=self.transport,
+            )
+            self._clients[channel.name] = client
+        return client
+
+    async def _send_one(
+        self, channel: NotificationChannel, alert_id: Optional[int], payload: Dict[str, Any]
+    ) -> ChannelResult:
+        started = perf_counter()
+        try:
+            request = channel.build(alert_id, payload)
+            if request is None:
+                return ChannelResult(channel.name, ok=True, skipped=True)
+            # httpx timeouts apply per phase (connect, read, ...); this caps the whole call
+            response = await asyncio.wait_for(self._client(channel).request(**request), channel.timeout)
+        except asyncio.TimeoutError:
+            elapsed_ms = (perf_counter() - started) * 1000
+            result = ChannelResult(channel.name, False, None, elapsed_ms, f"Timed out after {channel.timeout:g}s")
+        except httpx.HTTPError as exc:
+            elapsed_ms = (perf_counter() - started) * 1000
+            result = ChannelResult(channel.name, False, None, elapsed_ms, f"{type(exc).__name__}: {exc}")
+        except Exception as exc:
+            # A bug in one channel fails that channel only; the gather keeps the others' results
+            logger.exception("Notification channel %s failed for alert %s", channel.name, alert_id)
+            elapsed_ms = (perf_counter() - started) * 1000
+            result = ChannelResult(channel.name, False, None, elapsed_ms, f"{type(exc).__name__}: {exc}")
+        else:
+            elapsed_ms = (perf_counter() - started) * 1000
+            ok = response.is_success
+            error = None if ok else f"HTTP {response.status_code}"
+            result = ChannelResult(channel.name, ok, response.status_code, elapsed_ms, error)
+
+        with self._lock:
+            counts = self._counts.setdefault(channel.name, {"sent": 0, "failed": 0})
+            counts["sent" if result.ok else "failed"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {name: dict(values) for name, values in self._counts.items()}
+        return {"channels": [c.name for c in self.channels], "counts": counts}
+
+
+notifier = NotificationDispatcher(build_channels(), pool_size=settings.SAFETY_DISPATCH_POOL_SIZE)
@@ -0,0 +1,189 @@
+"""Cache of active tourist profile lookups by ``user_id`` and ``tourist_id_code``.
+
+Most endpoints start by resolving the caller (or a ``tourist_id_code``) to
+the active ``TouristProfile``. This keeps the profile id and the handful of
+fields those paths read in a bounded LRU with a TTL, so the lookup is a
+dictionary hit instead of a query.
+
+Writes through a session drop the affected entries when they flush and
+again when they commit (a read racing with the write cannot leave the old
+row behind). Other workers do not see the invalidation and may serve the
+previous values for up to ``SAFETY_PROFILE_CACHE_TTL_SECONDS``. Lookups
+that find no active profile are not cached, so a new profile is visible
+everywhere at once.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Optional, Set, Tuple, Union
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+
+_BY_USER = "user"
+_BY_CODE = "code"
+_INFO_KEY = "profile_cache_keys"
+
+
+class ProfileRef:
+    """The fields of an active profile that request handlers read on hot paths."""
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "tourist_id_code",
+        "full_name",
+        "city",
+        "emergency_contact_name",
+        "emergency_contact_phone",
+    )
+
+    def __init__(self, profile: models.TouristProfile):
+        for name in self.__slots__:
+            setattr(self, name, getattr(profile, name))
+
+
+# Profile-like arguments of the location and panic services
+AnyProfile = Union[models.TouristProfile, ProfileRef]
+
+# Changes to these (or to is_active) make cached entries stale
+_WATCHED = set(ProfileRef.__slots__) | {"is_active"}
+
+
+class ProfileCache:
+    """LRU of ``ProfileRef`` keyed by ("user", user_id) and ("code", tourist_id_code)."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, ProfileRef]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _get(self, key: Tuple[str, str]) -> Optional[ProfileRef]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def _put(self, ref: ProfileRef) -> None:
+        expires = monotonic() + self.ttl
+        with self._lock:
+            for key in ((_BY_USER, ref.user_id), (_BY_CODE, ref.tourist_id_code)):
+                self._entries[key] = (expires, ref)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _resolve(self, db: Session, key: Tuple[str, str]) -> Optional[ProfileRef]:
+        ref = self._get(key)
+        if ref is not None:
+            return ref
+        p = models.TouristProfile
+        column = p.user_id if key[0] == _BY_USER else p.tourist_id_code
+        profile = db.query(p).filter(column == key[1], p.is_active == True).first()  # noqa: E712
+        if profile is None:
+            return None
+        ref = ProfileRef(profile)
+        self._put(ref)
+        return ref
+
+    def by_user(self, db: Session, user_id: str) -> Optional[ProfileRef]:
+        return self._resolve(db, (_BY_USER, user_id))
+
+    def by_code(self, db: Session, tourist_id_code: str) -> Optional[ProfileRef]:
+        return self._resolve(db, (_BY_CODE, tourist_id_code))
+
+    def load_by_user(self, db: Session, user_id: str) -> Optional[models.TouristProfile]:
+        """The full active profile row of a user, fetched by primary key when the id is cached."""
+
+        ref = self.by_user(db, user_id)
+        if ref is None:
+            return None
+        profile = db.get(models.TouristProfile, ref.id)
+        if profile is not None and profile.is_active and profile.user_id == user_id:
+            return profile
+        # Changed by another worker since it was cached
+        self.invalidate(user_id=user_id, tourist_id_code=ref.tourist_id_code)
+        ref = self.by_user(db, user_id)
+        return db.get(models.TouristProfile, ref.id) if ref is not None else None
+
+    def invalidate(self, user_id: Optional[str] = None, tourist_id_code: Optional[str] = None) -> None:
+        self.invalidate_keys({(_BY_USER, user_id), (_BY_CODE, tourist_id_code)})
+
+    def invalidate_keys(self, keys: Set[Tuple[str, Any]]) -> None:
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits_total": self._hits,
+                "misses_total": self._misses,
+                "invalidations_total": self._invalidations,
+            }
+
+
+profile_cache = ProfileCache(settings.SAFETY_PROFILE_CACHE_ENTRIES, settings.SAFETY_PROFILE_CACHE_TTL_SECONDS)
+
+
+def _stale_keys(profile: models.TouristProfile, changed_only: bool) -> Set[Tuple[str, Any]]:
+    state = inspect(profile)
+    if changed_only and not any(state.attrs[name].history.has_changes() for name in _WATCHED):
+        return set()
+    keys: Set[Tuple[str, Any]] = set()
+    for kind, attr in ((_BY_USER, "user_id"), (_BY_CODE, "tourist_id_code")):
+        history = state.attrs[attr].history
+        for value in (*history.deleted, *history.unchanged, *history.added):
+            keys.add((kind, value))
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_profile_writes(session: Session, flush_context: Any) -> None:  # noqa: ARG001
+    keys: Set[Tuple[str, Any]] = set()
+    for obj in session.new:
+        if isinstance(obj, models.TouristProfile):
+            keys |= _stale_keys(obj, changed_only=False)
+    for obj in session.deleted:
+        if isinstance(obj, models.TouristProfile):
+            keys |= _stale_keys(obj, changed_only=False)
+    for obj in session.dirty:
+        if isinstance(obj, models.TouristProfile):
+            keys |= _stale_keys(obj, changed_only=True)
+    if keys:
+        profile_cache.invalidate_keys(keys)
+        session.info.setdefault(_INFO_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    keys = session.info.pop(_INFO_KEY, None)
+    if keys:
+        profile_cache.invalidate_keys(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_keys_on_rollback(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
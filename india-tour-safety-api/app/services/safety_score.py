@@ -0,0 +1,304 @@
+"""Tourist safety scores, maintained incrementally from alert writes.
+
+The score model (see ``alert_weight``): start from 100 and subtract, for
+every alert of the last 14 days, a severity penalty times a type ("geo")
+factor times a resolution factor, scaled by a linear time decay with a
+floor of 0.3. An unresolved critical panic in the last 24 hours caps the
+score at 40, and three quiet days allow a 10 point recovery (up to 90).
+
+The decay is linear in the alert's age, so alerts can be summed per hour:
+for each hour bucket ``tourist_safety_states`` keeps the count, the sum of
+weights and the sum of weight x offset (seconds into the hour). That is
+enough to evaluate the decayed penalty of the whole bucket exactly while it
+is inside the linear part of the decay; only the single hour crossing the
+floor (or the 14-day edge) is approximated. The open critical panics and
+the latest alert time cover the cap and the recovery rule, so a score read
+is one primary-key lookup plus at most 14 x 24 bucket terms. The bucket
+terms are evaluated by ``bucket_penalties``, which the fleet-wide batch
+(``services.safety_score_batch``) uses too, so both produce the same score.
+
+The state is updated through the ``alert_events`` hooks, in the same
+transaction as the alert write, and written only when it changes.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection
+
+from .. import models
+from ..db import upsert_insert
+from .alert_events import AlertChange, AlertSnapshot, on_alert_changes
+
+SCORE_WINDOW = timedelta(days=14)
+DECAY_FLOOR = 0.3
+PANIC_CAP_WINDOW = timedelta(hours=24)
+PANIC_CAP = 40.0
+QUIET_WINDOW = timedelta(days=3)
+QUIET_RECOVERY = 10.0
+QUIET_CEILING = 90.0
+
+_BUCKET = timedelta(hours=1)
+_WINDOW_SECONDS = SCORE_WINDOW.total_seconds()
+# Age at which the linear decay reaches its floor (9.8 days)
+_FLOOR_AGE = SCORE_WINDOW * (1.0 - DECAY_FLOOR)
+
+
+# Penalty weights: severity x type ("geo") factor x resolution factor
+SEVERITY_PENALTY = {"critical": 25.0, "high": 15.0, "medium": 7.0, "low": 7.0}
+DEFAULT_SEVERITY_PENALTY = 5.0
+TYPE_FACTOR = {"panic": 1.5, "geofence_breach": 1.2}
+# Resolved incidents still affect the score but a bit less than active ones.
+RESOLVED_FACTOR = 0.7
+
+
+def alert_weight(severity: Optional[str], alert_type: Optional[str], status: Optional[str]) -> float:
+    """Undecayed penalty of one alert."""
+
+    base_penalty = SEVERITY_PENALTY.get(severity or "", DEFAULT_SEVERITY_PENALTY)
+    geo_factor = TYPE_FACTOR.get(alert_type or "", 1.0)
+    resolution_factor = RESOLVED_FACTOR if status == "resolved" else 1.0
+    return base_penalty * geo_factor * resolution_factor
+
+
+def time_decay(triggered_at: datetime, now: datetime) -> float:
+    age_days = max(0.0, (now - triggered_at).total_seconds() / 86400.0)
+    decay = 1.0 - min(age_days, 14.0) / 14.0
+    return max(decay, DECAY_FLOOR)  # never count completely as zero
+
+
+def _bucket_key(ts: datetime) -> str:
+    return ts.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def bucket_penalties(ages: np.ndarray, weights: np.ndarray, weighted_offsets: np.ndarray) -> np.ndarray:
+    """Decayed penalty of each hour bucket.
+
+    ``ages`` are the seconds from each bucket's start to now, ``weights`` and
+    ``weighted_offsets`` the bucket's sum of weights and of weight x offset
+    (seconds into the hour).
+    """
+
+    ages = np.asarray(ages, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    weighted_offsets = np.asarray(weighted_offsets, dtype=float)
+    bucket = _BUCKET.total_seconds()
+    floor_age = _FLOOR_AGE.total_seconds()
+
+    live = (ages < _WINDOW_SECONDS + bucket) & (weights > 0)
+    # The hour crossing the 14-day edge: counted while its mean alert time is inside
+    mean_offset = np.divide(weighted_offsets, weights, out=np.zeros_like(weights), where=weights > 0)
+    live &= ~((ages > _WINDOW_SECONDS) & (mean_offset < ages - _WINDOW_SECONDS))
+
+    # Sum of weight x (1 - age / 14 days), exact for every alert in the linear part of the decay
+    linear = weights - (ages * weights - weighted_offsets) / _WINDOW_SECONDS
+    floor = DECAY_FLOOR * weights
+    penalty = np.where(
+        ages <= floor_age,
+        np.minimum(linear, weights),
+        np.where(ages >= floor_age + bucket, floor, np.maximum(linear, floor)),
+    )
+    return np.where(live, penalty, 0.0)
+
+
+def is_open_critical_panic(alert: Any) -> bool:
+    return alert.type == "panic" and alert.severity == "critical" and alert.status != "resolved"
+
+
+def _finish_score(score: float, capped: bool, last_alert_at: Optional[datetime], now: datetime) -> int:
+    if capped:
+        score = min(score, PANIC_CAP)
+    # Gentle recovery: no alerts at all in the last 3 days nudges the score up toward a "safe" band.
+    if (last_alert_at is None or last_alert_at < now - QUIET_WINDOW) and score < QUIET_CEILING:
+        score = min(QUIET_CEILING, score + QUIET_RECOVERY)
+    return int(round(max(0.0, min(100.0, score))))
+
+
+def score_from_alerts(alerts: Iterable[Any], now: datetime) -> int:
+    """Reference computation straight from alert rows (anything with the snapshot fields)."""
+
+    score = 100.0
+    capped = False
+    last_alert_at = None
+    for alert in alerts:
+        if not alert.triggered_at or alert.triggered_at < now - SCORE_WINDOW:
+            continue
+        score -= alert_weight(alert.severity, alert.type, alert.status) * time_decay(alert.triggered_at, now)
+        if alert.triggered_at >= now - PANIC_CAP_WINDOW and is_open_critical_panic(alert):
+            capped = True
+        if last_alert_at is None or alert.triggered_at > last_alert_at:
+            last_alert_at = alert.triggered_at
+    return _finish_score(score, capped, last_alert_at, now)
+
+
+class SafetyState:
+    """Decayed-penalty accumulator for one tourist (the JSON columns of ``TouristSafetyState``).
+
+    ``buckets`` maps an hour (ISO) to ``[count, sum_weight, sum_weight_x_offset_seconds]``;
+    ``open_panics`` maps alert ids of unresolved critical panics to their time.
+    """
+
+    __slots__ = ("buckets", "open_panics", "last_alert_at")
+
+    def __init__(
+        self,
+        buckets: Optional[Dict[str, List[float]]] = None,
+        open_panics: Optional[Dict[str, str]] = None,
+        last_alert_at: Optional[datetime] = None,
+    ):
+        self.buckets = {key: list(value) for key, value in (buckets or {}).items()}
+        self.open_panics = dict(open_panics or {})
+        self.last_alert_at = last_alert_at
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SafetyState):
+            return NotImplemented
+        return (self.buckets, self.open_panics, self.last_alert_at) == (
+            other.buckets,
+            other.open_panics,
+            other.last_alert_at,
+        )
+
+    def copy(self) -> "SafetyState":
+        return SafetyState(self.buckets, self.open_panics, self.last_alert_at)
+
+    def add(self, alert: AlertSnapshot, sign: int = 1) -> None:
+        if alert.triggered_at is None:
+            return
+        key = _bucket_key(alert.triggered_at)
+        offset = (alert.triggered_at - datetime.fromisoformat(key)).total_seconds()
+        weight = alert_weight(alert.severity, alert.type, alert.status)
+        bucket = self.buckets.setdefault(key, [0, 0.0, 0.0])
+        bucket[0] += sign
+        bucket[1] += sign * weight
+        bucket[2] += sign * weight * offset
+        if bucket[0] <= 0:
+            del self.buckets[key]  # also resets any float drift
+
+        if alert.id is not None and is_open_critical_panic(alert):
+            if sign > 0:
+                self.open_panics[str(alert.id)] = alert.triggered_at.isoformat()
+            else:
+                self.open_panics.pop(str(alert.id), None)
+        if sign > 0 and (self.last_alert_at is None or alert.triggered_at > self.last_alert_at):
+            self.last_alert_at = alert.triggered_at
+
+    def prune(self, now: datetime) -> None:
+        """Forget buckets and panics that can no longer affect the score."""
+
+        oldest = _bucket_key(now - SCORE_WINDOW - _BUCKET)
+        for key in [key for key in self.buckets if key < oldest]:
+            del self.buckets[key]
+        panic_since = (now - PANIC_CAP_WINDOW - _BUCKET).isoformat()
+        for alert_id in [a for a, ts in self.open_panics.items() if ts < panic_since]:
+            del self.open_panics[alert_id]
+
+    def score(self, now: datetime) -> int:
+        ages = [(now - datetime.fromisoformat(key)).total_seconds() for key in self.buckets]
+        weights = [weight for _count, weight, _offset in self.buckets.values()]
+        weighted_offsets = [offset for _count, _weight, offset in self.buckets.values()]
+        score = 100.0 - float(bucket_penalties(ages, weights, weighted_offsets).sum())
+
+        capped = any(ts >= (now - PANIC_CAP_WINDOW).isoformat() for ts in self.open_panics.values())
+        return _finish_score(score, capped, self.last_alert_at, now)
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable[AlertSnapshot]) -> "SafetyState":
+        state = cls()
+        for alert in alerts:
+            state.add(alert)
+        return state
+
+
+def _alert_rows(connection: Connection, profile_id: int, since: datetime) -> List[AlertSnapshot]:
+    a = models.SafetyAlert.__table__
+    rows = connection.execute(
+        select(a.c.id, a.c.tourist_profile_id, a.c.type, a.c.severity, a.c.status, a.c.triggered_at).where(
+            a.c.tourist_profile_id == profile_id, a.c.triggered_at >= since
+        )
+    )
+    return [
+        AlertSnapshot(r.id, r.tourist_profile_id, r.type, r.severity, r.status or "new", r.triggered_at, "")
+        for r in rows
+    ]
+
+
+def build_state(connection: Connection, profile_id: int, now: datetime) -> SafetyState:
+    state = SafetyState.from_alerts(_alert_rows(connection, profile_id, now - SCORE_WINDOW - _BUCKET))
+    state.prune(now)
+    return state
+
+
+def load_state(connection: Connection, profile_id: int, for_update: bool = False) -> Optional[SafetyState]:
+    t = models.TouristSafetyState.__table__
+    stmt = select(t.c.buckets, t.c.open_panics, t.c.last_alert_at).where(t.c.tourist_profile_id == profile_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    row = connection.execute(stmt).first()
+    if row is None:
+        return None
+    return SafetyState(row.buckets, row.open_panics, row.last_alert_at)
+
+
+def save_state(connection: Connection, profile_id: int, state: SafetyState, exists: bool) -> None:
+    t = models.TouristSafetyState.__table__
+    values = {
+        "buckets": state.buckets,
+        "open_panics": state.open_panics,
+        "last_alert_at": state.last_alert_at,
+        "updated_at": datetime.utcnow(),
+    }
+    if exists:
+        connection.execute(update(t).where(t.c.tourist_profile_id == profile_id).values(**values))
+        return
+
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is None:
+        connection.execute(insert(t).values(tourist_profile_id=profile_id, **values))
+        return
+    # A concurrent first write for the same tourist built the same state from the same rows
+    stmt = dialect_insert(t).values(tourist_profile_id=profile_id, **values).on_conflict_do_nothing()
+    connection.execute(stmt)
+
+
+def safety_score(connection: Connection, profile_id: int, now: Optional[datetime] = None) -> int:
+    """Current score of one tourist; seeds (and saves) the state on first use."""
+
+    now = now or datetime.utcnow()
+    state = load_state(connection, profile_id)
+    if state is None:
+        state = build_state(connection, profile_id, now)
+        save_state(connection, profile_id, state, exists=False)
+    return state.score(now)
+
+
+@on_alert_changes
+def _update_safety_states(connection: Connection, changes: Sequence[AlertChange]) -> None:
+    by_profile: Dict[int, List[AlertChange]] = defaultdict(list)
+    for change in changes:
+        profile_ids = {alert.tourist_profile_id for alert in (change.before, change.after) if alert is not None}
+        for profile_id in profile_ids - {None}:
+            by_profile[profile_id].append(change)
+
+    now = datetime.utcnow()
+    for profile_id in sorted(by_profile):  # fixed order avoids lock-order deadlocks
+        state = load_state(connection, profile_id, for_update=True)
+        if state is None:
+            # First change for this tourist: the flushed rows already include it
+            save_state(connection, profile_id, build_state(connection, profile_id, now), exists=False)
+            continue
+
+        before = state.copy()
+        for change in by_profile[profile_id]:
+            if change.before is not None and change.before.tourist_profile_id == profile_id:
+                state.add(change.before, -1)
+            if change.after is not None and change.after.tourist_profile_id == profile_id:
+                state.add(change.after, 1)
+        state.prune(now)
+        if state != before:
+            save_state(connection, profile_id, state, exists=True)
@@ -0,0 +1,290 @@
+"""Fleet-wide safety score recomputation.
+
+Recomputes ``TouristProfile.safety_score`` for every active tourist from
+the last 14 days of alerts, with the same bucketed model as
+``services.safety_score`` (the same ``bucket_penalties``, so a profile's
+stored score equals what ``/me/safety-score`` reads back), evaluated over
+columns instead of per tourist:
+
+- alerts are summed per (profile, hour) in SQL, into the same count, sum
+  of weights and sum of weight x offset as ``SafetyState`` keeps, with the
+  weight built from the same tables in a ``CASE``; each bucket also carries
+  its latest alert and whether it holds an open critical panic of the last
+  24 hours, and arrives as plain numbers, so no per-row ``datetime`` is built;
+- buckets are streamed through a server-side cursor in batches, scored with
+  ``bucket_penalties`` and folded into per-profile NumPy accumulators
+  (penalty, panic cap, latest alert) with ``bincount``, so memory is bounded
+  by the number of profiles;
+- with ``workers > 1`` profiles are sharded by ``id % workers`` and each
+  shard is scored in its own (spawned, not forked) process with its own
+  connection;
+- changed scores are written back with one executemany ``UPDATE`` per batch.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import (
+    Float,
+    Integer,
+    and_,
+    case,
+    cast,
+    create_engine,
+    extract,
+    func,
+    literal_column,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .. import models
+from .safety_score import (
+    DEFAULT_SEVERITY_PENALTY,
+    PANIC_CAP,
+    PANIC_CAP_WINDOW,
+    QUIET_CEILING,
+    QUIET_RECOVERY,
+    QUIET_WINDOW,
+    RESOLVED_FACTOR,
+    SCORE_WINDOW,
+    SEVERITY_PENALTY,
+    TYPE_FACTOR,
+    alert_weight,
+    bucket_penalties,
+    is_open_critical_panic,
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_DAY = 86400.0
+_HOUR = timedelta(hours=1)
+# (profile id, hour start, count, sum of weights, sum of weight x offset, latest alert, open panic in the cap window)
+Bucket = Tuple[int, float, int, float, float, float, int]
+
+
+def _epoch_seconds(ts: datetime) -> float:
+    return (ts - _EPOCH).total_seconds()
+
+
+def _alert_weight_sql(alert: Any) -> Any:
+    """SQL expression equal to ``alert_weight(severity, type, status)``."""
+
+    severity = case(SEVERITY_PENALTY, value=alert.severity, else_=DEFAULT_SEVERITY_PENALTY)
+    geo_factor = case(TYPE_FACTOR, value=alert.type, else_=1.0)
+    resolution = case((alert.status == "resolved", RESOLVED_FACTOR), else_=1.0)
+    return severity * geo_factor * resolution
+
+
+def _epoch_and_hour_sql(connection: Connection, column: Any) -> Optional[Tuple[Any, Any]]:
+    """``column`` (naive UTC) and the start of its hour, in seconds since the epoch; None if the dialect is unknown."""
+
+    # Constant arguments are inlined: the hour expression is repeated in GROUP BY
+    if connection.dialect.name == "postgresql":
+        epoch = cast(extract("epoch", column), Float)
+        hour = cast(extract("epoch", func.date_trunc(literal_column("'hour'"), column)), Float)
+        return epoch, hour
+    if connection.dialect.name == "sqlite":
+        epoch = (func.julianday(column) - 2440587.5) * _DAY
+        hour_text = func.strftime(literal_column("'%Y-%m-%d %H:00:00'"), column)
+        hour = cast(func.strftime(literal_column("'%s'"), hour_text), Integer)
+        return epoch, hour
+    return None
+
+
+def _open_critical_panic_sql(alert: Any) -> Any:
+    return case(
+        (
+            and_(
+                alert.type == "panic",
+                alert.severity == "critical",
+                or_(alert.status.is_(None), alert.status != "resolved"),
+            ),
+            1,
+        ),
+        else_=0,
+    )
+
+
+def _python_buckets(connection: Connection, alerts: Any, now: datetime) -> Iterator[Bucket]:
+    """The per-(profile, hour) sums for dialects without the epoch expressions, built from alert rows."""
+
+    panic_since = now - PANIC_CAP_WINDOW
+    buckets: Dict[Tuple[int, datetime], List[float]] = defaultdict(lambda: [0, 0.0, 0.0, -np.inf, 0])
+    for row in connection.execute(alerts):
+        hour = row.triggered_at.replace(minute=0, second=0, microsecond=0)
+        weight = alert_weight(row.severity, row.type, row.status)
+        bucket = buckets[row.tourist_profile_id, hour]
+        bucket[0] += 1
+        bucket[1] += weight
+        bucket[2] += weight * (row.triggered_at - hour).total_seconds()
+        bucket[3] = max(bucket[3], _epoch_seconds(row.triggered_at))
+        if row.triggered_at >= panic_since and is_open_critical_panic(row):
+            bucket[4] = 1
+    for (profile_id, hour), (count, weight, weighted_offset, last, panic) in buckets.items():
+        yield profile_id, _epoch_seconds(hour), count, weight, weighted_offset, last, panic
+
+
+class ScoreAccumulator:
+    """Per-profile penalty, panic-cap and latest-alert columns for a fixed set of profiles."""
+
+    def __init__(self, profile_ids: np.ndarray, now: datetime):
+        self.profile_ids = np.sort(np.asarray(profile_ids, dtype=np.int64))
+        self.now = _epoch_seconds(now)
+        self.penalty = np.zeros(len(self.profile_ids), dtype=float)
+        self.capped = np.zeros(len(self.profile_ids), dtype=bool)
+        self.last_alert = np.full(len(self.profile_ids), -np.inf)  # epoch seconds
+        self.alerts = 0
+
+    def add(self, buckets: Sequence[Bucket]) -> None:
+        """Fold one batch of hour buckets in (times in epoch seconds); buckets of other profiles are ignored."""
+
+        n = len(self.profile_ids)
+        if n == 0 or len(buckets) == 0:
+            return
+        columns = np.asarray(buckets, dtype=float)
+        profile_ids = columns[:, 0].astype(np.int64)
+        position = np.searchsorted(self.profile_ids, profile_ids)
+        known = position < n
+        known[known] = self.profile_ids[position[known]] == profile_ids[known]
+        position, columns = position[known], columns[known]
+        if len(position) == 0:
+            return
+        hours, counts, weights, weighted_offsets, last, panics = columns[:, 1:].T
+
+        penalties = bucket_penalties(self.now - hours, weights, weighted_offsets)
+        self.penalty += np.bincount(position, weights=penalties, minlength=n)
+        if panics.any():
+            self.capped[position[panics > 0]] = True
+        np.maximum.at(self.last_alert, position, last)
+        self.alerts += int(counts.sum())
+
+    def scores(self) -> np.ndarray:
+        score = 100.0 - self.penalty
+        score = np.where(self.capped, np.minimum(score, PANIC_CAP), score)
+        quiet = self.last_alert < self.now - QUIET_WINDOW.total_seconds()
+        score = np.where(quiet & (score < QUIET_CEILING), np.minimum(QUIET_CEILING, score + QUIET_RECOVERY), score)
+        return np.rint(np.clip(score, 0.0, 100.0)).astype(np.int64)
+
+
+def score_profiles(
+    connection: Connection,
+    now: datetime,
+    batch_size: int = 5000,
+    shard: int = 0,
+    shards: int = 1,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Scores of the active profiles in one shard: ``(profile ids, scores, alerts read)``."""
+
+    p = models.TouristProfile.__table__
+    a = models.SafetyAlert.__table__
+    profiles = select(p.c.id).where(p.c.is_active == True)  # noqa: E712
+    # Same rows as ``build_state``: whole hour buckets, the one crossing the 14-day edge included
+    in_window = and_(a.c.triggered_at >= now - SCORE_WINDOW - _HOUR, a.c.tourist_profile_id.is_not(None))
+    if shards > 1:
+        profiles = profiles.where(p.c.id % shards == shard)
+        in_window = and_(in_window, a.c.tourist_profile_id % shards == shard)
+
+    ids = np.fromiter(connection.execute(profiles).scalars(), dtype=np.int64)
+    acc = ScoreAccumulator(ids, now)
+
+    epoch_sql = _epoch_and_hour_sql(connection, a.c.triggered_at)
+    if epoch_sql is None:
+        columns = select(a.c.tourist_profile_id, a.c.type, a.c.severity, a.c.status, a.c.triggered_at)
+        buckets = list(_python_buckets(connection, columns.where(in_window), now))
+        for start in range(0, len(buckets), batch_size):
+            acc.add(buckets[start : start + batch_size])
+        return acc.profile_ids, acc.scores(), acc.alerts
+
+    triggered, hour = epoch_sql
+    weight = _alert_weight_sql(a.c)
+    recent_panic = case(
+        (a.c.triggered_at >= now - PANIC_CAP_WINDOW, _open_critical_panic_sql(a.c)),
+        else_=0,
+    )
+    query = (
+        select(
+            a.c.tourist_profile_id,
+            hour,
+            func.count(),
+            func.sum(weight),
+            func.sum(weight * (triggered - hour)),
+            func.max(triggered),
+            func.max(recent_panic),
+        )
+        .where(in_window)
+        .group_by(a.c.tourist_profile_id, hour)
+    )
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+    for rows in result.partitions():
+        acc.add([tuple(row) for row in rows])
+    return acc.profile_ids, acc.scores(), acc.alerts
+
+
+def _score_shard(database_url: str, now: datetime, batch_size: int, shard: int, shards: int) -> Tuple:
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            return score_profiles(connection, now, batch_size, shard, shards)
+    finally:
+        engine.dispose()
+
+
+def write_scores(db: Session, profile_ids: np.ndarray, scores: np.ndarray, batch_size: int = 5000) -> int:
+    """Bulk-update ``safety_score`` where it differs; returns the number of profiles changed."""
+
+    p = models.TouristProfile
+    current = dict(db.execute(select(p.id, p.safety_score).where(p.is_active == True)).tuples().all())  # noqa: E712
+    changed = [
+        {"id": profile_id, "safety_score": score}
+        for profile_id, score in zip(profile_ids.tolist(), scores.tolist())
+        if current.get(profile_id, score) != score
+    ]
+    for start in range(0, len(changed), batch_size):
+        db.execute(update(p), changed[start : start + batch_size])
+    db.commit()
+    return len(changed)
+
+
+def recompute_safety_scores(
+    db: Session,
+    now: Optional[datetime] = None,
+    workers: int = 1,
+    batch_size: int = 5000,
+) -> Dict[str, Any]:
+    """Recompute and store the score of every active tourist."""
+
+    now = now or datetime.utcnow()
+    started = perf_counter()
+    if workers <= 1:
+        parts: List[Tuple] = [score_profiles(db.connection(), now, batch_size)]
+    else:
+        database_url = db.get_bind().url.render_as_string(hide_password=False)
+        # Spawned: a fork would copy the caller's threads' locks (outbox, notifier, write-behind) mid-use
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_score_shard, database_url, now, batch_size, shard, workers) for shard in range(workers)
+            ]
+            parts = [future.result() for future in futures]
+    scored_at = perf_counter()
+
+    profile_ids = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    updated = write_scores(db, profile_ids, scores, batch_size)
+    return {
+        "profiles": int(len(profile_ids)),
+        "alerts": sum(part[2] for part in parts),
+        "updated": updated,
+        "workers": max(workers, 1),
+        "score_seconds": round(scored_at - started, 3),
+        "total_seconds": round(perf_counter() - started, 3),
+    }
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Collection, List, Optional, Sequence, Tuple
+
+from .. import schemas
+from .geometry import haversine_m
+
+
+StoredPoint = Tuple[float, float, datetime]  # lat, lng, recorded_at
+
+
+def select_fixes_to_store(
+    fixes: Sequence[Tuple[datetime, schemas.LocationIn]],
+    last_stored: Optional[StoredPoint],
+    min_distance_m: float,
+    max_interval: timedelta,
+    keep_sources: Collection[str] = (),
+) -> List[bool]:
+    """Decide which fixes of an ingest are worth persisting.
+
+    A fix is dropped when it is within ``min_distance_m`` of the last stored
+    point (or within its own reported accuracy, whichever is larger) and less
+    than ``max_interval`` has passed since that point, i.e. the tourist is
+    standing still and the browser is just repeating itself. Fixes from
+    ``keep_sources`` and out-of-order fixes are always kept, and at least one
+    fix per ``max_interval`` is stored as a heartbeat.
+
+    ``fixes`` must be in recorded_at order; each kept fix becomes the
+    reference for the ones after it.
+    """
+
+    keep: List[bool] = []
+    for recorded_at, fix in fixes:
+        store = True
+        if last_stored is not None and (fix.source or "web") not in keep_sources:
+            stored_lat, stored_lng, stored_at = last_stored
+            elapsed = recorded_at - stored_at
+            if timedelta(0) <= elapsed < max_interval:
+                threshold = max(min_distance_m, fix.accuracy_m or 0.0)
+                store = float(haversine_m(stored_lat, stored_lng, fix.lat, fix.lng)) > threshold
+        if store:
+            last_stored = (fix.lat, fix.lng, recorded_at)
+        keep.append(store)
+    return keep
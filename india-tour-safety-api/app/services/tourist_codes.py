@@ -0,0 +1,137 @@
+"""Tourist ID code allocation (``TR-000123``).
+
+Numbers come from the database in blocks, and each worker hands them out
+from memory, so a registration costs no query until its block runs out and
+concurrent registrations (in any number of processes) never collide on the
+unique ``tourist_id_code``. Blocks are taken from the
+``tourist_id_code_seq`` sequence on PostgreSQL and from a
+``tourist_code_counters`` row elsewhere; either way the database makes
+each number unique. Both start past the highest code already issued: the
+counter row is created that way, and each worker moves the sequence past
+it before its first block (``create_all`` creates the sequence at 1).
+Numbers of a block still unused when a worker exits are skipped, so codes
+are unique and increasing per worker but not gapless.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List
+
+from sqlalchemy import Integer, cast, func, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..core.config import settings
+
+CODE_PREFIX = "TR-"
+COUNTER_NAME = "tourist_id_code"
+
+
+def format_tourist_code(number: int) -> str:
+    return f"{CODE_PREFIX}{number:06d}"
+
+
+def _next_free_number(connection: Connection) -> int:
+    """One past the highest number among existing ``TR-`` codes (used to seed the counter)."""
+
+    p = models.TouristProfile.__table__
+    number = cast(func.substr(p.c.tourist_id_code, len(CODE_PREFIX) + 1), Integer)
+    highest = connection.execute(
+        select(func.max(number)).where(p.c.tourist_id_code.like(f"{CODE_PREFIX}%"))
+    ).scalar()
+    return (highest or 0) + 1
+
+
+def _seed_sequence(connection: Connection) -> None:
+    """Move the sequence past the existing codes if it is behind them (never backwards)."""
+
+    # Serializes seeding workers, so one cannot rewind the sequence after another drew from it
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('tourist_id_code_seq'))"))
+    connection.execute(
+        text(
+            "SELECT setval('tourist_id_code_seq', :start, false) FROM tourist_id_code_seq"
+            " WHERE CASE WHEN is_called THEN last_value + 1 ELSE last_value END < :start"
+        ),
+        {"start": _next_free_number(connection)},
+    )
+
+
+def _sequence_block(connection: Connection, size: int, seed: bool = False) -> List[int]:
+    if seed:
+        _seed_sequence(connection)
+    # One round trip; values are unique but not necessarily contiguous under concurrency
+    rows = connection.execute(
+        text("SELECT nextval('tourist_id_code_seq') FROM generate_series(1, :size)"), {"size": size}
+    )
+    return sorted(value for (value,) in rows)
+
+
+def _counter_block(connection: Connection, size: int) -> List[int]:
+    t = models.TouristCodeCounter.__table__
+    advance = update(t).where(t.c.name == COUNTER_NAME).values(next_value=t.c.next_value + size)
+    # The UPDATE write-locks the row (the database on SQLite) until commit, so the read below is ours
+    if connection.execute(advance).rowcount == 0:
+        start = _next_free_number(connection)
+        connection.execute(insert(t).values(name=COUNTER_NAME, next_value=start + size))
+    end = connection.execute(select(t.c.next_value).where(t.c.name == COUNTER_NAME)).scalar_one()
+    return list(range(end - size, end))
+
+
+def reserve_block(engine: Engine, size: int, seed: bool = False) -> List[int]:
+    """Reserve ``size`` code numbers in a transaction of its own.
+
+    ``seed`` first moves the PostgreSQL sequence past the existing codes.
+    """
+
+    try:
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                return _sequence_block(connection, size, seed)
+            return _counter_block(connection, size)
+    except IntegrityError:
+        # Another worker created the counter row first; it exists now
+        with engine.begin() as connection:
+            return _counter_block(connection, size)
+
+
+class TouristCodeAllocator:
+    """Per-process pool of reserved code numbers, refilled a block at a time."""
+
+    def __init__(self, block_size: int = 50):
+        self.block_size = block_size
+        self._numbers: Deque[int] = deque()
+        self._pid = os.getpid()
+        self._engine = None
+        self._seeded = False
+        self._lock = threading.Lock()
+        self._allocated = 0
+        self._blocks = 0
+
+    def next_code(self, engine: Engine) -> str:
+        with self._lock:
+            if self._pid != os.getpid() or engine is not self._engine:
+                # Forked after reserving (the parent may hand out the same numbers) or another database
+                self._numbers.clear()
+                self._pid = os.getpid()
+                self._engine = engine
+                self._seeded = False
+            if not self._numbers:
+                self._numbers.extend(reserve_block(engine, self.block_size, seed=not self._seeded))
+                self._seeded = True
+                self._blocks += 1
+            self._allocated += 1
+            return format_tourist_code(self._numbers.popleft())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "reserved": len(self._numbers),
+            "allocated_total": self._allocated,
+            "blocks_total": self._blocks,
+        }
+
+
+tourist_codes = TouristCodeAllocator(settings.SAFETY_TOURIST_CODE_BLOCK_SIZE)
@@ -0,0 +1,344 @@
+"""Compact binary encoding of risk zone lists (``application/vnd.indiatour.zones+binary``).
+
+Coordinates are quantized to 1e-6 degrees (about 0.1 m) and each point is
+stored as the zigzag varint delta from the previous one, so a typical
+polygon vertex takes 2-4 bytes instead of ~40 bytes of GeoJSON text.
+
+Layout (``uvarint`` = LEB128, ``svarint`` = zigzag LEB128)::
+
+    document := "IZB" version:u8 kind:u8 [delta] count:uvarint zone*
+    delta    := cursor:uvarint(µs since epoch) removed:uvarint id-gap:uvarint*
+    zone     := id:uvarint flags:u8 (bit 0 = is_active)
+                created_at:uvarint(µs) updated_at:uvarint(µs)
+                name description risk_level category city created_by:string
+                geom
+    string   := uvarint(len + 1) utf-8 bytes   (0 = null)
+    geom     := 0 bbox                         bbox-only rectangle
+              | 1 bbox polygon                 GeoJSON Polygon
+              | 2 bbox count:uvarint polygon*  GeoJSON MultiPolygon
+              | 3 string                       anything else, as JSON text
+    bbox     := 4 x svarint (min_lng, min_lat, max_lng, max_lat)
+    polygon  := rings:uvarint (points:uvarint (dlng, dlat):svarint*)*
+
+``kind`` is 0 for a full list and 1 for a ``?since=`` delta, whose ``zones``
+are the changed active zones and ``removed`` the deactivated ids (ascending,
+gap-encoded). Deltas between points run on across rings of a zone.
+
+Each zone record depends only on the zone row, so records are encoded once
+per (zone id, updated_at) and kept in an LRU; a request reads just ids and
+versions, loads the zones it has no record for, and joins bytes.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy.orm import Query, Session
+
+from .. import models
+from ..core.config import settings
+
+MEDIA_TYPE = "application/vnd.indiatour.zones+binary"
+MAGIC = b"IZB"
+VERSION = 1
+KIND_LIST = 0
+KIND_DELTA = 1
+SCALE = 1_000_000
+
+_GEOM_BBOX, _GEOM_POLYGON, _GEOM_MULTIPOLYGON, _GEOM_JSON = range(4)
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def wants_binary(accept: Optional[str]) -> bool:
+    return bool(accept) and MEDIA_TYPE in accept  # type: ignore[operator]
+
+
+def _uvarint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _svarint(out: bytearray, value: int) -> None:
+    _uvarint(out, (value << 1) ^ (value >> 63))
+
+
+def _micros(ts: datetime) -> int:
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+def _string(out: bytearray, value: Optional[str]) -> None:
+    if value is None:
+        out.append(0)
+        return
+    raw = value.encode()
+    _uvarint(out, len(raw) + 1)
+    out += raw
+
+
+def _q(value: Any) -> int:
+    return round(float(value) * SCALE)
+
+
+class _PointWriter:
+    def __init__(self, out: bytearray):
+        self.out = out
+        self.lng = 0
+        self.lat = 0
+
+    def polygon(self, rings: List[List[List[float]]]) -> None:
+        _uvarint(self.out, len(rings))
+        for ring in rings:
+            _uvarint(self.out, len(ring))
+            for position in ring:
+                lng, lat = _q(position[0]), _q(position[1])
+                _svarint(self.out, lng - self.lng)
+                _svarint(self.out, lat - self.lat)
+                self.lng, self.lat = lng, lat
+
+
+def _geom(out: bytearray, geom: Any) -> None:
+    if isinstance(geom, dict) and geom.get("type") == "Feature":
+        geom = geom.get("geometry")
+    try:
+        if not isinstance(geom, dict):
+            raise ValueError
+        geom_type = geom.get("type")
+        kind = {None: _GEOM_BBOX, "Polygon": _GEOM_POLYGON, "MultiPolygon": _GEOM_MULTIPOLYGON}[geom_type]
+        bbox = geom["bbox"]
+        if len(bbox) != 4:
+            # The binary form carries a 2D bbox only (a 3D one has six values)
+            raise ValueError
+        body = bytearray([kind])
+        for value in bbox:
+            _svarint(body, _q(value))
+        writer = _PointWriter(body)
+        if kind == _GEOM_POLYGON:
+            writer.polygon(geom["coordinates"])
+        elif kind == _GEOM_MULTIPOLYGON:
+            _uvarint(body, len(geom["coordinates"]))
+            for polygon in geom["coordinates"]:
+                writer.polygon(polygon)
+    except (KeyError, TypeError, ValueError, IndexError):
+        out.append(_GEOM_JSON)
+        _string(out, json.dumps(geom, separators=(",", ":")))
+        return
+    out += body
+
+
+def encode_zone(zone: models.RiskZone) -> bytes:
+    out = bytearray()
+    _uvarint(out, zone.id)
+    out.append(1 if zone.is_active else 0)
+    _uvarint(out, _micros(zone.created_at))
+    _uvarint(out, _micros(zone.updated_at))
+    for value in (zone.name, zone.description, zone.risk_level, zone.category, zone.city, zone.created_by):
+        _string(out, value)
+    _geom(out, zone.geom)
+    return bytes(out)
+
+
+def encode_document(
+    records: Iterable[bytes],
+    cursor: Optional[datetime] = None,
+    removed: Iterable[int] = (),
+) -> bytes:
+    records = list(records)
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    if cursor is None:
+        out.append(KIND_LIST)
+    else:
+        out.append(KIND_DELTA)
+        _uvarint(out, _micros(cursor))
+        removed = sorted(removed)
+        _uvarint(out, len(removed))
+        previous = 0
+        for zone_id in removed:
+            _uvarint(out, zone_id - previous)
+            previous = zone_id
+    _uvarint(out, len(records))
+    return bytes(out) + b"".join(records)
+
+
+class ZoneRecordCache:
+    """LRU of encoded zone records keyed by (zone id, updated_at)."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, datetime], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Tuple[int, datetime]) -> Optional[bytes]:
+        with self._lock:
+            record = self._entries.get(key)
+            if record is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return record
+
+    def put(self, key: Tuple[int, datetime], record: bytes) -> None:
+        with self._lock:
+            self._entries[key] = record
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(record) for record in self._entries.values()),
+                "hits_total": self._hits,
+                "misses_total": self._misses,
+            }
+
+
+zone_records = ZoneRecordCache(settings.SAFETY_ZONE_CODEC_CACHE_ENTRIES)
+
+
+def encode_zone_query(db: Session, q: Query, since: Optional[datetime] = None) -> bytes:
+    """Encode the zones selected by ``q`` (filters and order kept) from cached records.
+
+    Only ``id``, ``updated_at`` and ``is_active`` are read for every zone;
+    full rows (and their geom JSON) are loaded just for the records missing
+    from the cache. With ``since`` (``q`` then being ``changed_since(...)``)
+    the document is a delta, like ``zone_delta``.
+    """
+
+    z = models.RiskZone
+    versions = q.with_entities(z.id, z.updated_at, z.is_active).all()
+    latest = max((updated_at for _, updated_at, _ in versions), default=None)
+    if since is not None:
+        removed = [zone_id for zone_id, _, is_active in versions if not is_active]
+        versions = [row for row in versions if row[2]]
+
+    records: Dict[int, bytes] = {}
+    missing: List[int] = []
+    for zone_id, updated_at, _ in versions:
+        record = zone_records.get((zone_id, updated_at))
+        if record is None:
+            missing.append(zone_id)
+        else:
+            records[zone_id] = record
+    if missing:
+        for zone in db.query(z).filter(z.id.in_(missing)):
+            record = encode_zone(zone)
+            zone_records.put((zone.id, zone.updated_at), record)
+            records[zone.id] = record
+
+    ordered = [records[zone_id] for zone_id, _, _ in versions if zone_id in records]
+    if since is None:
+        return encode_document(ordered)
+    return encode_document(ordered, cursor=max(latest, since) if latest else since, removed=removed)
+
+
+def binary_zone_response(content: bytes, response: Response) -> Response:
+    """Binary response carrying the cache headers already set on ``response``."""
+
+    headers = {name: value for name, value in response.headers.items() if name in ("etag", "cache-control", "vary")}
+    return Response(content=content, media_type=MEDIA_TYPE, headers=headers)
+
+
+# ---- decoding (reference implementation, used by tests and tooling) ----
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def uvarint(self) -> int:
+        shift = result = 0
+        while True:
+            value = self.byte()
+            result |= (value & 0x7F) << shift
+            if value < 0x80:
+                return result
+            shift += 7
+
+    def svarint(self) -> int:
+        value = self.uvarint()
+        return (value >> 1) ^ -(value & 1)
+
+    def string(self) -> Optional[str]:
+        length = self.uvarint()
+        if length == 0:
+            return None
+        raw = self.data[self.pos : self.pos + length - 1]
+        self.pos += length - 1
+        return raw.decode()
+
+    def timestamp(self) -> datetime:
+        return _EPOCH + self.uvarint() * _MICROSECOND
+
+
+def _read_geom(reader: _Reader) -> Any:
+    kind = reader.byte()
+    if kind == _GEOM_JSON:
+        return json.loads(reader.string() or "null")
+    bbox = [reader.svarint() / SCALE for _ in range(4)]
+    if kind == _GEOM_BBOX:
+        return {"bbox": bbox}
+
+    point = [0, 0]
+
+    def polygon() -> List[List[List[float]]]:
+        rings = []
+        for _ in range(reader.uvarint()):
+            ring = []
+            for _ in range(reader.uvarint()):
+                point[0] += reader.svarint()
+                point[1] += reader.svarint()
+                ring.append([point[0] / SCALE, point[1] / SCALE])
+            rings.append(ring)
+        return rings
+
+    if kind == _GEOM_POLYGON:
+        return {"type": "Polygon", "coordinates": polygon(), "bbox": bbox}
+    return {"type": "MultiPolygon", "coordinates": [polygon() for _ in range(reader.uvarint())], "bbox": bbox}
+
+
+def decode_document(data: bytes) -> Dict[str, Any]:
+    """Decode a document into ``{"zones": [...]}`` (plus ``cursor`` / ``removed`` for deltas)."""
+
+    if data[:3] != MAGIC or data[3] != VERSION:
+        raise ValueError("Not a zones+binary v1 document")
+    reader = _Reader(data)
+    reader.pos = 4
+    result: Dict[str, Any] = {}
+    if reader.byte() == KIND_DELTA:
+        result["cursor"] = reader.timestamp()
+        removed, previous = [], 0
+        for _ in range(reader.uvarint()):
+            previous += reader.uvarint()
+            removed.append(previous)
+        result["removed"] = removed
+
+    zones = []
+    for _ in range(reader.uvarint()):
+        zone: Dict[str, Any] = {"id": reader.uvarint(), "is_active": bool(reader.byte() & 1)}
+        zone["created_at"] = reader.timestamp()
+        zone["updated_at"] = reader.timestamp()
+        for field in ("name", "description", "risk_level", "category", "city", "created_by"):
+            zone[field] = reader.string()
+        zone["geom"] = _read_geom(reader)
+        zones.append(zone)
+    result["zones"] = zones
+    return result
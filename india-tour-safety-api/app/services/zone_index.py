@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import math
+import threading
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..core.config import settings
+from .geometry import BBox, GeofenceEngine, ZoneShape, parse_zone_geometry
+
+
+class IndexedZone:
+    """Detached snapshot of the RiskZone fields the geofence rules need."""
+
+    __slots__ = ("id", "name", "description", "risk_level", "city", "shape")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        risk_level: str,
+        shape: ZoneShape,
+        description: Optional[str] = None,
+        city: Optional[str] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.risk_level = risk_level
+        self.city = city
+        self.shape = shape
+
+    @property
+    def bbox(self) -> BBox:
+        return self.shape.bbox
+
+    @classmethod
+    def from_model(cls, zone: models.RiskZone) -> Optional["IndexedZone"]:
+        try:
+            shape = parse_zone_geometry(zone.geom)
+        except ValueError:
+            return None
+        return cls(
+            id=zone.id,
+            name=zone.name,
+            risk_level=zone.risk_level,
+            shape=shape,
+            description=zone.description,
+            city=zone.city,
+        )
+
+
+def zone_bbox(geom: object) -> Optional[BBox]:
+    """Return the [min_lng, min_lat, max_lng, max_lat] bbox of a zone geom, if it is valid."""
+
+    try:
+        return parse_zone_geometry(geom).bbox
+    except ValueError:
+        return None
+
+
+class ZoneGridIndex:
+    """Uniform grid over zone bboxes backed by a vectorized polygon test.
+
+    Every zone is registered in each grid cell its bbox overlaps, so a point
+    lookup only has to test the handful of zones sharing its cell. Zones that
+    would cover more than ``max_cells_per_zone`` cells (e.g. a whole-state
+    advisory) are kept in a small side list that is always checked instead of
+    bloating the grid. Candidates then go through ``GeofenceEngine``, which
+    uses the bbox as a prefilter before the exact polygon test.
+    """
+
+    def __init__(
+        self,
+        zones: Iterable[IndexedZone],
+        cell_size_deg: float = 0.05,
+        max_cells_per_zone: int = 4096,
+    ):
+        self.cell_size = cell_size_deg
+        self.max_cells_per_zone = max_cells_per_zone
+        self.zones: List[IndexedZone] = list(zones)
+        self.engine = GeofenceEngine([zone.shape for zone in self.zones])
+        self._cells: Dict[tuple[int, int], List[int]] = {}
+        self._oversized: List[int] = []
+        for position, zone in enumerate(self.zones):
+            self._insert(position, zone)
+
+    @property
+    def size(self) -> int:
+        return len(self.zones)
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def _insert(self, position: int, zone: IndexedZone) -> None:
+        min_lng, min_lat, max_lng, max_lat = zone.bbox
+        xs = range(self._cell(min_lng), self._cell(max_lng) + 1)
+        ys = range(self._cell(min_lat), self._cell(max_lat) + 1)
+        if len(xs) * len(ys) > self.max_cells_per_zone:
+            self._oversized.append(position)
+            return
+        for x in xs:
+            for y in ys:
+                self._cells.setdefault((x, y), []).append(position)
+
+    def _candidates(self, lat: float, lng: float) -> List[int]:
+        candidates = self._cells.get((self._cell(lng), self._cell(lat)), [])
+        if self._oversized:
+            candidates = candidates + self._oversized
+        return candidates
+
+    def query(self, lat: float, lng: float) -> List[IndexedZone]:
+        """Return zones containing the point, ordered by zone id.
+
+        Rectangles are answered by the bbox check alone; only polygon zones
+        whose bbox contains the point reach the polygon test.
+        """
+
+        hits: List[IndexedZone] = []
+        polygons: List[int] = []
+        for position in self._candidates(lat, lng):
+            zone = self.zones[position]
+            min_lng, min_lat, max_lng, max_lat = zone.bbox
+            if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+                continue
+            if zone.shape.is_rect:
+                hits.append(zone)
+            else:
+                polygons.append(position)
+
+        if polygons:
+            inside = self.engine.contains([lat], [lng], polygons)[0]
+            hits.extend(self.zones[position] for position, hit in zip(polygons, inside) if hit)
+
+        hits.sort(key=lambda zone: zone.id)
+        return hits
+
+    def query_many(self, lats: Sequence[float], lngs: Sequence[float]) -> List[List[IndexedZone]]:
+        """Return, for each point, the zones containing it (ordered by zone id).
+
+        Candidate zones from all the points' cells are evaluated together in
+        a single vectorized pass.
+        """
+
+        candidates = sorted({p for lat, lng in zip(lats, lngs) for p in self._candidates(lat, lng)})
+        if not candidates:
+            return [[] for _ in lats]
+
+        inside = self.engine.contains(lats, lngs, candidates)
+        hits: List[List[IndexedZone]] = []
+        for row in inside:
+            zones = [self.zones[candidates[column]] for column in row.nonzero()[0]]
+            zones.sort(key=lambda zone: zone.id)
+            hits.append(zones)
+        return hits
+
+
+_index: Optional[ZoneGridIndex] = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def build_zone_index(db: Session) -> ZoneGridIndex:
+    zones = (
+        db.query(models.RiskZone)
+        .filter(models.RiskZone.is_active == True)  # noqa: E712
+        .order_by(models.RiskZone.id)
+        .all()
+    )
+    entries = [entry for entry in (IndexedZone.from_model(zone) for zone in zones) if entry is not None]
+    return ZoneGridIndex(entries, cell_size_deg=settings.SAFETY_ZONE_INDEX_CELL_DEG)
+
+
+def get_zone_index(db: Session) -> ZoneGridIndex:
+    """Return the shared zone index, rebuilding it when invalidated or older than the TTL.
+
+    Zone edits made through this worker invalidate the index immediately; the
+    TTL bounds how long edits made through other workers take to show up.
+    """
+
+    global _index, _index_built_at
+
+    index = _index
+    if index is not None and monotonic() - _index_built_at < settings.SAFETY_ZONE_INDEX_TTL_SECONDS:
+        return index
+
+    with _index_lock:
+        if _index is None or monotonic() - _index_built_at >= settings.SAFETY_ZONE_INDEX_TTL_SECONDS:
+            _index = build_zone_index(db)
+            _index_built_at = monotonic()
+        return _index
+
+
+def invalidate_zone_index() -> None:
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,126 @@
+"""Zone-set generation counter behind the conditional zone downloads.
+
+Every flush that inserts, changes or deletes a ``RiskZone`` bumps the
+single ``risk_zone_generation`` row in the same transaction, so all workers
+agree on the current generation. Zone list ETags are derived from it (plus
+the query that selected the zones): while nothing changes a client's
+``If-None-Match`` keeps matching and is answered with an empty 304.
+
+Delta downloads page by ``RiskZone.updated_at``, which is stamped when the
+write is flushed, not when it commits. A zone stamped just before a cursor
+but committed after it would be missed by a strict ``>``, so every delta
+re-reads ``SAFETY_ZONE_DELTA_OVERLAP_SECONDS`` behind the cursor; the
+zones re-sent from that window are applied again by the client.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query, Session
+
+from .. import models, schemas
+from ..core.config import settings
+from ..db import upsert_insert
+
+GENERATION_ROW_ID = 1
+
+
+def bump_zone_generation(connection: Connection) -> None:
+    t = models.RiskZoneGeneration.__table__
+    now = datetime.utcnow()
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(t).values(id=GENERATION_ROW_ID, generation=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.id], set_={"generation": t.c.generation + 1, "updated_at": now}
+        )
+        connection.execute(stmt)
+        return
+
+    result = connection.execute(
+        update(t).where(t.c.id == GENERATION_ROW_ID).values(generation=t.c.generation + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(t).values(id=GENERATION_ROW_ID, generation=1, updated_at=now))
+
+
+def current_zone_generation(db: Session) -> int:
+    t = models.RiskZoneGeneration
+    return db.execute(select(t.generation).where(t.id == GENERATION_ROW_ID)).scalar() or 0
+
+
+def zone_etag(generation: int, *variant: Any) -> str:
+    """Strong ETag for a zone list: the generation plus a digest of the query that produced it."""
+
+    digest = hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+    return f'"zones-{generation}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` evaluation (weak comparison, as RFC 9110 specifies for it)."""
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def zone_cache_headers(db: Session, request: Request, response: Response, *variant: Any) -> Optional[Response]:
+    """Put the ETag on ``response``; return a 304 instead when the client already has this version.
+
+    Call before loading the zones: the generation is read first, so a zone
+    write racing with the request can only make the ETag older than the
+    body (the client refetches once more), never newer.
+    """
+
+    etag = zone_etag(current_zone_generation(db), request.url.path, *variant)
+    # Vary: the same URL also serves the binary encoding (see services.zone_codec)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def changed_since(q: Query, since: datetime) -> Query:
+    """Zones of ``q`` written after ``since``, less the overlap for late commits, oldest first."""
+
+    since = since - timedelta(seconds=settings.SAFETY_ZONE_DELTA_OVERLAP_SECONDS)
+    return q.filter(models.RiskZone.updated_at > since).order_by(models.RiskZone.updated_at, models.RiskZone.id)
+
+
+def zone_delta(q: Query, since: datetime) -> schemas.RiskZoneDeltaOut:
+    """Zones of ``q`` written after ``since``: active ones in full, deactivated ones by id.
+
+    ``cursor`` is the newest ``updated_at`` seen (never older than ``since``)
+    and is what the client passes as ``since`` next time.
+    """
+
+    changed = changed_since(q, since).all()
+    return schemas.RiskZoneDeltaOut(
+        cursor=max(changed[-1].updated_at, since) if changed else since,
+        zones=[zone for zone in changed if zone.is_active],
+        removed=[zone.id for zone in changed if not zone.is_active],
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_zone_writes(session: Session, flush_context: Any) -> None:  # noqa: ARG001
+    touched = any(isinstance(obj, models.RiskZone) for obj in session.new) or any(
+        isinstance(obj, models.RiskZone) for obj in session.deleted
+    )
+    if not touched:
+        touched = any(
+            isinstance(obj, models.RiskZone) and session.is_modified(obj, include_collections=False)
+            for obj in session.dirty
+        )
+    if touched:
+        bump_zone_generation(session.connection())
@@ -0,0 +1,69 @@
+"""Per-request authentication cost: full JWT verification vs. the verified-token cache.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_auth
+
+``authenticate_token`` is called for a stream of requests from a pool of
+clients, each sending its own HS256 token (as the app does for location
+pings). "decode" runs with the cache disabled, so every request verifies
+the token; "cached" uses the default cache, so only each client's first
+request does.
+"""
+
+import random
+import time
+from time import perf_counter
+
+from jose import jwt
+
+from app import deps
+from app.core.config import settings
+from app.core.token_cache import VerifiedTokenCache
+
+SECRET = "bench-secret"
+CLIENTS = [100, 5_000]
+REQUESTS = 50_000
+
+
+def _run(tokens: list, order: list) -> float:
+    started = perf_counter()
+    for i in order:
+        deps.authenticate_token(tokens[i])
+    return (perf_counter() - started) / len(order) * 1e6
+
+
+def main() -> None:
+    settings.SUPABASE_JWT_SECRET = SECRET
+    settings.SUPABASE_JWT_AUDIENCE = "authenticated"
+    settings.SUPABASE_JWT_ISSUER = "https://example.supabase.co/auth/v1"
+    rng = random.Random(4)
+    exp = int(time.time()) + 3600
+
+    print(f"{'clients':>8} {'decode us/req':>14} {'cached us/req':>14} {'speedup':>8}")
+    for clients in CLIENTS:
+        tokens = [
+            jwt.encode(
+                {
+                    "sub": f"user-{n}",
+                    "email": f"user-{n}@example.com",
+                    "role": "authenticated",
+                    "aud": settings.SUPABASE_JWT_AUDIENCE,
+                    "iss": settings.SUPABASE_JWT_ISSUER,
+                    "exp": exp,
+                },
+                SECRET,
+            )
+            for n in range(clients)
+        ]
+        order = [rng.randrange(clients) for _ in range(REQUESTS)]
+
+        deps.verified_tokens = VerifiedTokenCache(max_entries=0)
+        decode_us = _run(tokens, order)
+        deps.verified_tokens = VerifiedTokenCache(settings.SAFETY_AUTH_CACHE_ENTRIES)
+        cached_us = _run(tokens, order)
+        print(f"{clients:>8} {decode_us:>14.1f} {cached_us:>14.1f} {decode_us / cached_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Nearby-tourist query cost: grid index vs. a vectorized scan of every position.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_nearby
+
+Tourists are clustered around a few dozen city centres (as real traffic is),
+and each query asks for everyone within 2 km of a random tourist. The scan
+column computes haversine against every indexed position.
+"""
+
+import random
+from datetime import datetime, timedelta
+from statistics import quantiles
+from time import perf_counter
+
+import numpy as np
+
+from app.services.geometry import haversine_m
+from app.services.nearby import NearbyIndex
+
+INDIA_BBOX = (68.0, 8.0, 97.0, 35.0)  # min_lng, min_lat, max_lng, max_lat
+TOURIST_COUNTS = [10_000, 100_000, 250_000]
+CITIES = 40
+CITY_SPREAD_DEG = 0.08  # ~9 km standard deviation around a centre
+QUERIES = 2_000
+RADIUS_M = 2_000.0
+
+
+def main() -> None:
+    rng = random.Random(42)
+    min_lng, min_lat, max_lng, max_lat = INDIA_BBOX
+    centres = [(rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)) for _ in range(CITIES)]
+    now = datetime.utcnow()
+
+    print(f"{'tourists':>9} {'build ms':>9} {'grid p50 ms':>12} {'grid p99 ms':>12} {'scan p50 ms':>12} {'hits avg':>9}")
+    for count in TOURIST_COUNTS:
+        points = []
+        for _ in range(count):
+            lat, lng = rng.choice(centres)
+            points.append((rng.gauss(lat, CITY_SPREAD_DEG), rng.gauss(lng, CITY_SPREAD_DEG)))
+
+        started = perf_counter()
+        index = NearbyIndex()
+        for profile_id, (lat, lng) in enumerate(points, start=1):
+            index.upsert(profile_id, f"TR-{profile_id:06d}", lat, lng, now - timedelta(seconds=profile_id % 3600))
+        build_ms = (perf_counter() - started) * 1000
+
+        queries = [points[rng.randrange(count)] for _ in range(QUERIES)]
+        since = now - timedelta(minutes=60)
+        grid_ms, hits = [], 0
+        for lat, lng in queries:
+            started = perf_counter()
+            hits += len(index.query(lat, lng, RADIUS_M, since, limit=500))
+            grid_ms.append((perf_counter() - started) * 1000)
+
+        lats = np.array([p[0] for p in points])
+        lngs = np.array([p[1] for p in points])
+        scan_ms = []
+        for lat, lng in queries[:200]:
+            started = perf_counter()
+            distances = haversine_m(lat, lng, lats, lngs)
+            np.sort(distances[distances <= RADIUS_M])
+            scan_ms.append((perf_counter() - started) * 1000)
+
+        g = quantiles(grid_ms, n=100)
+        s = quantiles(scan_ms, n=100)
+        print(f"{count:>9} {build_ms:>9.0f} {g[49]:>12.3f} {g[98]:>12.3f} {s[49]:>12.3f} {hits / QUERIES:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
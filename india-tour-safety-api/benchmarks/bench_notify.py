@@ -0,0 +1,98 @@
+"""Panic notification throughput and latency: sequential vs. concurrent fan-out.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_notify
+
+Three channels (standing in for SMS, email and the police webhook) point at
+a local stub provider with a fixed delay per request. "sequential" is the
+old shape: one channel after another, a fresh connection for each request.
+"fan-out" is ``NotificationDispatcher``: the channels in parallel over
+pooled keep-alive connections, fed by several outbox worker threads.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter
+from typing import Callable, List
+
+import httpx
+
+from app.services.notify import NotificationChannel, NotificationDispatcher
+from benchmarks.stub_provider import StubProvider
+
+ALERTS = 300
+WORKERS = 4  # outbox worker threads
+LATENCY_MS = 40.0
+JITTER_MS = 20.0
+CHANNELS = ("sms", "email", "police_webhook")
+PAYLOAD = {"full_name": "Bench", "tourist_id_code": "TR-000001", "emergency_contact_phone": "+910000000000"}
+
+
+def _channels(base_url: str) -> List[NotificationChannel]:
+    def build_for(name: str):  # noqa: ANN202
+        return lambda alert_id, payload: {"method": "POST", "url": f"{base_url}/{name}", "json": payload}
+
+    return [NotificationChannel(name, 5.0, build_for(name)) for name in CHANNELS]
+
+
+def _sequential(base_url: str) -> Callable[[int], None]:
+    def send(alert_id: int) -> None:
+        for name in CHANNELS:
+            # A new client per call: no connection reuse, as with ad-hoc provider SDK calls
+            with httpx.Client(timeout=5.0) as client:
+                client.post(f"{base_url}/{name}", json=PAYLOAD).raise_for_status()
+
+    return send
+
+
+def _fan_out(dispatcher: NotificationDispatcher) -> Callable[[int], None]:
+    def send(alert_id: int) -> None:
+        results = dispatcher.send(alert_id, PAYLOAD)
+        assert all(result.ok for result in results), results
+
+    return send
+
+
+def _run(label: str, send: Callable[[int], None], stub: StubProvider) -> None:
+    requests_before, connections_before = stub.requests, stub.connections
+    latencies: List[float] = []
+
+    def timed(alert_id: int) -> None:
+        started = perf_counter()
+        send(alert_id)
+        latencies.append((perf_counter() - started) * 1000)
+
+    started = perf_counter()
+    with ThreadPoolExecutor(WORKERS) as pool:
+        list(pool.map(timed, range(ALERTS)))
+    elapsed = perf_counter() - started
+
+    p = quantiles(latencies, n=100)
+    print(  # noqa: T201
+        f"{label:>10} | {ALERTS / elapsed:8.1f} alerts/s | p50 {p[49]:7.1f} ms | p95 {p[94]:7.1f} ms "
+        f"| p99 {p[98]:7.1f} ms | {stub.requests - requests_before:5d} requests "
+        f"over {stub.connections - connections_before:4d} connections"
+    )
+
+
+def main() -> None:
+    stub = StubProvider(latency_ms=LATENCY_MS, jitter_ms=JITTER_MS).start_in_thread()
+    print(  # noqa: T201
+        f"{ALERTS} alerts x {len(CHANNELS)} channels, {WORKERS} worker threads, "
+        f"provider latency {LATENCY_MS:g}-{LATENCY_MS + JITTER_MS:g} ms"
+    )
+
+    _run("sequential", _sequential(stub.url), stub)
+
+    dispatcher = NotificationDispatcher(_channels(stub.url), pool_size=WORKERS)
+    try:
+        _run("fan-out", _fan_out(dispatcher), stub)
+    finally:
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
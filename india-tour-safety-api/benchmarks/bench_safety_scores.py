@@ -0,0 +1,98 @@
+"""Fleet-wide safety score recomputation: per-profile loop vs. the batch engine.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_safety_scores
+
+A temporary SQLite database gets 100k active profiles and 1M alerts spread
+over the last 14 days. "per-profile" is what scoring every tourist one at a
+time costs (read its alerts, ``build_state(...).score``, update the row); it is
+timed on a sample and extrapolated. "batch" is ``recompute_safety_scores``
+with 1 and 4 worker processes, starting each run from cleared scores so
+every profile is written.
+"""
+
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.safety_score import build_state
+from app.services.safety_score_batch import recompute_safety_scores
+
+PROFILES = 100_000
+ALERTS = 1_000_000
+SAMPLE = 2_000
+WORKERS = [1, 4]
+TYPES = ["panic", "geofence_breach", "anomaly_inactivity", "route_deviation"]
+SEVERITIES = ["critical", "high", "medium", "low", "info"]
+STATUSES = ["new", "acknowledged", "resolved"]
+
+
+def _fill(engine, now: datetime) -> None:  # noqa: ANN001
+    rng = random.Random(9)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(models.TouristProfile),
+            [
+                {"id": i, "user_id": f"u{i}", "tourist_id_code": f"TR-{i:06d}", "full_name": "T", "is_active": True}
+                for i in range(1, PROFILES + 1)
+            ],
+        )
+        batch = []
+        for alert_id in range(1, ALERTS + 1):
+            batch.append(
+                {
+                    "id": alert_id,
+                    "tourist_profile_id": rng.randint(1, PROFILES),
+                    "type": rng.choice(TYPES),
+                    "severity": rng.choice(SEVERITIES),
+                    "status": rng.choice(STATUSES),
+                    "title": "t",
+                    "triggered_at": now - timedelta(seconds=rng.uniform(0, 14 * 86400)),
+                }
+            )
+            if len(batch) == 50_000:
+                connection.execute(insert(models.SafetyAlert), batch)
+                batch = []
+
+
+def main() -> None:
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'scores.db'}")
+        Base.metadata.create_all(engine)
+        started = perf_counter()
+        _fill(engine, now)
+        print(f"filled {PROFILES} profiles / {ALERTS} alerts in {perf_counter() - started:.1f}s")
+        db = sessionmaker(bind=engine)()
+
+        print(f"{'method':>16} {'seconds':>9} {'profiles/s':>11}")
+        started = perf_counter()
+        profile = models.TouristProfile
+        for profile_id in random.Random(1).sample(range(1, PROFILES + 1), SAMPLE):
+            score = build_state(db.connection(), profile_id, now).score(now)
+            db.execute(update(profile).where(profile.id == profile_id).values(safety_score=score))
+        db.commit()
+        seconds = (perf_counter() - started) * PROFILES / SAMPLE
+        print(f"{'per-profile (est)':>16} {seconds:>9.1f} {PROFILES / seconds:>11.0f}")
+
+        for workers in WORKERS:
+            db.execute(update(profile).values(safety_score=None))
+            db.commit()
+            stats = recompute_safety_scores(db, now=now, workers=workers)
+            assert stats["profiles"] == PROFILES and stats["updated"] == PROFILES
+            seconds = stats["total_seconds"]
+            print(f"{f'batch x{workers}':>16} {seconds:>9.1f} {PROFILES / seconds:>11.0f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
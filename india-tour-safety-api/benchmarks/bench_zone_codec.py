@@ -0,0 +1,108 @@
+"""Zone download size and serving cost: GeoJSON vs. the binary zone encoding.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_zone_codec
+
+A temporary SQLite database is filled with polygon zones (jittered circles
+around Indian city centres, coordinates with 6+ decimals as drawn in map
+editors). "json" is what the zones endpoint did before: load the rows and
+serialize them through ``RiskZoneOut``. "binary" is ``encode_zone_query``
+with a warm record cache.
+"""
+
+import gzip
+import json
+import math
+import random
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.db import Base
+from app.services.zone_codec import decode_document, encode_zone_query, zone_records
+
+ZONE_COUNTS = [100, 1_000]
+VERTICES = 120
+REPEATS = 20
+
+
+def _polygon(rng: random.Random) -> dict:
+    lat, lng = rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)
+    radius = rng.uniform(0.002, 0.03)
+    ring = []
+    for k in range(VERTICES):
+        angle = 2 * math.pi * k / VERTICES
+        r = radius * rng.uniform(0.8, 1.2)
+        ring.append([round(lng + r * math.cos(angle), 7), round(lat + r * math.sin(angle), 7)])
+    ring.append(ring[0])
+    lngs, lats = [p[0] for p in ring], [p[1] for p in ring]
+    return {"type": "Polygon", "coordinates": [ring], "bbox": [min(lngs), min(lats), max(lngs), max(lats)]}
+
+
+def _time(fn, repeats: int = REPEATS) -> float:  # noqa: ANN001
+    started = perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (perf_counter() - started) / repeats * 1000
+
+
+def main() -> None:
+    rng = random.Random(3)
+    print(
+        f"{'zones':>6} {'json KB':>8} {'json gz KB':>10} {'bin KB':>7} {'bin gz KB':>9} "
+        f"{'json ms':>8} {'bin cold ms':>11} {'bin warm ms':>11}"
+    )
+    for count in ZONE_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'zones.db'}")
+            Base.metadata.create_all(engine)
+            db = sessionmaker(bind=engine)()
+            for zone_id in range(1, count + 1):
+                db.add(
+                    models.RiskZone(
+                        id=zone_id,
+                        name=f"Zone {zone_id}",
+                        description="Crowded market lane; pickpocketing reported",
+                        risk_level=rng.choice(["low", "medium", "high"]),
+                        city="Delhi",
+                        geom=_polygon(rng),
+                    )
+                )
+            db.commit()
+
+            def query():  # noqa: ANN202
+                return db.query(models.RiskZone).filter(models.RiskZone.is_active == True)  # noqa: E712
+
+            def as_json() -> bytes:
+                db.expire_all()
+                zones = [schemas.RiskZoneOut.model_validate(zone).model_dump(mode="json") for zone in query()]
+                return json.dumps(zones, separators=(",", ":")).encode()
+
+            def as_binary() -> bytes:
+                db.expire_all()
+                return encode_zone_query(db, query())
+
+            json_body = as_json()
+            json_ms = _time(as_json)
+            zone_records._entries.clear()
+            cold_ms = _time(as_binary, repeats=1)
+            binary_body = as_binary()
+            warm_ms = _time(as_binary)
+            assert len(decode_document(binary_body)["zones"]) == count
+            db.close()
+            engine.dispose()
+
+        print(
+            f"{count:>6} {len(json_body) / 1024:>8.0f} {len(gzip.compress(json_body)) / 1024:>10.0f} "
+            f"{len(binary_body) / 1024:>7.0f} {len(gzip.compress(binary_body)) / 1024:>9.0f} "
+            f"{json_ms:>8.1f} {cold_ms:>11.1f} {warm_ms:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
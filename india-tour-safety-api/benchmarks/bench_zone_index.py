@@ -0,0 +1,77 @@
+"""Per-fix geofence lookup cost: grid index vs. scanning every zone.
+
+Run from the project root (india-tour-safety-api):
+
+    python -m benchmarks.bench_zone_index
+
+Zones are random rectangles scattered over India's bounding box. The linear
+column reproduces the old ingest behaviour (``_point_in_bbox`` against every
+active zone); the grid column should stay roughly flat as the zone count grows.
+"""
+
+import random
+from time import perf_counter
+
+from app.routers.locations import _point_in_bbox
+from app.services.geometry import ZoneShape
+from app.services.zone_index import IndexedZone, ZoneGridIndex
+
+INDIA_BBOX = (68.0, 8.0, 97.0, 35.0)  # min_lng, min_lat, max_lng, max_lat
+ZONE_COUNTS = [100, 1_000, 10_000, 50_000]
+QUERIES = 20_000
+
+
+def _random_zones(count: int, rng: random.Random) -> list[IndexedZone]:
+    min_lng, min_lat, max_lng, max_lat = INDIA_BBOX
+    zones = []
+    for zone_id in range(1, count + 1):
+        lng = rng.uniform(min_lng, max_lng)
+        lat = rng.uniform(min_lat, max_lat)
+        width = rng.uniform(0.002, 0.05)
+        height = rng.uniform(0.002, 0.05)
+        zones.append(
+            IndexedZone(
+                id=zone_id,
+                name=f"zone-{zone_id}",
+                risk_level="high",
+                shape=ZoneShape((lng, lat, lng + width, lat + height)),
+            )
+        )
+    return zones
+
+
+def _random_points(count: int, rng: random.Random) -> list[tuple[float, float]]:
+    min_lng, min_lat, max_lng, max_lat = INDIA_BBOX
+    return [(rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)) for _ in range(count)]
+
+
+def main() -> None:
+    rng = random.Random(42)
+    points = _random_points(QUERIES, rng)
+
+    print(f"{'zones':>8} {'build ms':>10} {'grid us/fix':>12} {'linear us/fix':>14}")
+    for count in ZONE_COUNTS:
+        zones = _random_zones(count, rng)
+
+        started = perf_counter()
+        index = ZoneGridIndex(zones)
+        build_ms = (perf_counter() - started) * 1000
+
+        started = perf_counter()
+        for lat, lng in points:
+            index.query(lat, lng)
+        grid_us = (perf_counter() - started) / len(points) * 1e6
+
+        geoms = [{"bbox": list(zone.bbox)} for zone in zones]
+        sample = points[:200]
+        started = perf_counter()
+        for lat, lng in sample:
+            for geom in geoms:
+                _point_in_bbox(lat, lng, geom)
+        linear_us = (perf_counter() - started) / len(sample) * 1e6
+
+        print(f"{count:>8} {build_ms:>10.1f} {grid_us:>12.2f} {linear_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Minimal keep-alive HTTP server that stands in for SMS / email / webhook providers.
+
+Every request is answered with ``200 {}`` after a simulated provider delay
+(``--latency-ms`` plus up to ``--jitter-ms``). It counts requests and TCP
+connections so benchmarks can show whether clients reuse connections.
+
+Run from the project root (india-tour-safety-api) and point the API at it:
+
+    python -m benchmarks.stub_provider --port 9100 --latency-ms 80
+    SAFETY_DISPATCH_ENABLED=true SAFETY_DISPATCH_STUB_URL=http://127.0.0.1:9100/notify uvicorn app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import threading
+from typing import Optional
+
+_RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}"
+
+
+class StubProvider:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50.0, jitter_ms: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self.connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                await asyncio.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+                writer.write(_RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start_in_thread(self) -> "StubProvider":
+        """Serve from a daemon thread (for benchmarks); returns once the port is bound."""
+
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="stub-provider", daemon=True).start()
+        ready.wait()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubProvider(args.host, args.port, args.latency_ms, args.jitter_ms)
+
+    async def run() -> None:
+        await stub.serve()
+        print(  # noqa: T201
+            f"[STUB] Listening on {stub.url} ({args.latency_ms:g} ms + up to {args.jitter_ms:g} ms)", flush=True
+        )
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
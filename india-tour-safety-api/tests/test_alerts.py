@@ -0,0 +1,273 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.db import Base
+from app.deps import CurrentUser
+from app.jobs.rebuild_alert_rollups import rebuild_alert_rollups
+from app.routers.alerts import NEXT_CURSOR_HEADER, alert_stats, bulk_update_alerts, decode_alert_cursor, list_alerts
+from app.services.alert_feed import AlertFeed
+from app.services.alert_rollups import apply_rollup_deltas
+
+
+ADMIN = CurrentUser(user_id="admin-1", role="admin")
+
+
+@pytest.fixture()
+def db(tmp_path):  # noqa: ANN001, ANN201
+    engine = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _list(db, **params):  # noqa: ANN001, ANN003, ANN202
+    response = Response()
+    query = {"status_filter": None, "type_filter": None, "severity_filter": None, "tourist_id_code": None}
+    query.update({"cursor": None, "offset": 0, "limit": 50, **params})
+    alerts = list_alerts(response=response, db=db, user=ADMIN, **query)
+    return alerts, response.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_list_alerts_keyset_pages_cover_every_alert_once(db) -> None:  # noqa: ANN001
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(1, 8):
+        db.add(
+            models.SafetyAlert(
+                id=i,
+                type="panic",
+                severity="critical",
+                status="new" if i % 2 else "resolved",
+                title=f"alert {i}",
+                # pairs share a timestamp so the id tie-breaker matters
+                triggered_at=t0 + timedelta(minutes=i // 2),
+            )
+        )
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = _list(db, cursor=cursor, limit=3)
+        seen.extend(alert.id for alert in page)
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+    page, cursor = _list(db, status_filter="new", limit=2)
+    assert [a.id for a in page] == [7, 5]
+    assert decode_alert_cursor(cursor) == (t0 + timedelta(minutes=2), 5)
+    page, cursor = _list(db, status_filter="new", limit=2, cursor=cursor)
+    assert [a.id for a in page] == [3, 1] and cursor is not None
+    assert _list(db, status_filter="new", limit=2, cursor=cursor) == ([], None)
+
+    # Offset mode still works for small result sets
+    assert [a.id for a in _list(db, offset=5)[0]] == [2, 1]
+
+
+def test_list_alerts_rejects_bad_cursor_and_mixed_modes(db) -> None:  # noqa: ANN001
+    with pytest.raises(HTTPException) as exc:
+        _list(db, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException):
+        _list(db, cursor="WyIyMDI2LTAxLTAxVDEyOjAwOjAwIiwxXQ", offset=10)
+
+
+def _alert(alert_id: int, status: str = "new") -> models.SafetyAlert:
+    return models.SafetyAlert(
+        id=alert_id, type="panic", severity="critical", status=status, title="Panic", triggered_at=datetime(2026, 1, 1)
+    )
+
+
+def test_alert_feed_fans_out_across_threads_and_resumes() -> None:
+    feed = AlertFeed(history=3, subscriber_buffer=2)
+
+    async def scenario() -> None:
+        live = feed.subscribe()
+        publisher = threading.Thread(target=feed.publish, args=("alert_created", _alert(1)))
+        publisher.start()
+        publisher.join()
+        event_id, event, payload = await asyncio.wait_for(live.get(), timeout=1)
+        assert (event, payload["id"]) == ("alert_created", 1)
+        feed.unsubscribe(live)
+
+        feed.publish("alert_updated", _alert(1, "acknowledged"))
+        feed.publish("alert_created", _alert(2))
+        resumed = feed.subscribe(event_id)
+        assert [(await resumed.get())[1] for _ in range(2)] == ["alert_updated", "alert_created"]
+        feed.unsubscribe(resumed)
+
+        # Older than the history (or from another process): ask the client to reload
+        for stale in ("0000-1", f"{feed.epoch}-0"):
+            feed.publish("alert_created", _alert(3))
+            gap = feed.subscribe(stale)
+            assert (await gap.get())[1] == "reset"
+            feed.unsubscribe(gap)
+
+        # A gap longer than the subscriber buffer is still replayed in full
+        last_id = feed.publish("alert_created", _alert(4))
+        for _ in range(3):
+            feed.publish("alert_updated", _alert(4, "acknowledged"))
+        behind = feed.subscribe(last_id)
+        assert [(await behind.get())[1] for _ in range(3)] == ["alert_updated"] * 3
+        assert not behind.overflowed
+        feed.unsubscribe(behind)
+
+        slow = feed.subscribe()
+        for i in range(3):
+            feed.publish("alert_created", _alert(10 + i))
+        await asyncio.sleep(0)
+        assert slow.overflowed
+        feed.unsubscribe(slow)
+        assert feed.stats()["overflow_disconnects_total"] == 1
+
+    asyncio.run(scenario())
+
+
+def _rollups(db):  # noqa: ANN001, ANN202
+    r = models.SafetyAlertRollup
+    rows = db.query(r.bucket_start, r.severity, r.type, r.status, r.city, r.count).filter(r.count != 0)
+    return sorted(tuple(row) for row in rows)
+
+
+def test_alert_rollups_follow_inserts_status_changes_and_deletes(db) -> None:  # noqa: ANN001
+    t0 = datetime(2026, 3, 1, 9, 15)
+    db.add_all(
+        [
+            models.SafetyAlert(
+                id=1,
+                type="geofence_breach",
+                severity="high",
+                title="Zone",
+                triggered_at=t0,
+                extra_data={"zone_city": "Jaipur"},
+            ),
+            models.SafetyAlert(
+                id=2, type="panic", severity="critical", title="Panic", triggered_at=t0 + timedelta(minutes=30)
+            ),
+            models.SafetyAlert(
+                id=3,
+                type="panic",
+                severity="critical",
+                title="Panic",
+                triggered_at=t0 + timedelta(hours=1),
+                extra_data={"city": "Goa"},
+            ),
+        ]
+    )
+    db.commit()
+    h9, h10 = datetime(2026, 3, 1, 9), datetime(2026, 3, 1, 10)
+    assert _rollups(db) == [
+        (h9, "critical", "panic", "new", "", 1),
+        (h9, "high", "geofence_breach", "new", "Jaipur", 1),
+        (h10, "critical", "panic", "new", "Goa", 1),
+    ]
+
+    panic = db.get(models.SafetyAlert, 2)
+    panic.status = "resolved"
+    panic.resolved_by = "admin-1"  # untracked columns do not move counts
+    db.commit()
+    db.delete(db.get(models.SafetyAlert, 1))
+    db.flush()
+    db.rollback()  # rolled back together with the alert change
+    db.delete(db.get(models.SafetyAlert, 3))
+    db.commit()
+    assert _rollups(db) == [
+        (h9, "critical", "panic", "resolved", "", 1),
+        (h9, "high", "geofence_breach", "new", "Jaipur", 1),
+    ]
+
+    # Counts written by hand (bulk updates) and a full rebuild agree
+    apply_rollup_deltas(db.connection(), {(h9, "high", "geofence_breach", "new", "Jaipur"): 1})
+    db.commit()
+    assert rebuild_alert_rollups(db) == {"alerts": 2, "rollups": 2}
+    assert _rollups(db)[1][-1] == 1
+
+
+def test_alert_stats_buckets_and_totals(db) -> None:  # noqa: ANN001
+    t0 = datetime(2026, 3, 1, 22, 10)
+    for i, (severity, status, city) in enumerate(
+        [("critical", "new", "Goa"), ("critical", "resolved", "Goa"), ("high", "new", ""), ("medium", "new", "Goa")]
+    ):
+        db.add(
+            models.SafetyAlert(
+                id=i + 1,
+                type="panic" if severity == "critical" else "geofence_breach",
+                severity=severity,
+                status=status,
+                title="a",
+                triggered_at=t0 + timedelta(hours=i),
+                extra_data={"city": city},
+            )
+        )
+    db.commit()
+
+    kwargs = {"severity_filter": None, "type_filter": None, "status_filter": None, "city": None}
+    kwargs.update(db=db, user=ADMIN)
+    stats = alert_stats(since=datetime(2026, 3, 1), until=datetime(2026, 3, 3), bucket="hour", **kwargs)
+    assert stats.total == 4
+    assert stats.by_severity == {"critical": 2, "high": 1, "medium": 1}
+    assert stats.by_city == {"Goa": 3, "": 1}
+    assert [b.bucket_start.hour for b in stats.buckets] == [22, 23, 0, 1]
+
+    daily = alert_stats(since=datetime(2026, 3, 1), until=datetime(2026, 3, 3), bucket="day", **kwargs)
+    assert [(b.bucket_start.day, b.total, b.by_status) for b in daily.buckets] == [
+        (1, 2, {"new": 1, "resolved": 1}),
+        (2, 2, {"new": 2}),
+    ]
+
+    kwargs.update(status_filter="new", city="Goa")
+    filtered = alert_stats(since=datetime(2026, 3, 1, 23, 30), until=datetime(2026, 3, 3), bucket="hour", **kwargs)
+    assert filtered.since == datetime(2026, 3, 1, 23)
+    assert (filtered.total, filtered.by_type) == (1, {"geofence_breach": 1})
+
+    with pytest.raises(HTTPException):
+        alert_stats(since=datetime(2026, 3, 3), until=datetime(2026, 3, 1), bucket="hour", **kwargs)
+
+
+def _bulk(db, **body):  # noqa: ANN001, ANN003, ANN202
+    response = bulk_update_alerts(schemas.AlertBulkRequest(**body), db=db, user=ADMIN)
+
+    async def read() -> str:
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    summary, *alerts = (json.loads(line) for line in asyncio.run(read()).splitlines())
+    return summary, [(a["id"], a["status"], a["resolved_by"]) for a in alerts]
+
+
+def test_bulk_alert_actions_update_matching_rows_and_rollups(db) -> None:  # noqa: ANN001
+    t0 = datetime(2026, 3, 1, 9)
+    seed = [("geofence_breach", "new"), ("geofence_breach", "acknowledged"), ("geofence_breach", "resolved"), ("panic", "new")]
+    for i, (alert_type, status) in enumerate(seed, start=1):
+        db.add(
+            models.SafetyAlert(id=i, type=alert_type, severity="high", status=status, title="a", triggered_at=t0)
+        )
+    db.commit()
+
+    summary, alerts = _bulk(db, action="acknowledge", ids=[1, 2, 3, 99])
+    assert summary == {"action": "acknowledge", "updated": 1, "skipped": 3}
+    assert alerts == [(1, "acknowledged", None)]
+
+    summary, alerts = _bulk(db, action="resolve", filter={"type": "geofence_breach"})
+    assert summary == {"action": "resolve", "updated": 2, "skipped": None}
+    assert alerts == [(1, "resolved", "admin-1"), (2, "resolved", "admin-1")]
+
+    db.expire_all()
+    assert db.get(models.SafetyAlert, 4).status == "new"
+    assert [(row[2], row[3], row[5]) for row in _rollups(db)] == [
+        ("geofence_breach", "resolved", 3),
+        ("panic", "new", 1),
+    ]
+
+    with pytest.raises(ValueError):
+        schemas.AlertBulkRequest(action="resolve", filter={})
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import deps
+from app.core.config import settings
+from app.core.token_cache import VerifiedTokenCache, token_key, verified_tokens
+
+SECRET = "test-secret"
+
+
+@pytest.fixture()
+def jwt_settings(monkeypatch):  # noqa: ANN001, ANN201
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(settings, "SUPABASE_JWT_AUDIENCE", None)
+    monkeypatch.setattr(settings, "SUPABASE_JWT_ISSUER", None)
+    verified_tokens.clear()
+    yield
+    verified_tokens.clear()
+
+
+def test_verified_tokens_are_reused_until_they_expire(jwt_settings, monkeypatch) -> None:  # noqa: ANN001
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(deps.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    token = jwt.encode({"sub": "user-1", "role": "tourist", "exp": int(time.time()) + 3600}, SECRET)
+    for _ in range(3):
+        user = deps.authenticate_token(token)
+        assert (user.id, user.role) == ("user-1", "tourist")
+    assert len(decodes) == 1
+
+    # Rejected tokens are verified (and rejected) every time
+    forged = jwt.encode({"sub": "admin"}, "other-secret")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            deps.authenticate_token(forged)
+        assert exc.value.status_code == 401
+    assert len(decodes) == 3
+    assert verified_tokens.stats()["entries"] == 1
+
+
+def test_cache_entries_honour_exp_and_the_size_bound() -> None:
+    cache = VerifiedTokenCache(max_entries=2, max_ttl_seconds=300.0)
+    now = 1_000_000.0
+    cache.put(token_key("a"), ("a", "tourist"), exp=now + 10, now=now)
+    assert cache.get(token_key("a"), now=now + 9) == ("a", "tourist")
+    assert cache.get(token_key("a"), now=now + 10) is None
+
+    cache.put(token_key("b"), ("b", "tourist"), exp=None, now=now)  # no exp: kept for max_ttl
+    assert cache.get(token_key("b"), now=now + 299) is not None
+    assert cache.get(token_key("b"), now=now + 301) is None
+
+    for name in "cde":
+        cache.put(token_key(name), (name, "tourist"), exp=now + 60, now=now)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(token_key("c"), now=now) is None
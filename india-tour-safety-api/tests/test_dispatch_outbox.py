@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.dispatch_outbox import DispatchOutbox
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = datetime(2026, 5, 1, 12, 0, 0)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture()
+def session_factory(tmp_path):  # noqa: ANN001, ANN201
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _row(session_factory, row_id: int):  # noqa: ANN001, ANN202
+    db = session_factory()
+    try:
+        return db.get(models.DispatchOutbox, row_id)
+    finally:
+        db.close()
+
+
+def test_outbox_row_commits_with_alert_and_retries_until_delivered(session_factory) -> None:  # noqa: ANN001
+    clock = _Clock()
+    outbox = DispatchOutbox(session_factory, max_attempts=3, backoff_seconds=10, clock=clock)
+    calls = []
+
+    def flaky(item) -> None:  # noqa: ANN001
+        calls.append((item.alert_id, item.attempts, item.payload["phone"]))
+        if len(calls) < 3:
+            raise ConnectionError("gateway timeout")
+
+    outbox.register("panic_alert", flaky)
+
+    db = session_factory()
+    alert = models.SafetyAlert(id=1, type="panic", severity="critical", title="Panic", triggered_at=clock.now)
+    db.add(alert)
+    outbox.enqueue(db, "panic_alert", {"phone": "+91999"}, alert=alert)
+    db.rollback()  # nothing is dispatched for an alert that was never committed
+    assert outbox.run_once() == 0
+
+    db.add(alert)
+    row = outbox.enqueue(db, "panic_alert", {"phone": "+91999"}, alert=alert)
+    db.commit()
+    row_id = row.id
+    db.close()
+
+    assert outbox.run_once() == 1
+    failed = _row(session_factory, row_id)
+    assert (failed.status, failed.attempts, failed.last_error) == ("pending", 1, "ConnectionError: gateway timeout")
+    assert clock.now + timedelta(seconds=5) <= failed.next_attempt_at <= clock.now + timedelta(seconds=10)
+
+    assert outbox.run_once() == 0  # backing off
+    clock.now += timedelta(seconds=10)
+    assert outbox.run_once() == 1  # second failure, now waits 10-20 s
+    clock.now += timedelta(seconds=20)
+    assert outbox.run_once() == 1
+
+    sent = _row(session_factory, row_id)
+    assert (sent.status, sent.attempts, sent.last_error, sent.sent_at) == ("sent", 3, None, clock.now)
+    assert calls == [(1, 1, "+91999"), (1, 2, "+91999"), (1, 3, "+91999")]
+    assert outbox.stats() == {"workers": 0, "sent_total": 1, "retried_total": 2, "dead_total": 0}
+
+
+def test_outbox_dead_letters_and_reclaims_expired_leases(session_factory) -> None:  # noqa: ANN001
+    clock = _Clock()
+    outbox = DispatchOutbox(session_factory, max_attempts=1, lease_seconds=60, clock=clock)
+    outbox.register("always_fails", lambda item: 1 / 0)
+
+    db = session_factory()
+    failing = outbox.enqueue(db, "always_fails", {})
+    unknown = outbox.enqueue(db, "unknown_kind", {})
+    orphan = outbox.enqueue(db, "always_fails", {})
+    db.commit()
+    ids = failing.id, unknown.id, orphan.id
+
+    # A worker that claimed a row and died: the row comes back once the lease runs out
+    claimed = outbox._claim()
+    assert [item.id for item in claimed] == list(ids)
+    assert outbox.run_once() == 0
+    clock.now += timedelta(seconds=61)
+    assert outbox.run_once() == 3
+
+    for row_id in ids:
+        assert _row(session_factory, row_id).status == "dead"
+    assert "No handler" in _row(session_factory, unknown.id).last_error
+
+    assert outbox.requeue_dead(db) == 3
+    assert _row(session_factory, failing.id).status == "pending"
+    db.close()
@@ -0,0 +1,245 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.routers.locations import list_risk_zones
+from app.schemas import RiskZoneCreate
+from app.services.alert_dedup import RecentAlertCache
+from app.services.geometry import GeofenceEngine, ZoneShape, parse_zone_geometry
+from app.services.zone_codec import ZoneRecordCache, decode_document, encode_document, encode_zone, encode_zone_query
+from app.services.zone_index import IndexedZone, ZoneGridIndex, zone_bbox
+from app.services.zone_versions import current_zone_generation, etag_matches
+
+
+def _zone(zone_id: int, bbox: tuple[float, float, float, float]) -> IndexedZone:
+    return IndexedZone(id=zone_id, name=f"zone-{zone_id}", risk_level="high", shape=ZoneShape(bbox))
+
+
+# L-shaped market lane with a courtyard hole, plus a separate riverbank strip
+L_SHAPE = [[0.0, 0.0], [4.0, 0.0], [4.0, 1.0], [1.0, 1.0], [1.0, 4.0], [0.0, 4.0], [0.0, 0.0]]
+HOLE = [[0.2, 0.2], [0.8, 0.2], [0.8, 0.8], [0.2, 0.8], [0.2, 0.2]]
+STRIP = [[10.0, 10.0], [11.0, 10.0], [11.0, 10.5], [10.0, 10.5]]  # left open on purpose
+
+
+def test_zone_bbox_rejects_malformed_geom() -> None:
+    assert zone_bbox({"bbox": [77.0, 28.0, 77.1, 28.1]}) == (77.0, 28.0, 77.1, 28.1)
+    assert zone_bbox({"bbox": [77.0, 28.0]}) is None
+    assert zone_bbox({"bbox": ["a", "b", "c", "d"]}) is None
+    assert zone_bbox(None) is None
+
+
+def test_zone_grid_index_returns_only_containing_zones() -> None:
+    index = ZoneGridIndex(
+        [
+            _zone(1, (77.20, 28.60, 77.25, 28.65)),  # New Delhi
+            _zone(2, (72.80, 18.90, 72.85, 18.95)),  # Mumbai
+            _zone(3, (77.00, 28.50, 77.30, 28.70)),  # spans several cells around zone 1
+        ],
+        cell_size_deg=0.05,
+    )
+
+    assert [zone.id for zone in index.query(28.62, 77.22)] == [1, 3]
+    assert [zone.id for zone in index.query(28.55, 77.05)] == [3]
+    assert [zone.id for zone in index.query(18.92, 72.82)] == [2]
+    assert index.query(12.97, 77.59) == []  # Bengaluru: no zones
+
+
+def test_zone_grid_index_keeps_oversized_zones_out_of_the_grid() -> None:
+    state_wide = _zone(1, (68.0, 8.0, 97.0, 35.0))
+    index = ZoneGridIndex([state_wide], cell_size_deg=0.05, max_cells_per_zone=100)
+
+    assert index._cells == {}
+    assert [zone.id for zone in index.query(20.0, 80.0)] == [1]
+    assert index.query(40.0, 80.0) == []
+
+
+def test_parse_zone_geometry_polygon_and_multipolygon() -> None:
+    polygon = parse_zone_geometry({"type": "Polygon", "coordinates": [L_SHAPE, HOLE]})
+    assert polygon.bbox == (0.0, 0.0, 4.0, 4.0)
+    assert len(polygon.rings) == 2
+
+    multi = parse_zone_geometry(
+        {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [[L_SHAPE], [STRIP]]}}
+    )
+    assert multi.bbox == (0.0, 0.0, 11.0, 10.5)
+    assert multi.rings[1][0].tolist() == multi.rings[1][-1].tolist()  # ring closed
+
+    with pytest.raises(ValueError):
+        parse_zone_geometry({"type": "LineString", "coordinates": [[0, 0], [1, 1]]})
+    with pytest.raises(ValueError):
+        parse_zone_geometry({"type": "Polygon", "coordinates": [[[0, 0], [1, 1]]]})
+
+
+def test_geofence_engine_batch_matches_polygon_semantics() -> None:
+    engine = GeofenceEngine(
+        [
+            parse_zone_geometry({"type": "Polygon", "coordinates": [L_SHAPE, HOLE]}),
+            parse_zone_geometry({"type": "MultiPolygon", "coordinates": [[L_SHAPE], [STRIP]]}),
+            parse_zone_geometry({"bbox": [0.0, 0.0, 4.0, 4.0]}),
+        ]
+    )
+    # (lat, lng): inside the L arm, in the hole, in the L's empty corner, on the strip, far away
+    lats = [3.0, 0.5, 3.0, 10.2, 50.0]
+    lngs = [0.5, 0.5, 3.0, 10.5, 50.0]
+
+    inside = engine.contains(lats, lngs)
+
+    assert inside.shape == (5, 3)
+    assert inside[:, 0].tolist() == [True, False, False, False, False]
+    assert inside[:, 1].tolist() == [True, True, False, True, False]
+    assert inside[:, 2].tolist() == [True, True, True, False, False]
+    assert engine.contains(lats, lngs, zones=[2, 0]).tolist() == inside[:, [2, 0]].tolist()
+
+
+def test_zone_grid_index_uses_polygon_not_bbox() -> None:
+    shape = parse_zone_geometry({"type": "Polygon", "coordinates": [L_SHAPE]})
+    index = ZoneGridIndex([IndexedZone(id=7, name="lane", risk_level="high", shape=shape)], cell_size_deg=1.0)
+
+    assert [zone.id for zone in index.query(3.0, 0.5)] == [7]
+    assert index.query(3.0, 3.0) == []  # inside the bbox, outside the lane
+    assert [[zone.id for zone in hits] for hits in index.query_many([3.0, 3.0], [0.5, 3.0])] == [[7], []]
+
+
+def test_risk_zone_create_adds_bbox_to_polygon_geom() -> None:
+    body = RiskZoneCreate(
+        name="Ghat steps",
+        risk_level="high",
+        geom={"type": "Polygon", "coordinates": [L_SHAPE]},
+    )
+    assert body.geom["bbox"] == [0.0, 0.0, 4.0, 4.0]
+
+    with pytest.raises(ValueError):
+        RiskZoneCreate(name="bad", risk_level="high", geom={"bbox": [1, 2, 3]})
+
+
+def test_recent_alert_cache_expires_and_discards() -> None:
+    cache = RecentAlertCache(timedelta(minutes=5), max_entries=2)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+
+    cache.record(1, 10, now - timedelta(minutes=1))
+    cache.record(1, 11, now - timedelta(minutes=6))
+    assert cache.alerted_zones(1, [10, 11, 12], now) == {10}
+    assert len(cache) == 1  # the expired entry was dropped on lookup
+
+    cache.discard(1, 10)  # e.g. the alert was resolved
+    assert cache.alerted_zones(1, [10], now) == set()
+
+    for zone_id in (20, 21, 22):
+        cache.record(2, zone_id, now)
+    assert len(cache) == 2
+    assert cache.alerted_zones(2, [20, 21, 22], now) == {21, 22}
+
+
+def test_zone_downloads_revalidate_by_generation_and_sync_deltas(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'zones.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    def get(etag=None, since=None):  # noqa: ANN001, ANN202
+        headers = [(b"if-none-match", etag.encode())] if etag else []
+        request = Request({"type": "http", "method": "GET", "path": "/api/locations/zones", "headers": headers})
+        response = Response()
+        body = list_risk_zones(request=request, response=response, since=since, db=db)
+        return body, response.headers.get("etag")
+
+    zones, etag = get()
+    assert zones == [] and current_zone_generation(db) == 0
+    assert get(etag)[0].status_code == 304
+
+    db.add(models.RiskZone(id=1, name="Ghat", risk_level="high", geom={"bbox": [0, 0, 1, 1]}))
+    db.add(models.RiskZone(id=2, name="Fort", risk_level="low", geom={"bbox": [2, 2, 3, 3]}))
+    db.commit()
+    assert current_zone_generation(db) == 1  # one flush, one bump
+    zones, etag = get(etag)
+    assert sorted(zone.id for zone in zones) == [1, 2]
+    assert get(etag)[0].status_code == 304
+
+    cursor = max(zone.updated_at for zone in zones)
+    delta, delta_etag = get(since=cursor)
+    assert sorted(z.id for z in delta.zones) == [1, 2]  # still inside the overlap window
+    assert (delta.removed, delta.cursor) == ([], cursor)
+
+    # Stamped before the cursor but committed after it: the overlap picks it up
+    db.add(models.RiskZone(id=3, name="Ferry", risk_level="low", geom={"bbox": [4, 4, 5, 5]}))
+    db.flush()
+    db.get(models.RiskZone, 3).updated_at = cursor - timedelta(seconds=1)
+    db.commit()
+    delta, delta_etag = get(since=cursor)
+    assert 3 in [z.id for z in delta.zones] and delta.cursor == cursor
+
+    zone = db.get(models.RiskZone, 2)
+    zone.is_active = False
+    db.commit()
+    db.get(models.RiskZone, 1).name = "Ghat steps"
+    db.commit()
+    assert current_zone_generation(db) == 5
+
+    delta, _ = get(delta_etag, since=cursor)
+    assert [z.name for z in delta.zones] == ["Ferry", "Ghat steps"] and delta.removed == [2]
+    assert delta.cursor > cursor
+    db.close()
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard() -> None:
+    assert etag_matches('"a", W/"zones-1-x"', '"zones-1-x"')
+    assert etag_matches("*", '"zones-1-x"')
+    assert not etag_matches('"zones-0-x"', '"zones-1-x"')
+    assert not etag_matches(None, '"zones-1-x"')
+
+
+def test_zone_codec_round_trips_geometries_and_deltas(tmp_path, monkeypatch) -> None:  # noqa: ANN001
+    from app.services import zone_codec
+
+    stamp = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    shapes = {
+        1: {"type": "Polygon", "coordinates": [L_SHAPE, HOLE], "bbox": [0.0, 0.0, 4.0, 4.0]},
+        2: {"type": "MultiPolygon", "coordinates": [[L_SHAPE], [STRIP]], "bbox": [0.0, 0.0, 11.0, 10.5]},
+        3: {"bbox": [77.2090123, 28.6139456, 77.3, 28.7]},
+        4: {"type": "Point", "coordinates": [77.2, 28.6]},  # not a zone shape: shipped as JSON text
+        5: {"type": "Polygon", "coordinates": [L_SHAPE], "bbox": [0.0, 0.0, 0.0, 4.0, 4.0, 120.0]},  # 3D: JSON
+    }
+    zones = [
+        models.RiskZone(
+            id=zone_id,
+            name=f"Zone {zone_id}",
+            description="Ghāṭ" if zone_id == 1 else None,
+            risk_level="high",
+            city="Varanasi",
+            geom=geom,
+            is_active=zone_id != 4,
+            created_at=stamp,
+            updated_at=stamp,
+        )
+        for zone_id, geom in shapes.items()
+    ]
+
+    document = decode_document(encode_document([encode_zone(zone) for zone in zones]))
+    assert "cursor" not in document
+    decoded = {zone["id"]: zone for zone in document["zones"]}
+    assert decoded[1]["description"] == "Ghāṭ" and decoded[2]["description"] is None
+    assert decoded[1]["updated_at"] == stamp and decoded[4]["is_active"] is False
+    for zone_id in (1, 2, 4, 5):
+        assert decoded[zone_id]["geom"] == shapes[zone_id]
+    assert decoded[3]["geom"]["bbox"] == pytest.approx(shapes[3]["bbox"], abs=1e-6)
+
+    delta = decode_document(encode_document([], cursor=stamp, removed=[9, 4, 120]))
+    assert (delta["cursor"], delta["removed"], delta["zones"]) == (stamp, [4, 9, 120], [])
+
+    # Records are built once per zone version
+    monkeypatch.setattr(zone_codec, "zone_records", ZoneRecordCache())
+    engine = create_engine(f"sqlite:///{tmp_path / 'codec.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(zones)
+    db.commit()
+    query = db.query(models.RiskZone).order_by(models.RiskZone.id)
+    first = encode_zone_query(db, query)
+    assert encode_zone_query(db, query) == first
+    assert zone_codec.zone_records.stats()["misses_total"] == 5
+    assert zone_codec.zone_records.stats()["hits_total"] == 5
+    db.close()
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services import heatmap
+from app.services.heatmap import (
+    HeatmapCache,
+    HeatmapService,
+    bin_points,
+    sparse_cells,
+    tile_bounds,
+    track_location_writes,
+)
+from app.services.location_partitions import location_partitions
+
+
+def test_bin_points_matches_deeper_tiles() -> None:
+    # z=4 tile 11/6 covers northern India; its 4x4 grid cells are the z=6 tiles
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(4, 11, 6)
+    assert (min_lng, max_lng) == (67.5, 90.0)
+
+    lats = [28.6139, 28.6140, 26.9124, 19.0760, max_lat - 1e-9]
+    lngs = [77.2090, 77.2091, 75.7873, 72.8777, min_lng]
+    cells, counts = bin_points(lats, lngs, 4, 11, 6, 4)
+    dense = np.zeros(16, dtype=np.int64)
+    dense[cells] = counts
+    # Delhi x2 in z=6 tile 45/26, Jaipur just south in 45/27; Mumbai is outside; the corner is cell (0, 0)
+    assert sparse_cells(dense, 4) == [[0, 0, 1], [1, 2, 2], [1, 3, 1]]
+    lng_w, lat_s, lng_e, lat_n = tile_bounds(6, 45, 26)
+    assert lng_w <= 77.2090 < lng_e and lat_s <= 28.6139 < lat_n
+
+
+def test_heatmap_caches_hours_and_invalidates_on_new_alerts(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'heatmap.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime(2026, 5, 1, 12, 30)
+
+    def add_alert(alert_id: int, triggered_at: datetime, alert_type: str = "panic") -> None:
+        db.add(
+            models.SafetyAlert(
+                id=alert_id,
+                type=alert_type,
+                severity="critical",
+                title="a",
+                lat=28.6139,
+                lng=77.2090,
+                triggered_at=triggered_at,
+            )
+        )
+        db.commit()
+
+    add_alert(1, now - timedelta(hours=3))
+    add_alert(2, now - timedelta(minutes=10))
+    add_alert(3, now - timedelta(minutes=5), alert_type="inactivity")
+
+    service = HeatmapService(HeatmapCache(max_entries=100))
+    since = now - timedelta(hours=6)
+
+    def total() -> int:
+        counts = service.tile_counts(db, "alerts", 4, 11, 6, since, now, 64, ["panic"], now=now)
+        return int(counts.sum())
+
+    assert total() == 2
+    assert service.cache.stats()["misses_total"] == 7  # 06:00 .. 12:00, loaded with one query
+    assert total() == 2
+    assert service.cache.stats()["hits_total"] == 7
+
+    add_alert(4, now - timedelta(minutes=1))
+    # Only the open hour's entry for this tile is dropped; past hours stay cached
+    service.on_alert_event("alert_created", {"lat": 28.6139, "lng": 77.2090, "triggered_at": now.isoformat()})
+    assert service.cache.stats()["invalidated_total"] == 1
+    assert total() == 3
+    assert service.cache.stats()["misses_total"] == 8
+
+    # Alerts elsewhere leave this tile alone
+    service.invalidate_alert(19.0760, 72.8777, now)
+    assert service.cache.stats()["invalidated_total"] == 1
+    db.close()
+
+
+def test_late_location_fixes_refresh_their_closed_hour(tmp_path, monkeypatch) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'heatmap.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+    service = HeatmapService(HeatmapCache(max_entries=100, location_ttl_seconds=3600))
+    monkeypatch.setattr(heatmap, "heatmaps", service)
+
+    def fix(recorded_at: datetime) -> dict:
+        return {
+            "tourist_profile_id": 1,
+            "tourist_id_code": "TR-000001",
+            "lat": 28.6139,
+            "lng": 77.2090,
+            "source": "offline",
+            "recorded_at": recorded_at,
+        }
+
+    def upload(recorded_at: datetime) -> None:
+        row = fix(recorded_at)
+        location_partitions.insert(db, [row])
+        track_location_writes(db, [row])
+        db.commit()
+
+    def total() -> int:
+        counts = service.tile_counts(db, "locations", 4, 11, 6, now - timedelta(hours=6), now, 64, now=now)
+        return int(counts.sum())
+
+    upload(now - timedelta(hours=3))
+    assert total() == 1
+
+    # An offline upload three hours late drops that hour's entry once committed
+    upload(now - timedelta(hours=3, minutes=5))
+    assert service.cache.stats()["invalidated_total"] == 1
+    assert total() == 2
+
+    # A rolled back write forgets its rows; fixes in the open hour are left to its TTL
+    track_location_writes(db, [fix(now - timedelta(hours=2))])
+    db.rollback()
+    upload(now - timedelta(minutes=1))
+    assert service.cache.stats()["invalidated_total"] == 1
+
+    # Closed location hours also expire after their TTL
+    service.cache.location_ttl = 0.0
+    service.cache.clear()
+    total()
+    misses = service.cache.stats()["misses_total"]
+    total()
+    assert service.cache.stats()["misses_total"] == misses + 6
+    db.close()
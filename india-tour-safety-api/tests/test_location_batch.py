@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.db import Base
+from app.deps import CurrentUser
+from app.routers.locations import ingest_location_batch
+from app.services import location_rules
+from app.services.zone_index import build_zone_index
+
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def test_normalize_recorded_at_converts_offsets_to_utc() -> None:
+    assert location_rules.normalize_recorded_at(datetime(2026, 1, 1, 17, 30, tzinfo=IST)) == datetime(2026, 1, 1, 12, 0)
+    assert location_rules.normalize_recorded_at(datetime(2026, 1, 1, 12, 0)) == datetime(2026, 1, 1, 12, 0)
+    assert location_rules.normalize_recorded_at(None).tzinfo is None
+
+
+def test_ingest_fixes_sorts_the_batch_and_alerts_once(tmp_path, monkeypatch) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    Base.metadata.create_all(engine)
+    # Alerts are only added to the session here (the caller commits them), so keep them unflushed
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add_all(
+        [
+            models.RiskZone(id=1, name="Ghat", risk_level="high", geom={"bbox": [77.0, 28.0, 77.1, 28.1]}),
+            models.RiskZone(id=2, name="Fort", risk_level="medium", geom={"bbox": [77.2, 28.0, 77.3, 28.1]}),
+            models.RiskZone(id=3, name="Park", risk_level="low", geom={"bbox": [77.4, 28.0, 77.5, 28.1]}),
+        ]
+    )
+    db.commit()
+    monkeypatch.setattr(location_rules, "get_zone_index", build_zone_index)
+
+    profile = models.TouristProfile(id=1, tourist_id_code="TR-000001", city="Varanasi")
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+
+    def at(lat: float, lng: float, minutes: int, tz: timezone | None = None) -> schemas.LocationIn:
+        recorded_at = t0 + timedelta(minutes=minutes)
+        if tz is not None:  # the same instant, as a client in that zone sends it
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc).astimezone(tz)
+        return schemas.LocationIn(tourist_id_code="TR-000001", lat=lat, lng=lng, recorded_at=recorded_at)
+
+    batch = [
+        at(28.03, 77.05, 120),  # Ghat again
+        at(28.50, 77.05, 0, tz=IST),  # outside every zone, sent with a +05:30 offset
+        at(28.05, 77.45, 150),  # Park: low risk, no alert
+        at(28.01, 77.05, 60),  # Ghat, after a one-hour gap
+        at(28.02, 77.25, 90),  # Fort, after another gap
+        at(28.04, 77.25, 180),  # Fort again
+    ]
+    alerts = location_rules.ingest_fixes(db, profile, batch)
+
+    geofence = [alert for alert in alerts if alert.type == "geofence_breach"]
+    inactivity = [alert for alert in alerts if alert.type == "inactivity"]
+    # One alert per zone, from the first fix inside it
+    assert [(alert.extra_data["zone_id"], alert.lat) for alert in geofence] == [(1, 28.01), (2, 28.02)]
+    assert len(inactivity) == 1  # every gap is over 30 minutes, but one alert per batch
+    assert inactivity[0].lat == 28.01 and inactivity[0].extra_data["last_recorded_at"] == t0.isoformat()
+
+    stored = db.execute(select(models.TouristLocation.recorded_at).order_by(models.TouristLocation.id)).scalars()
+    assert list(stored) == [t0 + timedelta(minutes=m) for m in (0, 60, 90, 120, 150, 180)]
+    db.close()
+
+
+def test_location_batch_rejects_oversized_and_mixed_batches() -> None:
+    user = CurrentUser(user_id="user-1")
+    fix = schemas.LocationIn(tourist_id_code="TR-000001", lat=28.0, lng=77.0)
+    other = schemas.LocationIn(tourist_id_code="TR-000002", lat=28.0, lng=77.0)
+
+    for body, detail in (
+        ([], "At least one location fix is required"),
+        ([fix] * 501, "A batch may contain at most 500 location fixes"),
+        ([fix, other], "All fixes in a batch must belong to the same tourist"),
+    ):
+        with pytest.raises(HTTPException) as exc:
+            ingest_location_batch(body=body, db=None, user=user)  # type: ignore[arg-type]
+        assert (exc.value.status_code, exc.value.detail) == (400, detail)
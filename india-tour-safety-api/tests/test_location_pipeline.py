@@ -0,0 +1,297 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.db import Base
+from app.jobs.compact_tracks import track_keep_mask
+from app.jobs.location_rollups import summarize_hours
+from app.routers.locations import _parse_stream_fixes
+from app.services.geometry import douglas_peucker, haversine_m
+from app.services.last_location import get_last_location, record_last_location, stored_point
+from app.services.location_partitions import LocationPartitionRouter
+from app.services.location_writer import LocationQueueFull, LocationWriteBehind
+from app.services.nearby import NearbyIndex, NearbyService
+from app.services.thinning import select_fixes_to_store
+
+
+def test_record_last_location_ignores_out_of_order_fixes(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'last.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    profile = models.TouristProfile(id=1, tourist_id_code="TR-000001")
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    first = schemas.LocationIn(tourist_id_code="TR-000001", lat=28.0, lng=77.0)
+    record_last_location(db, profile, None, first, now, stored=(first, now))
+    db.commit()
+
+    older = schemas.LocationIn(tourist_id_code="TR-000001", lat=1.0, lng=1.0)
+    record_last_location(db, profile, get_last_location(db, profile), older, now - timedelta(minutes=1))
+    db.commit()
+    last = get_last_location(db, profile)
+    assert (last.lat, last.lng, last.recorded_at) == (28.0, 77.0, now)
+
+    newer = schemas.LocationIn(tourist_id_code="TR-000001", lat=28.5, lng=77.5, accuracy_m=12.0)
+    record_last_location(db, profile, last, newer, now + timedelta(minutes=1))
+    db.commit()
+    last = get_last_location(db, profile)
+    assert (last.lat, last.lng, last.accuracy_m, last.source) == (28.5, 77.5, 12.0, "web")
+    assert last.recorded_at == now + timedelta(minutes=1)
+    assert stored_point(last) == (28.0, 77.0, now)  # no newer stored fix
+    db.close()
+
+
+def test_concurrent_first_fixes_upsert_the_last_location(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'last.db'}")
+    Base.metadata.create_all(engine)
+    one, two = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+    profile = models.TouristProfile(id=1, tourist_id_code="TR-000001")
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    newer = schemas.LocationIn(tourist_id_code="TR-000001", lat=28.5, lng=77.5)
+    older = schemas.LocationIn(tourist_id_code="TR-000001", lat=28.0, lng=77.0)
+
+    # Both ingests find no row; the one with the newer fix commits first
+    assert get_last_location(one, profile) is None and get_last_location(two, profile) is None
+    record_last_location(one, profile, None, newer, now, stored=(newer, now))
+    one.commit()
+    record_last_location(two, profile, None, older, now - timedelta(seconds=30), stored=(older, now))
+    two.commit()
+
+    with sessionmaker(bind=engine)() as check:
+        rows = check.query(models.TouristLastLocation).all()
+        assert [(r.lat, r.lng, r.recorded_at) for r in rows] == [(28.5, 77.5, now)]
+        assert (rows[0].stored_lat, rows[0].stored_at) == (28.5, now)
+    one.close()
+    two.close()
+
+
+class _RecordingSession:
+    def __init__(self, sink: list):
+        self.sink = sink
+
+    def execute(self, statement, rows):  # noqa: ANN001
+        self.sink.append(list(rows))
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def test_write_behind_batches_applies_backpressure_and_drains() -> None:
+    flushed: list = []
+    writer = LocationWriteBehind(
+        lambda: _RecordingSession(flushed),  # type: ignore[arg-type,return-value]
+        batch_size=3,
+        flush_interval_ms=10_000,
+        max_queue=4,
+        enqueue_timeout_ms=10,
+    )
+
+    assert writer.enqueue([{"n": 0}]) is False  # not started: caller inserts synchronously
+
+    writer.start()
+    assert writer.enqueue([{"n": 1}, {"n": 2}, {"n": 3}]) is True
+
+    deadline = time.monotonic() + 5
+    while not flushed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert flushed == [[{"n": 1}, {"n": 2}, {"n": 3}]]  # a full batch flushes without waiting
+
+    with pytest.raises(LocationQueueFull):
+        writer.enqueue([{"n": i} for i in range(5)])
+
+    writer.enqueue([{"n": 4}])
+    writer.stop()  # drains the partial batch instead of waiting for the interval
+    assert flushed[-1] == [{"n": 4}]
+    stats = writer.stats()
+    assert stats["flushed_total"] == 4 and stats["depth"] == 0 and stats["rejected_total"] == 5
+
+
+def _fix(lat: float, lng: float, accuracy_m: float | None = None, source: str | None = None) -> schemas.LocationIn:
+    return schemas.LocationIn(tourist_id_code="TR-000001", lat=lat, lng=lng, accuracy_m=accuracy_m, source=source)
+
+
+def test_haversine_matches_known_distance() -> None:
+    # New Delhi -> Agra is roughly 178 km as the crow flies
+    assert 175_000 < float(haversine_m(28.6139, 77.2090, 27.1767, 78.0081)) < 181_000
+    assert haversine_m([0.0, 0.0], [0.0, 0.0], [0.0, 1.0], [0.0, 0.0]).round().tolist() == [0.0, 111195.0]
+
+
+def test_select_fixes_to_store_drops_stationary_pings() -> None:
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+    cafe = (28.6139, 77.2090)
+    fixes = [
+        (t0 + timedelta(seconds=5), _fix(*cafe)),  # same spot
+        (t0 + timedelta(seconds=10), _fix(cafe[0] + 0.0004, cafe[1], accuracy_m=80)),  # ~44 m, within accuracy
+        (t0 + timedelta(seconds=15), _fix(cafe[0], cafe[1], source="manual")),  # explicit check-in
+        (t0 + timedelta(seconds=20), _fix(cafe[0] + 0.001, cafe[1])),  # ~111 m: moved
+        (t0 + timedelta(minutes=6), _fix(cafe[0] + 0.001, cafe[1])),  # heartbeat after the interval
+    ]
+
+    keep = select_fixes_to_store(
+        fixes,
+        (cafe[0], cafe[1], t0),
+        min_distance_m=25.0,
+        max_interval=timedelta(minutes=5),
+        keep_sources={"manual"},
+    )
+
+    assert keep == [False, False, True, True, True]
+    assert select_fixes_to_store(fixes[:1], None, 25.0, timedelta(minutes=5)) == [True]
+
+
+def test_douglas_peucker_keeps_only_corners() -> None:
+    # Walk east along a street, then north: ~11 m steps with sub-metre jitter
+    lats = [28.6 + (0.00001 if i % 2 else 0.0) for i in range(10)] + [28.6 + 0.0001 * i for i in range(1, 10)]
+    lngs = [77.2 + 0.0001 * i for i in range(10)] + [77.2009] * 9
+
+    keep = douglas_peucker(lats, lngs, epsilon_m=5.0)
+
+    assert keep.nonzero()[0].tolist() == [0, 9, 18]
+
+
+def test_track_keep_mask_preserves_gaps_and_check_ins() -> None:
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+    lats = [28.6] * 6
+    lngs = [77.2 + 0.0001 * i for i in range(6)]
+    recorded_at = [t0 + timedelta(minutes=i) for i in range(3)] + [t0 + timedelta(hours=2, minutes=i) for i in range(3)]
+    sources = ["web", "manual", "web", "web", "web", "web"]
+
+    keep = track_keep_mask(lats, lngs, recorded_at, sources, epsilon_m=5.0)
+
+    assert keep.tolist() == [True, True, True, True, False, True]
+
+
+def test_partition_router_uses_a_table_per_week_and_drops_whole_weeks(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(engine, tables=[models.TouristLocation.__table__])
+    router = LocationPartitionRouter(models.TouristLocation.__table__, period="week", enabled=True)
+    session = sessionmaker(bind=engine)
+
+    def row(recorded_at: datetime) -> dict:
+        return {"tourist_profile_id": 1, "tourist_id_code": "TR-000001", "lat": 28.6, "lng": 77.2, "recorded_at": recorded_at}
+
+    with session() as db:
+        router.insert(db, [row(datetime(2026, 1, 5, 9)), row(datetime(2026, 1, 11, 23)), row(datetime(2026, 1, 12, 0))])
+        router.insert(db, [row(datetime(2026, 1, 20, 8))])
+        db.commit()
+
+        names = [name for name, _, _ in router.partitions(engine)]
+        assert names == ["tourist_locations_w20260105", "tourist_locations_w20260112", "tourist_locations_w20260119"]
+
+        tables = router.tables_for_range(db, datetime(2026, 1, 12), datetime(2026, 1, 13))
+        assert [table.name for table in tables] == ["tourist_locations", "tourist_locations_w20260112"]
+        assert [db.execute(select(func.count()).select_from(t)).scalar() for t in tables] == [0, 1]
+
+        result = router.drop_before(db, datetime(2026, 1, 19))
+        assert result["dropped_partitions"] == names[:2]
+        assert [name for name, _, _ in router.partitions(engine)] == names[2:]
+
+
+def test_summarize_hours_groups_by_tourist_and_hour() -> None:
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+    summaries = summarize_hours(
+        [2, 1, 1, 1],
+        [28.6, 28.6, 28.601, 28.7],
+        [77.2, 77.2, 77.2, 77.2],
+        [t0, t0 + timedelta(minutes=50), t0 + timedelta(minutes=10), t0 + timedelta(minutes=70)],
+    )
+
+    assert [(s["tourist_profile_id"], s["hour_start"], s["fix_count"]) for s in summaries] == [
+        (1, t0, 2),
+        (1, t0 + timedelta(hours=1), 1),
+        (2, t0, 1),
+    ]
+    first = summaries[0]
+    assert first["centroid_lat"] == pytest.approx(28.6005)
+    assert first["distance_m"] == pytest.approx(111.2, abs=0.5)
+    assert (first["first_recorded_at"], first["last_recorded_at"]) == (t0 + timedelta(minutes=10), t0 + timedelta(minutes=50))
+    assert summaries[1]["distance_m"] == 0.0
+
+
+def test_parse_stream_fixes_defaults_and_pins_the_tourist() -> None:
+    fixes = _parse_stream_fixes('[{"lat": 28.6, "lng": 77.2}, {"lat": 28.7, "lng": 77.3, "source": "gps"}]', "TR-000001")
+    assert [(f.tourist_id_code, f.lat, f.source) for f in fixes] == [("TR-000001", 28.6, None), ("TR-000001", 28.7, "gps")]
+
+    for raw, status in [
+        ("not json", 400),
+        ("[]", 400),
+        ('{"lat": 28.6}', 422),
+        ('{"lat": 28.6, "lng": 77.2, "tourist_id_code": "TR-000002"}', 400),
+    ]:
+        with pytest.raises(HTTPException) as exc:
+            _parse_stream_fixes(raw, "TR-000001")
+        assert exc.value.status_code == status
+
+
+def test_nearby_index_matches_a_brute_force_scan() -> None:
+    rng = np.random.default_rng(7)
+    lats = 28.6 + rng.normal(0, 0.05, 3000)
+    lngs = 77.2 + rng.normal(0, 0.05, 3000)
+    now = datetime(2026, 1, 1, 12, 0, 0)
+
+    index = NearbyIndex(cell_size_deg=0.01, capacity=16)  # forces the columns to grow
+    for i, (lat, lng) in enumerate(zip(lats, lngs)):
+        index.upsert(i + 1, f"TR-{i + 1:06d}", lat, lng, now - timedelta(minutes=i % 120))
+    index.remove(3)
+
+    hits = index.query(28.6, 77.2, 2000.0, recorded_since=now - timedelta(minutes=60), exclude_profile_id=5)
+    distances = haversine_m(28.6, 77.2, lats, lngs)
+    expected = {
+        i + 1
+        for i in np.flatnonzero(distances <= 2000.0)
+        if i % 120 <= 60 and i + 1 not in (3, 5)
+    }
+    assert {hit.tourist_profile_id for hit in hits} == expected
+    assert [hit.distance_m for hit in hits] == sorted(hit.distance_m for hit in hits)
+
+    # Moving a tourist re-buckets it; an older fix never moves it back
+    index.upsert(10, "TR-000010", 19.07, 72.87, now)
+    index.upsert(10, "TR-000010", 28.6, 77.2, now - timedelta(hours=1))
+    assert [hit.tourist_profile_id for hit in index.query(19.07, 72.87, 100.0)] == [10]
+
+
+def test_nearby_service_syncs_changed_rows_incrementally(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'nearby.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime(2026, 1, 1, 12, 0, 0)
+
+    def place(profile_id: int, lat: float, lng: float, at: datetime) -> None:
+        db.merge(
+            models.TouristLastLocation(
+                tourist_profile_id=profile_id,
+                tourist_id_code=f"TR-{profile_id:06d}",
+                lat=lat,
+                lng=lng,
+                recorded_at=at,
+                updated_at=at,
+            )
+        )
+        db.commit()
+
+    place(1, 28.6139, 77.2090, now - timedelta(minutes=5))
+    place(2, 28.6200, 77.2100, now - timedelta(minutes=3))
+    place(3, 28.6139, 77.2090, now - timedelta(days=2))  # too old to be indexed
+
+    service = NearbyService(sync_seconds=0.0)
+    found = service.nearby(db, 28.6139, 77.2090, 2000.0, now=now)
+    assert [t.tourist_profile_id for t in found] == [1, 2]
+    assert found[0].distance_m == pytest.approx(0.0)
+
+    place(2, 19.0760, 72.8777, now - timedelta(minutes=1))  # moves to Mumbai
+    place(4, 28.6140, 77.2091, now)
+    found = service.nearby(db, 28.6139, 77.2090, 2000.0, active_within=timedelta(minutes=30), now=now)
+    assert [t.tourist_profile_id for t in found] == [1, 4]
+    assert service.stats() == {"tourists": 3, "syncs_total": 1, "rebuilds_total": 1}
+    db.close()
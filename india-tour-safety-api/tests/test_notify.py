@@ -0,0 +1,127 @@
+import asyncio
+from time import perf_counter
+
+import httpx
+
+from app.services.dispatch_outbox import OutboxItem
+from app import models
+from app.core.security import encrypt_field
+from app.services.notify import (
+    NotificationChannel,
+    NotificationDispatcher,
+    NotificationError,
+    _sms_request,
+    panic_message,
+)
+
+
+def _channel(name: str, timeout: float = 1.0) -> NotificationChannel:
+    return NotificationChannel(
+        name, timeout, lambda alert_id, payload: {"method": "POST", "url": f"http://stub/{name}", "json": payload}
+    )
+
+
+def test_dispatcher_fans_out_in_parallel_with_per_channel_timeouts() -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        channel = request.url.path.strip("/")
+        calls.append(channel)
+        await asyncio.sleep({"slow": 0.5}.get(channel, 0.1))
+        return httpx.Response(503 if channel == "email" else 200, json={})
+
+    dispatcher = NotificationDispatcher(
+        [_channel("sms"), _channel("email"), _channel("police_webhook"), _channel("slow", timeout=0.2)],
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        started = perf_counter()
+        results = {r.channel: r for r in dispatcher.send(7, {"tourist_id_code": "TR-000007"})}
+        elapsed = perf_counter() - started
+
+        assert elapsed < 0.35  # channels overlap, and "slow" is cut off at its own 0.2 s timeout
+        assert sorted(calls) == ["email", "police_webhook", "slow", "sms"]
+        assert results["sms"].ok and results["police_webhook"].ok
+        assert (results["email"].ok, results["email"].error) == (False, "HTTP 503")
+        assert not results["slow"].ok and "Timed out" in results["slow"].error
+
+        calls.clear()
+        dispatcher.send(7, {}, skip=["sms", "police_webhook", "slow"])
+        assert calls == ["email"]
+        assert dispatcher.stats()["counts"]["email"] == {"sent": 0, "failed": 2}
+    finally:
+        dispatcher.stop()
+
+
+def test_unexpected_channel_errors_fail_only_that_channel() -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/police_webhook":
+            raise RuntimeError("bad payload")
+        return httpx.Response(200, json={})
+
+    def broken(alert_id, payload):  # noqa: ANN001, ANN202
+        raise KeyError("phone")
+
+    dispatcher = NotificationDispatcher(
+        [_channel("sms"), _channel("police_webhook"), NotificationChannel("email", 1.0, broken)],
+        transport=httpx.MockTransport(handler),
+    )
+    try:
+        results = {r.channel: r for r in dispatcher.send(7, {})}
+        assert results["sms"].ok
+        assert (results["police_webhook"].ok, results["police_webhook"].error) == (False, "RuntimeError: bad payload")
+        assert (results["email"].ok, results["email"].error) == (False, "KeyError: 'phone'")
+        assert dispatcher.stats()["counts"]["email"] == {"sent": 0, "failed": 1}
+    finally:
+        dispatcher.stop()
+
+
+def test_panic_dispatch_records_delivered_channels_and_retries_the_rest(monkeypatch) -> None:  # noqa: ANN001
+    from app.routers import incidents
+
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        channel = request.url.path.strip("/")
+        attempts.append(channel)
+        return httpx.Response(500 if channel == "email" and attempts.count("email") == 1 else 200)
+
+    dispatcher = NotificationDispatcher([_channel("sms"), _channel("email")], transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(incidents, "notifier", dispatcher)
+    monkeypatch.setattr(incidents.settings, "SAFETY_DISPATCH_ENABLED", True)
+
+    item = OutboxItem(1, "panic_alert", 42, {"full_name": "A", "tourist_id_code": "TR-000001"}, 1, [])
+    try:
+        try:
+            incidents._dispatch_panic_alert(item)
+            raise AssertionError("expected a failed channel to raise")
+        except NotificationError as exc:
+            assert [r.channel for r in exc.failed] == ["email"]
+        assert item.delivered == ["sms"]
+
+        incidents._dispatch_panic_alert(item._replace(attempts=2))
+        assert sorted(attempts) == ["email", "email", "sms"]
+        assert sorted(item.delivered) == ["email", "sms"]
+    finally:
+        dispatcher.stop()
+
+
+def test_panic_message_includes_map_link_and_note() -> None:
+    text = panic_message({"full_name": "A", "tourist_id_code": "TR-1", "lat": 12.5, "lng": 77.25, "note": "lost"})
+    assert text == (
+        "SOS: A (TR-1) pressed the panic button. Location: https://maps.google.com/?q=12.5,77.25 Note: lost"
+    )
+
+
+def test_panic_sms_goes_to_the_decrypted_emergency_number(monkeypatch) -> None:  # noqa: ANN001
+    from app.routers import incidents
+
+    monkeypatch.setattr(incidents.settings, "SAFETY_ENCRYPTION_KEY", "k3y")
+    stored = encrypt_field("+919876543210")
+    assert stored != "+919876543210"
+    profile = models.TouristProfile(id=1, tourist_id_code="TR-000001", full_name="A", emergency_contact_phone=stored)
+    alert = models.SafetyAlert(lat=12.5, lng=77.25, description=None)
+
+    payload = incidents._panic_dispatch_payload(alert, profile)
+    assert payload["emergency_contact_phone"] == "+919876543210"
+    assert _sms_request(7, payload)["data"]["To"] == "+919876543210"
@@ -0,0 +1,63 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.profile_cache import ProfileCache, profile_cache
+
+
+def test_lookups_are_cached_and_dropped_on_profile_writes(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'profiles.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.TouristProfile(id=1, user_id="u1", tourist_id_code="TR-000001", full_name="A", city="Jaipur"))
+    db.commit()
+    profile_cache.clear()
+    before = profile_cache.stats()
+
+    ref = profile_cache.by_user(db, "u1")
+    assert (ref.id, ref.tourist_id_code, ref.city) == (1, "TR-000001", "Jaipur")
+    assert profile_cache.by_code(db, "TR-000001") is ref  # filled for both keys by one query
+    assert profile_cache.by_user(db, "nobody") is None
+    stats = profile_cache.stats()
+    assert stats["hits_total"] - before["hits_total"] == 1
+    assert stats["misses_total"] - before["misses_total"] == 2
+
+    # Writes to fields that are not cached keep the entries
+    profile = db.get(models.TouristProfile, 1)
+    profile.safety_score = 55
+    db.commit()
+    assert profile_cache.stats()["entries"] == 2
+
+    profile.city = "Udaipur"
+    db.commit()
+    assert profile_cache.stats()["entries"] == 0
+    assert profile_cache.by_code(db, "TR-000001").city == "Udaipur"
+
+    profile.is_active = False
+    db.commit()
+    assert profile_cache.by_user(db, "u1") is None
+    assert profile_cache.by_code(db, "TR-000001") is None
+    db.close()
+
+
+def test_entries_expire_and_are_bounded(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'profiles.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for i in range(1, 4):
+        db.add(models.TouristProfile(id=i, user_id=f"u{i}", tourist_id_code=f"TR-{i:06d}", full_name="A"))
+    db.commit()
+
+    cache = ProfileCache(max_entries=4, ttl_seconds=60.0)
+    for i in range(1, 4):
+        cache.by_user(db, f"u{i}")
+    assert cache.stats()["entries"] == 4  # two keys per profile; the oldest profile was evicted
+    assert cache.by_code(db, "TR-000003").id == 3
+    assert cache.stats()["hits_total"] == 1
+
+    cache.ttl = 0.0
+    cache.by_user(db, "u1")
+    assert cache.by_user(db, "u1").id == 1
+    assert cache.stats()["hits_total"] == 1
+    db.close()
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+
+from app import models
+from app.core.rate_limit import DatabaseRateLimitBackend, MemoryRateLimitBackend, RateLimiter
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_allows_bursts_then_refills() -> None:
+    clock = _Clock()
+    limiter = RateLimiter("t", max_calls=3, window_seconds=60, backend=MemoryRateLimitBackend(clock=clock))
+
+    for _ in range(3):
+        limiter.check(1)
+    with pytest.raises(HTTPException) as exc:
+        limiter.check(1)
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "20"}
+
+    limiter.check(2)  # other keys are independent
+
+    clock.now += 20  # one token back (3 per 60 s)
+    limiter.check(1)
+    with pytest.raises(HTTPException):
+        limiter.check(1)
+
+
+def test_memory_backend_evicts_idle_and_excess_keys() -> None:
+    clock = _Clock()
+    backend = MemoryRateLimitBackend(max_keys=2, clock=clock)
+
+    backend.acquire("a", 3, 0.05)
+    backend.acquire("b", 3, 0.05)
+    backend.acquire("c", 3, 0.05)
+    assert backend.stats()["keys"] == 2  # "a" pushed out by the cap
+
+    clock.now += 21  # "b" and "c" are full again
+    backend.acquire("d", 3, 0.05)
+    assert backend.stats() == {"backend": "memory", "keys": 1, "evicted_total": 3}
+
+
+def test_database_backend_shares_buckets_between_instances(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'limits.db'}")
+    models.RateLimitBucket.__table__.create(engine)
+    clock = _Clock()
+    # Two backends on one database stand in for two API workers
+    worker_a = RateLimiter("t", 2, 60, backend=DatabaseRateLimitBackend(engine, clock=clock))
+    worker_b = RateLimiter("t", 2, 60, backend=DatabaseRateLimitBackend(engine, clock=clock))
+
+    worker_a.check(7)
+    worker_b.check(7)
+    with pytest.raises(HTTPException) as exc:
+        worker_a.check(7)
+    assert exc.value.headers == {"Retry-After": "30"}
+
+    clock.now += 30
+    worker_b.check(7)
+
+    clock.now += 3600
+    worker_a.check(8)  # cleanup deletes the refilled bucket for key 7
+    with engine.connect() as conn:
+        keys = [row[0] for row in conn.execute(models.RateLimitBucket.__table__.select())]
+    assert keys == ["t:8"]
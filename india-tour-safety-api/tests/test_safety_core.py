@@ -4,7 +4,7 @@ from fastapi import HTTPException
 
 from app.routers.locations import _point_in_bbox
 from app.core.security import encrypt_field, decrypt_field
-from app.routers.incidents import _check_panic_rate_limit, _panic_calls, _PANIC_RATE_MAX_CALLS
+from app.routers.incidents import _check_panic_rate_limit, _panic_limiter, _PANIC_RATE_MAX_CALLS
 
 
 def test_point_in_bbox_inside_and_outside() -> None:
@@ -29,7 +29,7 @@ def test_encrypt_decrypt_roundtrip() -> None:
 def test_panic_rate_limiter_blocks_after_threshold() -> None:
     user_id = 9999
     # Reset any prior state for this user
-    _panic_calls.pop(user_id, None)
+    _panic_limiter.reset(user_id)
 
     # First N calls should be allowed
     for _ in range(_PANIC_RATE_MAX_CALLS):
@@ -0,0 +1,133 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.alert_events import AlertSnapshot
+from app.services.safety_score import SafetyState, safety_score, score_from_alerts
+from app.services.safety_score_batch import recompute_safety_scores
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def db(tmp_path):  # noqa: ANN001, ANN201
+    engine = create_engine(f"sqlite:///{tmp_path / 'score.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_bucketed_state_matches_the_per_alert_score() -> None:
+    rng = random.Random(5)
+    for trial in range(200):
+        alerts = [
+            AlertSnapshot(
+                id=i,
+                tourist_profile_id=1,
+                type=rng.choice(["panic", "geofence_breach", "anomaly_inactivity"]),
+                severity=rng.choice(["critical", "high", "medium", "low", "info"]),
+                status=rng.choice(["new", "acknowledged", "resolved"]),
+                triggered_at=NOW - timedelta(seconds=rng.uniform(0, 16 * 86400)),
+                city="",
+            )
+            for i in range(rng.randint(0, 12))
+        ]
+        state = SafetyState.from_alerts(alerts)
+        for hours_later in (0, 5, 30, 24 * 4):
+            now = NOW + timedelta(hours=hours_later, minutes=trial % 60)
+            # Only the hour straddling the decay floor or the 14-day edge is approximated
+            assert abs(state.score(now) - score_from_alerts(alerts, now)) <= 1
+
+
+def test_state_follows_alert_writes_and_is_saved_only_on_change(db) -> None:  # noqa: ANN001
+    db.add(models.TouristProfile(id=1, user_id="u1", tourist_id_code="TR-000001", full_name="A"))
+    db.commit()
+    now = datetime.utcnow()  # the write hooks prune by the wall clock
+
+    def alert(alert_id: int, age: timedelta, **fields) -> models.SafetyAlert:  # noqa: ANN003
+        values = {"type": "geofence_breach", "severity": "high", "title": "t", "triggered_at": now - age}
+        values.update(fields)
+        return models.SafetyAlert(id=alert_id, tourist_profile_id=1, **values)
+
+    db.add(alert(1, timedelta(days=2)))
+    db.commit()
+    assert safety_score(db.connection(), 1, now) == 100 - round(15 * 1.2 * (1 - 2 / 14))  # 85
+
+    # First score read seeded the row; later writes update it in the same transaction
+    db.commit()
+    db.add(alert(2, timedelta(hours=1), type="panic", severity="critical"))
+    db.commit()
+    state = db.get(models.TouristSafetyState, 1)
+    assert list(state.open_panics) == ["2"]
+    assert safety_score(db.connection(), 1, now) == 40  # open critical panic caps the score
+
+    panic = db.get(models.SafetyAlert, 2)
+    saved_at = state.updated_at
+    panic.status = "acknowledged"  # same weight, same cap: nothing to save
+    db.commit()
+    db.refresh(state)
+    assert state.updated_at == saved_at
+
+    panic.status = "resolved"
+    db.commit()
+    db.refresh(state)
+    assert state.open_panics == {}
+    alerts = db.query(models.SafetyAlert).all()
+    assert safety_score(db.connection(), 1, now) == score_from_alerts(alerts, now)
+
+    db.delete(db.get(models.SafetyAlert, 1))
+    db.commit()
+    alerts = db.query(models.SafetyAlert).all()
+    assert safety_score(db.connection(), 1, now) == score_from_alerts(alerts, now)
+
+
+def test_batch_recompute_matches_the_safety_state_score(db) -> None:  # noqa: ANN001
+    rng = random.Random(11)
+    for profile_id in range(1, 41):
+        db.add(
+            models.TouristProfile(
+                id=profile_id,
+                user_id=f"u{profile_id}",
+                tourist_id_code=f"TR-{profile_id:06d}",
+                full_name="A",
+                is_active=profile_id != 40,
+                safety_score=100 if profile_id % 3 == 0 else None,
+            )
+        )
+    alerts = []
+    for alert_id in range(1, 601):
+        alerts.append(
+            models.SafetyAlert(
+                id=alert_id,
+                tourist_profile_id=rng.randint(1, 36),  # 37-39 have no alerts
+                type=rng.choice(["panic", "geofence_breach", "anomaly_inactivity"]),
+                severity=rng.choice(["critical", "high", "medium", "low", "info"]),
+                status=rng.choice(["new", "acknowledged", "resolved"]),
+                title="t",
+                triggered_at=NOW - timedelta(seconds=rng.uniform(0, 16 * 86400)),
+            )
+        )
+    db.add_all(alerts)
+    db.commit()
+
+    stats = recompute_safety_scores(db, now=NOW, batch_size=64)
+    assert stats["profiles"] == 39
+    expected = {
+        profile_id: SafetyState.from_alerts([a for a in alerts if a.tourist_profile_id == profile_id]).score(NOW)
+        for profile_id in range(1, 40)
+    }
+    stored = dict(db.query(models.TouristProfile.id, models.TouristProfile.safety_score))
+    assert {pid: stored[pid] for pid in expected} == expected
+    assert stored[40] is None  # inactive profiles are left alone
+    assert stats["updated"] == sum(1 for pid in expected if pid % 3 or expected[pid] != 100)
+
+    # Sharded across processes: same scores, nothing left to write
+    assert recompute_safety_scores(db, now=NOW, workers=2, batch_size=64)["updated"] == 0
@@ -0,0 +1,64 @@
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services import tourist_codes
+from app.services.tourist_codes import TouristCodeAllocator
+
+
+def test_parallel_creates_get_unique_codes_across_allocators(tmp_path) -> None:  # noqa: ANN001
+    engine = create_engine(f"sqlite:///{tmp_path / 'codes.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.TouristProfile(id=7, user_id="u0", tourist_id_code="TR-000007", full_name="A"))
+        db.commit()
+
+    # Two allocators stand in for two worker processes sharing the database
+    allocators = [TouristCodeAllocator(block_size=7), TouristCodeAllocator(block_size=7)]
+    errors = []
+
+    def register(allocator: TouristCodeAllocator, worker: int) -> None:
+        try:
+            with Session() as db:
+                for i in range(40):
+                    code = allocator.next_code(engine)
+                    db.add(
+                        models.TouristProfile(
+                            id=int(code[3:]), user_id=f"u{worker}-{i}", tourist_id_code=code, full_name="T"
+                        )
+                    )
+                    db.commit()
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=register, args=(allocators[n % 2], n)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with Session() as db:
+        codes = [code for (code,) in db.query(models.TouristProfile.tourist_id_code)]
+    assert len(codes) == len(set(codes)) == 8 * 40 + 1
+    assert min(int(code[3:]) for code in codes if code != "TR-000007") == 8  # seeded past existing codes
+    assert sum(a.stats()["allocated_total"] for a in allocators) == 8 * 40
+
+
+def test_allocator_seeds_the_sequence_before_its_first_block(monkeypatch) -> None:  # noqa: ANN001
+    calls = []
+
+    def reserve_block(engine, size, seed=False):  # noqa: ANN001, ANN202
+        calls.append((engine, seed))
+        return list(range(1, size + 1))
+
+    monkeypatch.setattr(tourist_codes, "reserve_block", reserve_block)
+    allocator = TouristCodeAllocator(block_size=2)
+    first, second = object(), object()
+    codes = [allocator.next_code(first) for _ in range(3)] + [allocator.next_code(second)]  # type: ignore[arg-type]
+    assert codes == ["TR-000001", "TR-000002", "TR-000001", "TR-000001"]
+    assert calls == [(first, True), (first, False), (second, True)]